@@ -3,10 +3,16 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 from utils.csv_processor import CSVProcessor
+from utils.categories import apply_categorical_dtypes
+from utils.chart_sampling import downsample_series, envelope_traces
+from utils.punch_profile import PunchProfileIndex
 from utils.rules_engine import RulesEngine
+from utils.sector_rules_memo import SectorRulesMemo
+from utils.time_utils import compact_punches, punch_matrix
+from utils.kpi_calculator import KPICalculator
 from utils.report_generator import ReportGenerator
 
 def format_timedelta_to_hhmm(td):
@@ -22,102 +28,106 @@ def format_timedelta_to_hhmm(td):
     
     return f"{sign}{hours:02d}:{minutes:02d}"
 
-def calculate_legacy_metrics(df):
-    """Calcula métricas de compatibilidade com a versão anterior da aplicação."""
+def _clean_punch_text(values: pd.Series) -> pd.Series:
+    """Texto de uma coluna de picagens sem espaços; vazio, '00:00' ou ausente ficam None."""
+    text = values.astype(object)
+    empty = (text.isna() | text.isin(['', '00:00'])).to_numpy()
+    stripped = text.astype(str).str.strip().to_numpy(dtype=object)
+    return pd.Series(np.where(empty, None, stripped), index=values.index, dtype=object).infer_objects()
+
+def _fallback_total_trabalho(df: pd.DataFrame) -> pd.Series:
+    """Trabalho (E1-S1 + E2-S2) das primeiras quatro picagens, para CSVs sem total_trabalho."""
+    valid = df['picagens_validas'].astype(bool).to_numpy() if 'picagens_validas' in df.columns else np.zeros(len(df), dtype=bool)
+    columns, present, minutes, _ = punch_matrix(df, empty_values=('', '00:00', '0:00'))
+    worked = np.zeros(len(df))
+    if len(columns) >= 4:
+        order, count = compact_punches(present)
+        first = np.take_along_axis(minutes, order[:, :4], axis=1)
+        # Linhas com alguma picagem inválida ficam a zero
+        ok = valid & (count >= 4) & ~(present & np.isnan(minutes)).any(axis=1)
+        worked = np.where(ok, (first[:, 1] - first[:, 0]) + (first[:, 3] - first[:, 2]), 0.0)
+    return pd.Series(pd.to_timedelta(worked, unit='m'), index=df.index).astype('timedelta64[ns]')
+
+def calculate_legacy_metrics(df, sector="default"):
+    """
+    Calcula métricas de compatibilidade com a versão anterior da aplicação.
+    
+    O objetivo diário vem de `horas_diarias_objetivo` nas regras do setor.
+    """
     if df.empty:
         return df
     
-    # Objetivo padrão de 8 horas
-    objetivo_td = pd.Timedelta(hours=8)
+    # Objetivo diário do setor (8 horas por omissão)
+    objetivo_horas = float(RulesEngine.shared().get_rules(sector).get('horas_diarias_objetivo', 8.0))
+    objetivo_td = pd.Timedelta(hours=objetivo_horas)
+    zero_td = pd.Timedelta(0)
     
     # Garantir que colunas essenciais existem (fallback para CSVs mais antigos)
     if 'total_trabalho' not in df.columns or df['total_trabalho'].isna().all():
         print("⚠️ Coluna total_trabalho não encontrada ou vazia, criando fallback...")
-        # Calcular total_trabalho manualmente se não existir
-        df['total_trabalho'] = pd.Timedelta(0)
-        for idx, row in df.iterrows():
-            if row.get('picagens_validas', False):
-                try:
-                    # Calcular baseado nas picagens válidas
-                    punches = []
-                    for col in ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']:
-                        if col in row and pd.notna(row[col]) and str(row[col]) not in ['00:00', '0:00', '']:
-                            time_obj = pd.to_datetime(str(row[col]), format='%H:%M').time()
-                            punches.append(time_obj)
-                    
-                    # Calcular trabalho para padrão 4 picagens (E1-S1-E2-S2)
-                    if len(punches) >= 4:
-                        e1, s1, e2, s2 = punches[:4]
-                        # Converter para datetime para cálculo
-                        base_date = pd.to_datetime('1900-01-01')
-                        dt_e1 = pd.to_datetime(base_date.strftime('%Y-%m-%d') + ' ' + e1.strftime('%H:%M:%S'))
-                        dt_s1 = pd.to_datetime(base_date.strftime('%Y-%m-%d') + ' ' + s1.strftime('%H:%M:%S'))
-                        dt_e2 = pd.to_datetime(base_date.strftime('%Y-%m-%d') + ' ' + e2.strftime('%H:%M:%S'))
-                        dt_s2 = pd.to_datetime(base_date.strftime('%Y-%m-%d') + ' ' + s2.strftime('%H:%M:%S'))
-                        
-                        # Manhã: E1 até S1, Tarde: E2 até S2
-                        manha = dt_s1 - dt_e1
-                        tarde = dt_s2 - dt_e2
-                        df.loc[idx, 'total_trabalho'] = manha + tarde
-                except:
-                    df.loc[idx, 'total_trabalho'] = pd.Timedelta(0)
+        df['total_trabalho'] = _fallback_total_trabalho(df)
     
     if 'total_pausas' not in df.columns:
-        df['total_pausas'] = pd.Timedelta(0)
+        df['total_pausas'] = zero_td
     
     # Renomear colunas para compatibilidade
     df['total_trabalho_calc'] = df['total_trabalho']
     df['total_intervalo_calc'] = df['total_pausas']
-    df['horas_efetivas_td'] = df['total_trabalho']
     
-    # Inicializar colunas
-    df['falta_td'] = pd.Timedelta(0)
-    df['extra_td'] = pd.Timedelta(0)
-    
-    # Reset horas efetivas para tipos que não são de trabalho
+    # Horas efetivas a zero para tipos que não são de trabalho
     tipos_nao_trabalho = ['Falta', 'Férias', 'Folga', 'Feriado', 'Fim de semana']
-    df.loc[df['Tipo'].isin(tipos_nao_trabalho), 'horas_efetivas_td'] = pd.Timedelta(0)
+    horas_efetivas = df['total_trabalho'].mask(df['Tipo'].isin(tipos_nao_trabalho).to_numpy(), zero_td)
+    df['horas_efetivas_td'] = horas_efetivas
     
-    # Calcular faltas e extras para dias de trabalho
-    dias_de_trabalho_mask = df['Tipo'].isin(['Normal', 'Falta parcial', 'Com extra'])
-    df.loc[dias_de_trabalho_mask, 'falta_td'] = (objetivo_td - df.loc[dias_de_trabalho_mask, 'horas_efetivas_td']).apply(lambda x: max(x, pd.Timedelta(0)))
-    df.loc[dias_de_trabalho_mask, 'extra_td'] = (df.loc[dias_de_trabalho_mask, 'horas_efetivas_td'] - objetivo_td).apply(lambda x: max(x, pd.Timedelta(0)))
+    # Faltas e extras para dias de trabalho
+    dia_trabalho = df['Tipo'].isin(['Normal', 'Falta parcial', 'Com extra']).to_numpy()
+    falta = (objetivo_td - horas_efetivas).clip(lower=zero_td).where(dia_trabalho, zero_td)
+    extra = (horas_efetivas - objetivo_td).clip(lower=zero_td).where(dia_trabalho, zero_td)
     
     # Faltas totais - apenas para dias marcados como "Falta"
-    falta_total_mask = df['Tipo'] == 'Falta'
-    df.loc[falta_total_mask, 'falta_td'] = objetivo_td
+    falta = falta.mask((df['Tipo'] == 'Falta').to_numpy(), objetivo_td)
     
     # Garantir que férias, folgas, feriados não têm faltas nem extras
-    tipos_sem_falta = ['Férias', 'Folga', 'Feriado', 'Fim de semana']
-    df.loc[df['Tipo'].isin(tipos_sem_falta), 'falta_td'] = pd.Timedelta(0)
-    df.loc[df['Tipo'].isin(tipos_sem_falta), 'extra_td'] = pd.Timedelta(0)
+    sem_falta = df['Tipo'].isin(['Férias', 'Folga', 'Feriado', 'Fim de semana']).to_numpy()
+    df['falta_td'] = falta.mask(sem_falta, zero_td)
+    df['extra_td'] = extra.mask(sem_falta, zero_td)
     
     # Versão numérica para compatibilidade
-    df['horas_efetivas_num'] = df['horas_efetivas_td'].dt.total_seconds() / 3600
-    df['cumpriu_horario'] = df['horas_efetivas_num'] >= 8.0
-    df['dia_trabalho'] = df['Tipo'].isin(['Normal', 'Falta parcial', 'Com extra'])
-    
-    # Extrair primeiro E1 e último S
-    def clean_time_simple(time_str):
-        if not time_str or pd.isna(time_str) or time_str == '00:00':
-            return None
-        return str(time_str).strip()
+    df['horas_efetivas_num'] = horas_efetivas.dt.total_seconds() / 3600
+    df['cumpriu_horario'] = df['horas_efetivas_num'] >= objetivo_horas
+    df['dia_trabalho'] = dia_trabalho
     
-    df['primeiro_e1'] = df['E1'].apply(clean_time_simple)
-    
-    # Encontrar último S válido
+    # Primeiro E1 e último S válido (S4 -> S1, o primeiro preenchido)
+    df['primeiro_e1'] = _clean_punch_text(df['E1'])
     s_cols = [col for col in ['S4', 'S3', 'S2', 'S1'] if col in df.columns]
-    def get_last_valid_time(row):
-        for col in s_cols:
-            time_val = clean_time_simple(row[col])
-            if time_val:
-                return time_val
-        return None
-    
-    df['ultimo_s'] = df[s_cols].apply(get_last_valid_time, axis=1)
+    if s_cols:
+        saidas = pd.DataFrame({col: _clean_punch_text(df[col]) for col in s_cols}, index=df.index)
+        df['ultimo_s'] = saidas.bfill(axis=1).iloc[:, 0].infer_objects()
+    else:
+        df['ultimo_s'] = None
     
     return df
 
+def legacy_metrics_recompute(sector: str):
+    """Função que recalcula as métricas de compatibilidade das linhas reprocessadas."""
+    return lambda rows: calculate_legacy_metrics(rows, sector)
+
+def sector_rules_memo() -> SectorRulesMemo:
+    """Memória dos resultados das regras do setor desta sessão."""
+    return st.session_state.setdefault('sector_rules_memo', SectorRulesMemo(recompute=calculate_legacy_metrics))
+
+def apply_sector_rules_memoized(processor: CSVProcessor, df: pd.DataFrame, sector: str) -> pd.DataFrame:
+    """Aplica as regras do setor (e as métricas de compatibilidade) só quando algo relevante mudou."""
+    return sector_rules_memo().apply(processor, df, sector)
+
+def record_sector_rules_result(df: pd.DataFrame, sector: str) -> None:
+    """Regista `df` (com as linhas editadas já reprocessadas) como resultado das regras do setor."""
+    sector_rules_memo().record(df, sector, st.session_state.get('punch_profile'))
+
+def with_rule_texts(df: pd.DataFrame, columns=None) -> pd.DataFrame:
+    """Cópia das linhas a mostrar com o texto dos alertas de intervalos e das correções sugeridas (só `columns`, se indicadas)."""
+    return RulesEngine.shared().render_rule_texts(df, setor_selecionado, columns)
+
 # Configuração da página
 st.set_page_config(
     page_title="Análise de Horas de Trabalho",
@@ -154,10 +164,15 @@ def setup_session_state():
         st.session_state['processed_data'] = pd.DataFrame()
     if 'edited_data' not in st.session_state:
         st.session_state['edited_data'] = pd.DataFrame()
+    if 'punch_profile' not in st.session_state:
+        st.session_state['punch_profile'] = PunchProfileIndex()
+    if 'kpi_calculator' not in st.session_state:
+        # Mantém a cache de KPIs entre reruns (mudar de aba não recalcula nada)
+        st.session_state['kpi_calculator'] = KPICalculator()
 
 def process_data(uploaded_file):
     """Processes the uploaded CSV and stores it in session state."""
-    processor = CSVProcessor()
+    processor = CSVProcessor(punch_profile=st.session_state.get('punch_profile'))
     
     with st.spinner("A processar o ficheiro CSV..."):
         # Usar o novo método melhorado que integra todos os passos
@@ -190,10 +205,10 @@ def process_data(uploaded_file):
         weekend_mask = df_unique['Dia da Semana'].isin(['Sábado', 'Domingo'])
         # Only set to 'Fim de semana' if the day type is something neutral like 'Folga'
         df_unique.loc[weekend_mask & df_unique['Tipo'].isin(['Folga']), 'Tipo'] = 'Fim de semana'
+        df_unique = apply_categorical_dtypes(df_unique, ['Dia da Semana'])
 
-    # Calcular métricas compatíveis com a versão anterior
-    df_unique = calculate_legacy_metrics(df_unique)
-
+    # As métricas compatíveis com a versão anterior dependem do setor: são calculadas
+    # com as regras do setor selecionado (apply_sector_rules_memoized)
     st.session_state['processed_data'] = df_unique
     st.session_state['edited_data'] = df_unique.copy()
 
@@ -305,8 +320,8 @@ def main():
 
         if not df_to_analyze.empty:
             # Aplicar regras do setor selecionado (Fase 2)
-            processor = CSVProcessor()
-            df_to_analyze = processor.apply_sector_rules(df_to_analyze, setor_selecionado)
+            processor = CSVProcessor(punch_profile=st.session_state.get('punch_profile'))
+            df_to_analyze = apply_sector_rules_memoized(processor, df_to_analyze, setor_selecionado)
             st.session_state.edited_data = df_to_analyze
             
             # Show interactive editor and capture the returned edited dataframe
@@ -319,13 +334,14 @@ def main():
                 
                 # Update the original dataframe in the session state
                 if len(edited_tipos) == len(df_to_analyze):
+                    changed = df_to_analyze['Tipo'].astype(object).to_numpy() != edited_tipos.astype(object).to_numpy()
                     df_to_analyze['Tipo'] = edited_tipos.values
                     
-                    # Recalcular métricas baseadas no tipo de dia atualizado
-                    df_to_analyze = calculate_legacy_metrics(df_to_analyze)
-                    
-                    # Reaplicar regras do setor após edições
-                    df_to_analyze = processor.apply_sector_rules(df_to_analyze, setor_selecionado)
+                    # Reaplicar regras do setor e métricas só às linhas cujo tipo mudou
+                    if changed.any():
+                        df_to_analyze = processor.reprocess_rows(df_to_analyze, df_to_analyze.index[changed], setor_selecionado,
+                                                                 recompute=legacy_metrics_recompute(setor_selecionado))
+                    record_sector_rules_result(df_to_analyze, setor_selecionado)
                     
                     # Persist changes back to the session state
                     st.session_state.edited_data = df_to_analyze
@@ -351,7 +367,7 @@ def main():
             
             # Gráficos
             st.markdown("---")
-            show_charts(df_to_analyze)
+            show_charts(df_to_analyze, setor_selecionado)
             
             # Análise de pontualidade
             st.markdown("---")
@@ -445,23 +461,50 @@ def show_monthly_analysis(df):
     monthly_data.columns = ['Horas Totais', 'Dias Trabalhados']
     st.dataframe(monthly_data)
 
-def show_charts(df):
+def select_visible_range(df: pd.DataFrame, key: str, label: str = "Período visível"):
+    """
+    Seletor do período visível de um gráfico temporal.
+    
+    Returns:
+        (início, fim) como Timestamps, ou None se não há datas ou a seleção está incompleta
+    """
+    dates = pd.to_datetime(df['Data'], errors='coerce').dropna() if 'Data' in df.columns else pd.Series(dtype='datetime64[ns]')
+    if dates.empty:
+        return None
+    first, last = dates.min().date(), dates.max().date()
+    selected = st.date_input(label, value=(first, last), min_value=first, max_value=last, key=key)
+    if not isinstance(selected, (tuple, list)) or len(selected) != 2:
+        return None
+    return pd.Timestamp(selected[0]), pd.Timestamp(selected[1])
+
+def show_charts(df, sector: str = "default"):
     st.subheader("📊 Visualizações")
     
     tab1, tab2, tab3 = st.tabs(["Horas Diárias", "Tipos de Dia", "Tendência Mensal"])
     
     with tab1:
-        # Gráfico de horas por dia
-        fig = px.line(df, x='Data', y='horas_efetivas_num', 
-                     title="Horas Efetivas por Dia",
-                     labels={'horas_efetivas_num': 'Horas', 'Data': 'Data'})
-        fig.add_hline(y=8, line_dash="dash", line_color="red", 
-                     annotation_text="Meta: 8h")
+        # Gráfico de horas por dia: o nível (dia/semana/mês) depende do período visível,
+        # por isso reduzir o período volta a mostrar o detalhe diário
+        date_range = select_visible_range(df, 'periodo_horas_diarias')
+        reduced, level = downsample_series(df, 'Data', 'horas_efetivas_num', date_range=date_range)
+        if level is None:
+            fig = px.line(reduced, x='Data', y='horas_efetivas_num', 
+                         title="Horas Efetivas por Dia",
+                         labels={'horas_efetivas_num': 'Horas', 'Data': 'Data'})
+        else:
+            fig = go.Figure(envelope_traces(reduced, 'Data', 'horas_efetivas_num', f'Média por {level}',
+                                            '#636efa', unit='h'))
+            fig.update_layout(title=f"Horas Efetivas (média por {level})", xaxis_title='Data', yaxis_title='Horas')
+        # Meta diária do setor (a mesma de calculate_legacy_metrics)
+        objetivo_horas = float(RulesEngine.shared().get_rules(sector).get('horas_diarias_objetivo', 8.0))
+        fig.add_hline(y=objetivo_horas, line_dash="dash", line_color="red", 
+                     annotation_text=f"Meta: {objetivo_horas:g}h")
         st.plotly_chart(fig, use_container_width=True)
     
     with tab2:
         # Distribuição por tipo de dia
         type_counts = df['Tipo'].value_counts()
+        type_counts = type_counts[type_counts > 0]
         fig = px.pie(values=type_counts.values, names=type_counts.index,
                     title="Distribuição por Tipo de Dia")
         st.plotly_chart(fig, use_container_width=True)
@@ -516,12 +559,11 @@ def show_interval_analysis_tab(df):
     else:
         display_cols = ['Data', 'Tipo', 'duracao_almoco', 'alerta_intervalos']
     
-    # Filtrar apenas colunas disponíveis
-    available_cols = [col for col in display_cols if col in df.columns]
+    # Apenas colunas disponíveis (texto dos alertas gerado só para a tabela)
+    display_df = with_rule_texts(df, display_cols)
     
-    if available_cols:
+    if not display_df.columns.empty:
         # Formatar colunas de duração
-        display_df = df[available_cols].copy()
         duration_cols = ['duracao_almoco', 'duracao_pausa_manha', 'duracao_pausa_tarde']
         
         for col in duration_cols:
@@ -543,12 +585,12 @@ def show_punctuality_analysis_tab(df):
     """Mostra análise simples de pontualidade."""
     st.write("### 🎯 Análise de Pontualidade")
     
-    # Tabela simples com dados de pontualidade
+    # Tabela simples com dados de pontualidade (texto das correções sugeridas só para estas colunas)
     punctuality_cols = ['Data', 'Tipo', 'tipo_problema', 'atraso_minutos', 'correcao_sugerida']
-    available_cols = [col for col in punctuality_cols if col in df.columns]
+    display_df = with_rule_texts(df, punctuality_cols)
     
-    if available_cols:
-        st.dataframe(df[available_cols], use_container_width=True)
+    if not display_df.columns.empty:
+        st.dataframe(display_df, use_container_width=True)
     else:
         st.warning("⚠️ Dados de pontualidade não disponíveis.")
     
@@ -603,6 +645,7 @@ def show_punctuality_analysis_tab(df):
         st.write("**Tipos de Problemas Mais Comuns:**")
         if not df[df['tipo_problema'] != ''].empty:
             problema_counts = df[df['tipo_problema'] != '']['tipo_problema'].value_counts()
+            problema_counts = problema_counts[problema_counts > 0]
             problema_data = pd.DataFrame({
                 'Tipo de Problema': problema_counts.index,
                 'Ocorrências': problema_counts.values
@@ -631,7 +674,20 @@ def show_punctuality_analysis_tab(df):
                 }), use_container_width=True)
             else:
                 st.info("Sem dados de confiança disponíveis")
-    
+
+    # Padrões por funcionário (médias, dia da semana, tendências e sequências)
+    if 'atraso_minutos' in df.columns:
+        from utils.punctuality_analyzer import PunctualityAnalyzer
+        patterns_df = PunctualityAnalyzer().generate_population_patterns(df)
+        if not patterns_df.empty:
+            st.write("**Padrões de Atraso por Funcionário:**")
+            st.dataframe(
+                patterns_df[['Departamento', 'dias', 'atraso_medio', 'atraso_medio_departamento',
+                             'dias_com_atraso', 'tendencia_atraso', 'maior_sequencia_atrasos',
+                             'sequencia_atrasos_atual']].round(1),
+                use_container_width=True
+            )
+
     # Casos específicos para revisão manual
     if not problemas_df.empty:
         st.write("#### ⚠️ Casos Prioritários para Revisão")
@@ -662,14 +718,17 @@ def show_punctuality_analysis_tab(df):
 def show_enhanced_dashboard_tab(df: pd.DataFrame):
     """Mostra o dashboard melhorado com KPIs e visualizações."""
     try:
-        from utils.kpi_calculator import KPICalculator
         from utils.day_type_manager import DayTypeManager
         
-        kpi_calc = KPICalculator()
+        kpi_calc = st.session_state.get('kpi_calculator') or KPICalculator()
         day_manager = DayTypeManager()
         
-        # Calcular KPIs principais
-        kpis = kpi_calc.calculate_main_kpis(df)
+        # Período visível do gráfico de tendências (decide o nível de agregação)
+        date_range = select_visible_range(df, 'periodo_tendencias', "Período do gráfico de tendências")
+        
+        # KPIs e gráficos (reutilizados da cache enquanto as colunas de que dependem não mudam)
+        dashboard = kpi_calc.calculate_dashboard(df, date_range=date_range)
+        kpis = dashboard['kpis']
         
         # Mostrar cards de KPIs
         kpi_calc.create_kpi_cards(kpis)
@@ -682,7 +741,7 @@ def show_enhanced_dashboard_tab(df: pd.DataFrame):
         
         with col1:
             # Gráfico de tendências de pontualidade
-            trends_fig = kpi_calc.create_punctuality_trends_chart(df)
+            trends_fig = dashboard['punctuality_trends']
             if trends_fig:
                 st.plotly_chart(trends_fig, use_container_width=True)
             else:
@@ -690,20 +749,20 @@ def show_enhanced_dashboard_tab(df: pd.DataFrame):
         
         with col2:
             # Gráfico de breakdown de conformidade
-            compliance_fig = kpi_calc.create_compliance_breakdown_chart(df)
+            compliance_fig = dashboard['compliance_breakdown']
             if compliance_fig:
                 st.plotly_chart(compliance_fig, use_container_width=True)
             else:
                 st.info("🎯 Gráfico de conformidade não disponível (dados insuficientes)")
         
         # Gráfico de horas semanais (largura completa)
-        weekly_fig = kpi_calc.create_weekly_hours_chart(df)
+        weekly_fig = dashboard['weekly_hours']
         if weekly_fig:
             st.plotly_chart(weekly_fig, use_container_width=True)
         
         # Alertas ativos
         st.write("### 🚨 Alertas Prioritários")
-        alerts = kpi_calc.generate_alerts_summary(df)
+        alerts = dashboard['alerts']
         
         if alerts:
             # Mostrar alertas em cards
@@ -755,8 +814,9 @@ def show_day_type_management_tab(df: pd.DataFrame) -> pd.DataFrame:
         
         day_manager = DayTypeManager()
         
-        # Interface de gestão de tipos de dia
-        updated_df = day_manager.create_streamlit_day_type_interface(df)
+        # Interface de gestão de tipos de dia (alterações recalculam só as linhas afetadas)
+        updated_df = day_manager.create_streamlit_day_type_interface(
+            df, recompute=legacy_metrics_recompute(setor_selecionado), sector=setor_selecionado)
         
         return updated_df
         
@@ -785,7 +845,7 @@ def show_smart_punch_editor(df: pd.DataFrame) -> pd.DataFrame:
     st.write(f"📋 Encontrados **{len(problematic_days)}** dias com possíveis esquecimentos:")
     
     # Mostrar cada problema com opção de correção
-    for idx, row in problematic_days.head(5).iterrows():
+    for idx, row in with_rule_texts(problematic_days.head(5)).iterrows():
         data_str = row['Data'].strftime('%d/%m/%Y')
         problema = row.get('tipo_problema', '')
         sugestao = row.get('correcao_sugerida', '')
@@ -850,15 +910,22 @@ def show_smart_punch_editor(df: pd.DataFrame) -> pd.DataFrame:
                     col_apply, col_cancel = st.columns(2)
                     with col_apply:
                         if st.button("✅ Aplicar Correção", key=f"apply_{idx}"):
+                            kpi_calc = st.session_state.get('kpi_calculator')
+                            snapshot = kpi_calc.snapshot_rows(df, [idx]) if kpi_calc else None
+                            
                             # Aplicar correção
                             df = apply_punch_correction(df, idx, new_time, problema)
                             
-                            # Reprocessar dados após correção
+                            # Reprocessar só a linha corrigida e atualizar os KPIs por delta
                             try:
                                 from utils.csv_processor import CSVProcessor
-                                processor = CSVProcessor()
-                                setor = st.session_state.get('setor_selecionado', 'Produção')
-                                df = processor.apply_sector_rules(df, setor)
+                                processor = CSVProcessor(punch_profile=st.session_state.get('punch_profile'))
+                                df = processor.reprocess_rows(df, [idx], setor_selecionado,
+                                                              recompute=legacy_metrics_recompute(setor_selecionado))
+                                if snapshot is not None:
+                                    kpi_calc.apply_row_edit(df, snapshot)
+                                # O rerun seguinte encontra este resultado na memória (sem reprocessar tudo)
+                                record_sector_rules_result(df, setor_selecionado)
                                 st.session_state.edited_data = df
                                 st.success(f"✅ Picagem corrigida e dados recalculados para {data_str}!")
                             except Exception as e:
@@ -883,6 +950,12 @@ def show_detailed_punch_editor(df: pd.DataFrame) -> pd.DataFrame:
     detail_cols = ['Data', 'Dia da Semana', 'Tipo', 'E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
     edit_df = df[[col for col in detail_cols if col in df.columns]].copy()
     
+    # Alertas e correções (só leitura), gerados a partir dos bits das regras
+    texts = with_rule_texts(df, ['alerta_intervalos', 'correcao_sugerida'])
+    for col in ['alerta_intervalos', 'correcao_sugerida']:
+        if col in texts.columns:
+            edit_df[col] = texts[col]
+    
     # Converter colunas de picagem para formato time compatível com Streamlit
     punch_cols = ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
     for col in punch_cols:
@@ -930,6 +1003,14 @@ def show_detailed_punch_editor(df: pd.DataFrame) -> pd.DataFrame:
             help="Selecione o tipo de dia",
             options=['Normal', 'Falta', 'Falta parcial', 'Folga', 'Feriado', 'Férias', 'Baixa médica', 'Compensação', 'Formação'],
             required=True,
+        ),
+        "alerta_intervalos": st.column_config.TextColumn(
+            "Alertas de Intervalos",
+            disabled=True
+        ),
+        "correcao_sugerida": st.column_config.TextColumn(
+            "Correção Sugerida",
+            disabled=True
         )
     }
     
@@ -957,8 +1038,15 @@ def show_detailed_punch_editor(df: pd.DataFrame) -> pd.DataFrame:
     if not edited_detail_df.equals(edit_df):
         st.info("✏️ Alterações detectadas! Aplicando mudanças...")
         
+        # Só as linhas efetivamente alteradas são escritas e reprocessadas
+        before, after = edit_df.astype(object), edited_detail_df.astype(object)
+        changed = ~(after.eq(before) | (after.isna() & before.isna())).all(axis=1)
+        changed_idx = edited_detail_df.index[changed.to_numpy()].intersection(df.index)
+        kpi_calc = st.session_state.get('kpi_calculator')
+        snapshot = kpi_calc.snapshot_rows(df, changed_idx) if kpi_calc else None
+        
         # Atualizar DataFrame principal com as edições
-        for idx, row in edited_detail_df.iterrows():
+        for idx, row in edited_detail_df.loc[changed_idx].iterrows():
             if idx in df.index:
                 # Atualizar tipo
                 if 'Tipo' in row:
@@ -981,11 +1069,14 @@ def show_detailed_punch_editor(df: pd.DataFrame) -> pd.DataFrame:
         # Reprocessar dados após edições
         try:
             from utils.csv_processor import CSVProcessor
-            processor = CSVProcessor()
+            processor = CSVProcessor(punch_profile=st.session_state.get('punch_profile'))
             
-            # Aplicar regras do setor após edições
-            setor = st.session_state.get('setor_selecionado', 'Produção')
-            df = processor.apply_sector_rules(df, setor)
+            # Aplicar regras do setor às linhas editadas e atualizar os KPIs por delta
+            df = processor.reprocess_rows(df, changed_idx, setor_selecionado,
+                                          recompute=legacy_metrics_recompute(setor_selecionado))
+            if snapshot is not None:
+                kpi_calc.apply_row_edit(df, snapshot)
+            record_sector_rules_result(df, setor_selecionado)
             
             st.success("✅ Alterações aplicadas e dados reprocessados!")
             st.rerun()
@@ -1305,7 +1396,7 @@ def show_download_options(df, setor):
                 
                 # Usar dados mais recentes da sessão se disponível
                 data_to_export = st.session_state.get('edited_data', df)
-                csv_buffer = report_gen.generate_csv_report(data_to_export)
+                csv_buffer = report_gen.generate_csv_report(data_to_export, setor)
                 
                 st.download_button(
                     label="⬇️ Baixar Relatório CSV",
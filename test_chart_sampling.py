@@ -0,0 +1,89 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from utils.chart_sampling import choose_aggregation_level, downsample_series
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma comparação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+def same_values(expected, result):
+    """Igualdade de valores (números com tolerância, NaN iguais entre si)."""
+    expected, result = pd.Series(expected).reset_index(drop=True), pd.Series(result).reset_index(drop=True)
+    if len(expected) != len(result):
+        return False
+    if pd.api.types.is_datetime64_any_dtype(expected):
+        return expected.equals(result)
+    return np.allclose(expected.to_numpy(dtype=float), result.to_numpy(dtype=float), equal_nan=True)
+
+def downsample_row_by_row(dates, values, freq):
+    """Média, mínimo, máximo e contagem por período, acumulados linha a linha."""
+    buckets = {}
+    for date, value in zip(dates, values):
+        if pd.isna(date):
+            continue
+        period = pd.Timestamp(date).to_period(freq).start_time
+        buckets.setdefault(period, []).append(value)
+    rows = []
+    for period in sorted(buckets):
+        present = [value for value in buckets[period] if not pd.isna(value)]
+        rows.append((period, np.mean(present) if present else np.nan, min(present) if present else np.nan,
+                     max(present) if present else np.nan, len(present)))
+    return pd.DataFrame(rows, columns=['Data', 'valor', 'y_min', 'y_max', 'n'])
+
+print('=== TESTE DA REDUÇÃO DE PONTOS DOS GRÁFICOS ===')
+print()
+
+rng = np.random.default_rng(1)
+dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, 6000), unit='D')
+values = rng.normal(10, 5, 6000)
+values[rng.random(6000) < 0.02] = np.nan
+series = pd.DataFrame({'Data': dates, 'valor': values})
+
+print('--- downsample_series ---')
+cases = [(1500, None), (300, None), (100, None), (1500, ('2021-01-01', '2021-03-31')), (500, ('2021-01-01', '2021-12-31'))]
+for max_points, date_range in cases:
+    reduced, level = downsample_series(series, 'Data', 'valor', max_points=max_points, date_range=date_range)
+    label = f"max_points={max_points}" + (f", intervalo {date_range[0]}..{date_range[1]}" if date_range else '')
+    visible = series
+    if date_range is not None:
+        visible = series[(series['Data'] >= pd.Timestamp(date_range[0])) & (series['Data'] <= pd.Timestamp(date_range[1]))]
+    if level is None:
+        check(f"{label}: sem agregação", len(reduced) <= max_points and same_values(visible['valor'], reduced['valor']))
+        continue
+    freq = {'dia': 'D', 'semana': 'W', 'mês': 'M'}[level]
+    expected = downsample_row_by_row(visible['Data'], visible['valor'], freq)
+    ok = all(same_values(expected[col], reduced[col]) for col in ['Data', 'valor', 'y_min', 'y_max', 'n'])
+    # Os extremos da série continuam visíveis no envelope
+    ok = ok and np.isclose(reduced['y_max'].max(), visible['valor'].max()) and np.isclose(reduced['y_min'].min(), visible['valor'].min())
+    check(f"{label}: agregação por {level} ({len(visible)} -> {len(reduced)} pontos)", ok and len(reduced) <= max_points)
+
+print()
+print('--- Série com pesos (histograma) ---')
+# Valores arredondados repetem-se: cada (data, valor) passa a uma linha com a contagem
+rounded = series.assign(valor=series['valor'].round())
+histogram = rounded.groupby(['Data', 'valor'], dropna=False).size().rename('n').reset_index()
+check(f"Histograma mais curto que a série ({len(rounded)} -> {len(histogram)} linhas)", len(histogram) < len(rounded))
+for max_points, date_range in cases:
+    label = f"max_points={max_points}" + (f", intervalo {date_range[0]}..{date_range[1]}" if date_range else '')
+    expected, expected_level = downsample_series(rounded, 'Data', 'valor', max_points=max_points, date_range=date_range)
+    reduced, level = downsample_series(histogram, 'Data', 'valor', max_points=max_points, date_range=date_range, weight='n')
+    if expected_level is None:
+        check(f"{label}: sem agregação, como a série", level is None)
+        continue
+    ok = level == expected_level and all(same_values(expected[col], reduced[col]) for col in ['Data', 'valor', 'y_min', 'y_max', 'n'])
+    check(f"{label}: igual à série linha a linha (por {level})", ok)
+
+print()
+print('--- choose_aggregation_level ---')
+check("Pontos dentro do orçamento: sem agregação", choose_aggregation_level(dates[:100], 1500) is None)
+check("n_points decide em vez do número de datas", choose_aggregation_level(dates[:100], 1500, n_points=5000) is not None)
+check("Período longo com orçamento pequeno: por mês", choose_aggregation_level(dates, 100) == ('M', 'mês'))
+
+print()
+print(f"{'✅ Todas as comparações coincidem' if not failures else f'❌ {len(failures)} comparações diferentes'}")
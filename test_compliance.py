@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+import sys
+from datetime import datetime
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.rules_engine import RulesEngine
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+SECTORS = ['Produção', 'Administrativo', 'Vendas', 'Logística']
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma comparação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+def same_values(expected, result):
+    """Igualdade de valores (números com tolerância, NaN/None iguais entre si)."""
+    expected, result = pd.Series(expected, dtype=object).reset_index(drop=True), pd.Series(result, dtype=object).reset_index(drop=True)
+    if len(expected) != len(result):
+        return False
+    for a, b in zip(expected, result):
+        if pd.isna(a) and pd.isna(b):
+            continue
+        if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)) and not isinstance(a, bool):
+            if not np.isclose(float(a), float(b)):
+                return False
+        elif a != b:
+            return False
+    return True
+
+def same_dict(expected, result):
+    """Chaves de `expected` com os mesmos valores em `result`."""
+    different = [key for key in expected if not same_values([expected[key]], [result.get(key)])]
+    return not different, different
+
+def load_processed(filename, sector):
+    """CSV processado como na aplicação: regras do setor e métricas de compatibilidade."""
+    df = CSVProcessor().load_and_process_csv(MockFile(filename))
+    df = CSVProcessor().apply_sector_rules(df, sector)
+    return calculate_legacy_metrics(df, sector)
+
+def compliance_row_by_row(df, rules):
+    """RulesEngine.analyze_compliance antigo, linha a linha (horas, pontualidade, extras e resumo)."""
+    work_days = df[df['dia_trabalho'] == True].copy()
+    target_hours = rules['horas_diarias_objetivo']
+    
+    deficit_days = work_days[work_days['horas_efetivas_num'] < target_hours]
+    daily = {
+        'total_dias': len(work_days),
+        'dias_conformes': len(work_days[work_days['horas_efetivas_num'] >= target_hours]),
+        'media_horas_diarias': work_days['horas_efetivas_num'].mean(),
+        'deficit_total_horas': target_hours * len(deficit_days) - deficit_days['horas_efetivas_num'].sum(),
+        'dias_com_deficit': len(deficit_days),
+    }
+    daily['percentual_conformidade'] = daily['dias_conformes'] / daily['total_dias'] * 100 if daily['total_dias'] else 0
+    
+    delays = []
+    for _, row in work_days.iterrows():
+        if row['primeiro_e1']:
+            try:
+                entry_time = datetime.strptime(row['primeiro_e1'], '%H:%M').time()
+                standard_time = datetime.strptime(rules['hora_entrada_padrao'], '%H:%M').time()
+                delay = (entry_time.hour * 60 + entry_time.minute) - (standard_time.hour * 60 + standard_time.minute)
+                delays.append(max(0, delay))
+            except (TypeError, ValueError):
+                continue
+    late_days = len([d for d in delays if d > rules['tolerancia_atraso_minutos']])
+    punctuality = {
+        'total_dias_analisados': len(delays),
+        'dias_com_atraso': late_days,
+        'percentual_pontualidade': ((len(delays) - late_days) / len(delays) * 100) if delays else 100,
+        'atraso_medio_minutos': sum(delays) / len(delays) if delays else 0,
+        'maior_atraso_minutos': max(delays) if delays else 0,
+        'tolerancia_configurada': rules['tolerancia_atraso_minutos'],
+    }
+    
+    overtime = work_days[work_days['horas_efetivas_num'] > target_hours].copy()
+    overtime['horas_extras'] = overtime['horas_efetivas_num'] - target_hours
+    extras = {
+        'dias_com_horas_extras': len(overtime),
+        'total_horas_extras': overtime['horas_extras'].sum() if not overtime.empty else 0,
+        'media_horas_extras': overtime['horas_extras'].mean() if not overtime.empty else 0,
+        'dias_excesso_limite': len(overtime[overtime['horas_extras'] > rules['max_horas_extras_dia']]),
+        'limite_configurado': rules['max_horas_extras_dia'],
+    }
+    
+    total_hours = work_days['horas_efetivas_num'].sum()
+    expected_hours = len(work_days) * target_hours
+    summary = {
+        'total_dias_trabalho': len(work_days),
+        'total_horas_trabalhadas': total_hours,
+        'total_horas_esperadas': expected_hours,
+        'diferenca_horas': total_hours - expected_hours,
+        'score_conformidade': (punctuality['percentual_pontualidade'] + daily['percentual_conformidade']) / 2,
+    }
+    return {'horas_diarias': daily, 'pontualidade': punctuality, 'horas_extras': extras, 'resumo': summary}
+
+print('=== TESTE DA ANÁLISE DE CONFORMIDADE ===')
+print()
+
+rules_engine = RulesEngine()
+frames = {name: load_processed(name, 'Produção') for name in SAMPLE_FILES}
+
+for name in SAMPLE_FILES:
+    df = frames[name]
+    for sector in SECTORS:
+        expected = compliance_row_by_row(df, rules_engine.get_rules(sector))
+        result = rules_engine.analyze_compliance(df, sector)
+        different = [f"{section}.{key}" for section in expected for key in same_dict(expected[section], result[section])[1]]
+        check(f"{name} [{sector}]", not different, different)
+
+# DataFrame misto: cada linha usa os limites do seu setor
+mixed = pd.concat([frames[name].assign(Setor=sector) for name, sector in zip(SAMPLE_FILES, SECTORS)], ignore_index=True)
+result = rules_engine.analyze_compliance(mixed, sector_column='Setor')
+parts = [compliance_row_by_row(frames[name], rules_engine.get_rules(sector)) for name, sector in zip(SAMPLE_FILES, SECTORS)]
+totals = {
+    ('horas_diarias', 'dias_conformes'): sum(part['horas_diarias']['dias_conformes'] for part in parts),
+    ('horas_diarias', 'deficit_total_horas'): sum(part['horas_diarias']['deficit_total_horas'] for part in parts),
+    ('pontualidade', 'dias_com_atraso'): sum(part['pontualidade']['dias_com_atraso'] for part in parts),
+    ('horas_extras', 'dias_excesso_limite'): sum(part['horas_extras']['dias_excesso_limite'] for part in parts),
+    ('resumo', 'total_horas_esperadas'): sum(part['resumo']['total_horas_esperadas'] for part in parts),
+}
+different = [f"{section}.{key}" for (section, key), value in totals.items() if not same_values([value], [result[section][key]])]
+check("Setores misturados (limites por linha)", not different, different)
+
+print()
+print(f"{'✅ Todas as comparações coincidem' if not failures else f'❌ {len(failures)} comparações diferentes'}")
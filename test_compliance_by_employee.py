@@ -0,0 +1,109 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.rules_engine import RulesEngine
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+# Coluna da tabela -> (secção, chave) do resultado de analyze_compliance
+TABLE_KEYS = {
+    'total_dias_trabalho': ('resumo', 'total_dias_trabalho'),
+    'dias_conformes': ('horas_diarias', 'dias_conformes'),
+    'percentual_conformidade': ('horas_diarias', 'percentual_conformidade'),
+    'media_horas_diarias': ('horas_diarias', 'media_horas_diarias'),
+    'deficit_total_horas': ('horas_diarias', 'deficit_total_horas'),
+    'dias_com_deficit': ('horas_diarias', 'dias_com_deficit'),
+    'total_dias_analisados': ('pontualidade', 'total_dias_analisados'),
+    'dias_com_atraso': ('pontualidade', 'dias_com_atraso'),
+    'percentual_pontualidade': ('pontualidade', 'percentual_pontualidade'),
+    'atraso_medio_minutos': ('pontualidade', 'atraso_medio_minutos'),
+    'maior_atraso_minutos': ('pontualidade', 'maior_atraso_minutos'),
+    'dias_com_horas_extras': ('horas_extras', 'dias_com_horas_extras'),
+    'total_horas_extras': ('horas_extras', 'total_horas_extras'),
+    'dias_excesso_limite': ('horas_extras', 'dias_excesso_limite'),
+    'total_horas_trabalhadas': ('resumo', 'total_horas_trabalhadas'),
+    'total_horas_esperadas': ('resumo', 'total_horas_esperadas'),
+    'diferenca_horas': ('resumo', 'diferenca_horas'),
+    'score_conformidade': ('resumo', 'score_conformidade'),
+    'status_geral': ('resumo', 'status_geral'),
+}
+
+def load_employee(filename, numero, sector):
+    """CSV processado com as regras do setor, atribuído a um funcionário."""
+    df = CSVProcessor().load_and_process_csv(MockFile(filename))
+    df = calculate_legacy_metrics(CSVProcessor().apply_sector_rules(df, sector), sector)
+    df['Numero'] = pd.Series([numero] * len(df), index=df.index, dtype=object)
+    df['Departamento'] = sector
+    return df
+
+def table_by_loop(engine, df, period):
+    """Tabela esperada: analyze_compliance para cada funcionário e período."""
+    keys = df['Numero'].map(lambda value: str(int(float(value))))
+    periods = pd.to_datetime(df['Data']).dt.to_period(period).astype(str) if period else pd.Series('Total', index=df.index)
+    work = df['dia_trabalho'] == True
+    rows = {}
+    for (numero, periodo), group in df[work].groupby([keys[work], periods[work]]):
+        analysis = engine.analyze_compliance(group, sector_column='Departamento')
+        rows[(numero, periodo)] = {column: analysis[section][key] for column, (section, key) in TABLE_KEYS.items()}
+    return rows
+
+def same_value(a, b):
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    return (pd.isna(a) and pd.isna(b)) or np.isclose(float(a), float(b))
+
+def compare(label, table, expected):
+    """Mostra se a tabela tem as mesmas linhas e valores que o ciclo."""
+    keys = list(zip(table['Numero'], table['periodo']))
+    different = [] if sorted(keys) == sorted(expected) else ['linhas']
+    for row in table.itertuples(index=False):
+        reference = expected.get((row.Numero, row.periodo), {})
+        different += [f"{row.Numero}/{row.periodo}.{column}" for column in TABLE_KEYS
+                      if column not in reference or not same_value(reference[column], getattr(row, column))]
+    status = '✅' if not different else '❌'
+    print(f"{status} {label}: {len(table)} linhas" + (f", diferenças em {different[:5]}" if different else ''))
+    return not different
+
+# Os processos de n_jobs podem importar este ficheiro (Windows): só correr o teste no processo principal
+if __name__ == '__main__':
+    print('=== TESTE DA CONFORMIDADE POR FUNCIONÁRIO E PERÍODO ===')
+    print()
+    
+    # O funcionário 138 aparece como inteiro e como 138.0; o 205 tem outro setor
+    df = pd.concat([
+        load_employee('Hugo Abril.csv', 138, 'Produção'),
+        load_employee('Hugo Maio.csv', 138.0, 'Produção'),
+        load_employee('Hugo Junho.csv', '205', 'Administrativo'),
+        load_employee('Hugo Julho 1.csv', 205, 'Administrativo'),
+        load_employee('Hugo Maio.csv', 311, 'Logística'),
+    ], ignore_index=True)
+    engine = RulesEngine()
+    
+    all_ok = True
+    for period in ['M', 'W', None]:
+        expected = table_by_loop(engine, df, period)
+        table = engine.analyze_compliance_by_employee(df, period=period)
+        all_ok &= compare(f"Período {period or 'total'}", table, expected)
+    
+    # Partições por funcionário em processos separados dão a mesma tabela
+    table = engine.analyze_compliance_by_employee(df, period='M', n_jobs=2)
+    all_ok &= compare('Período M com n_jobs=2', table, table_by_loop(engine, df, 'M'))
+    
+    status = '✅' if set(table['Numero']) == {'138', '205', '311'} else '❌'
+    print(f"{status} Funcionários {sorted(set(table['Numero']))} (138 e 138.0 são o mesmo)")
+    
+    print()
+    print('✅ Tabela igual à análise por funcionário' if all_ok and status == '✅' else '❌ Tabela diferente da análise por funcionário')
@@ -0,0 +1,98 @@
+import json
+import os
+import pandas as pd
+import numpy as np
+import sys
+import tempfile
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.rules_engine import RulesEngine
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+SECTOR = 'Produção'
+GRID = {
+    'tolerancia_atraso_minutos': [0, 5, 30],
+    'alerta_almoco_longo': [45, 60, 90],
+    'horas_diarias_objetivo': [7.0, 8.0, 9.0],
+    'max_horas_extras_dia': [0.25, 3.0],
+}
+
+# Coluna da simulação -> função do resultado de analyze_compliance
+SWEEP_KEYS = {
+    'dias_conformes': lambda a: a['horas_diarias']['dias_conformes'],
+    'percentual_conformidade': lambda a: a['horas_diarias']['percentual_conformidade'],
+    'deficit_total_horas': lambda a: a['horas_diarias']['deficit_total_horas'],
+    'total_dias_analisados': lambda a: a['pontualidade']['total_dias_analisados'],
+    'dias_com_atraso': lambda a: a['pontualidade']['dias_com_atraso'],
+    'percentual_pontualidade': lambda a: a['pontualidade']['percentual_pontualidade'],
+    'dias_excesso_limite': lambda a: a['horas_extras']['dias_excesso_limite'],
+    'dias_almoco_longo': lambda a: a['alertas_regras']['almoco_longo']['dias'],
+    'total_horas_trabalhadas': lambda a: a['resumo']['total_horas_trabalhadas'],
+    'total_horas_esperadas': lambda a: a['resumo']['total_horas_esperadas'],
+    'diferenca_horas': lambda a: a['resumo']['diferenca_horas'],
+    'score_conformidade': lambda a: a['resumo']['score_conformidade'],
+    'status_geral': lambda a: a['resumo']['status_geral'],
+}
+
+def same_value(a, b):
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    return np.isclose(float(a), float(b))
+
+print('=== TESTE DA SIMULAÇÃO "E SE" DAS REGRAS ===')
+print()
+
+df = pd.concat([
+    calculate_legacy_metrics(CSVProcessor().apply_sector_rules(CSVProcessor().load_and_process_csv(MockFile(name)), SECTOR), SECTOR)
+    for name in SAMPLE_FILES
+], ignore_index=True)
+
+engine = RulesEngine()
+sweep = engine.sweep_compliance(df, GRID, sector=SECTOR)
+status = '✅' if len(sweep) == np.prod([len(values) for values in GRID.values()]) else '❌'
+print(f"{status} {len(sweep)} cenários (produto da grelha)")
+
+# Cada cenário: regras do setor com os valores do cenário, importadas num motor novo
+base_rules = engine.get_rules(SECTOR)
+different = []
+with tempfile.TemporaryDirectory() as workdir:
+    path = os.path.join(workdir, 'cenario.json')
+    for scenario in sweep.itertuples(index=False):
+        values = {key: getattr(scenario, key) for key in GRID}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**base_rules, **{key: float(value) for key, value in values.items()}}, f, ensure_ascii=False)
+        scenario_engine = RulesEngine()
+        scenario_engine.import_rules(path, SECTOR)
+        analysis = scenario_engine.analyze_compliance(df, SECTOR)
+        different += [f"{values}: {key}" for key, expected in SWEEP_KEYS.items()
+                      if not same_value(expected(analysis), getattr(scenario, key))]
+
+status = '✅' if not different else '❌'
+print(f"{status} Cada cenário igual a analyze_compliance com as regras do cenário" + (f": {different[:3]}" if different else ''))
+
+# Os três limites pedidos mudam de facto os resultados na grelha
+varying = {key: sweep.groupby(key)[column].mean().nunique() > 1
+           for key, column in [('tolerancia_atraso_minutos', 'dias_com_atraso'),
+                               ('alerta_almoco_longo', 'dias_almoco_longo'),
+                               ('horas_diarias_objetivo', 'dias_conformes')]}
+status = '✅' if all(varying.values()) else '❌'
+print(f"{status} Resultados variam com os limites da grelha: {varying}")
+
+# Sem grelha: um único cenário com as regras configuradas
+single = engine.sweep_compliance(df, {}, sector=SECTOR)
+analysis = engine.analyze_compliance(df, SECTOR)
+ok = len(single) == 1 and all(same_value(expected(analysis), single.iloc[0][key]) for key, expected in SWEEP_KEYS.items())
+print(f"{'✅' if ok else '❌'} Grelha vazia igual a analyze_compliance com as regras do setor")
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.abspath('.'))
+from utils.config_manager import CONFIG_DIR, CONFIG_PATH, ConfigManager
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return ok
+
+print('=== TESTE DA GRAVAÇÃO ATÓMICA DAS CONFIGURAÇÕES ===')
+print()
+
+# Trabalhar numa pasta temporária para não tocar em config/horarios.json
+original_cwd = os.getcwd()
+results = []
+with tempfile.TemporaryDirectory() as workdir:
+    os.chdir(workdir)
+    try:
+        # Duas sessões carregam a mesma versão
+        session_a, session_b = ConfigManager(), ConfigManager()
+        
+        config = dict(session_a.get_sector_config('Produção'), tolerancia_entrada=12)
+        session_a.update_sector_config('Produção', config)
+        results.append(check('Sessão A grava a versão 1', session_a.save_config() and session_a.version == 1))
+        
+        # A sessão B gravaria por cima da alteração de A: a gravação é recusada
+        config = dict(session_b.get_sector_config('Produção'), tolerancia_entrada=20)
+        session_b.update_sector_config('Produção', config)
+        saved = session_b.save_config()
+        results.append(check('Sessão B recusada com save_conflict', not saved and session_b.save_conflict))
+        
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        results.append(check('Ficheiro mantém os dados de A',
+                             data['versao'] == 1 and data['horarios_setor']['Produção']['tolerancia_entrada'] == 12))
+        leftovers = [name for name in os.listdir(CONFIG_DIR) if name.endswith('.tmp')]
+        results.append(check('Sem ficheiros temporários deixados', not leftovers))
+        
+        # Depois de recarregar, B vê os dados de A e volta a poder gravar
+        session_b.reload_config()
+        results.append(check('Sessão B recarregada com os dados de A',
+                             not session_b.save_conflict and session_b.version == 1
+                             and session_b.get_sector_config('Produção')['tolerancia_entrada'] == 12))
+        config = dict(session_b.get_sector_config('Produção'), tolerancia_entrada=20)
+        session_b.update_sector_config('Produção', config)
+        results.append(check('Sessão B grava a versão 2 depois de recarregar',
+                             session_b.save_config() and session_b.version == 2))
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        results.append(check('Ficheiro com os dados de B',
+                             data['versao'] == 2 and data['horarios_setor']['Produção']['tolerancia_entrada'] == 20))
+        
+        # A sessão A ficou desatualizada
+        results.append(check('Sessão A desatualizada recusada', not session_a.save_config() and session_a.save_conflict))
+        
+        # Várias sessões da mesma versão a gravar ao mesmo tempo: o bloqueio
+        # torna a verificação da versão e a troca do ficheiro uma só operação
+        sessions = [ConfigManager() for _ in range(8)]
+        for k, session in enumerate(sessions):
+            config = dict(session.get_sector_config('Produção'), tolerancia_entrada=30 + k)
+            session.update_sector_config('Produção', config)
+        start = threading.Barrier(len(sessions))
+        saved = [None] * len(sessions)
+        
+        def save(k):
+            start.wait()
+            saved[k] = sessions[k].save_config()
+        
+        threads = [threading.Thread(target=save, args=(k,)) for k in range(len(sessions))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        winner = saved.index(True) if True in saved else None
+        results.append(check('Gravações simultâneas: só uma aceite, as outras com save_conflict',
+                             saved.count(True) == 1 and data['versao'] == 3
+                             and data['horarios_setor']['Produção']['tolerancia_entrada'] == 30 + winner
+                             and all(sessions[k].save_conflict for k in range(len(sessions)) if k != winner)))
+    finally:
+        os.chdir(original_cwd)
+
+print()
+print('✅ Gravação atómica correta' if all(results) else '❌ Problemas na gravação atómica')
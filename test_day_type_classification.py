@@ -0,0 +1,80 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.day_type_manager import DayTypeManager
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+PUNCH_COLUMNS = ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
+
+def load_processed(filename, sector='Produção'):
+    """CSV processado como na aplicação: regras do setor e métricas de compatibilidade."""
+    df = CSVProcessor().load_and_process_csv(MockFile(filename))
+    df = CSVProcessor().apply_sector_rules(df, sector)
+    return calculate_legacy_metrics(df, sector)
+
+def create_synthetic_data(n_rows, seed=0):
+    """Picagens variadas (0 a 8, algumas inválidas), com e sem tipo de dia, ao longo de um ano."""
+    rng = np.random.default_rng(seed)
+    tipos = ['Normal', 'Folga', 'Férias', 'Falta', 'Feriado', 'Com extra', 'Falta parcial', '', '', '']
+    rows = []
+    for i in range(n_rows):
+        count = int(rng.choice([0, 1, 2, 2, 3, 4, 4, 4, 5, 6, 6, 7, 8, 8]))
+        # Picagens crescentes; com 2 picagens o dia tem entre 2 e 13 horas
+        gaps = [int(rng.integers(120, 780))] if count == 2 else rng.integers(5, 240, size=7).tolist()
+        times = np.cumsum([int(rng.integers(360, 600))] + gaps).tolist()
+        values = ['00:00'] * 8
+        for k in range(count):
+            values[k] = f'{times[k] % 1440 // 60:02d}:{times[k] % 60:02d}'
+        if rng.random() < 0.05:
+            values[int(rng.integers(0, 8))] = 'xx'
+        rows.append({
+            'Numero': i % 20,
+            'Departamento': 'Produção',
+            'Data': pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(rng.integers(0, 365))),
+            'Tipo': tipos[rng.integers(0, len(tipos))],
+            **dict(zip(PUNCH_COLUMNS, values))
+        })
+    return pd.DataFrame(rows)
+
+print('=== TESTE DA CLASSIFICAÇÃO DOS TIPOS DE DIA ===')
+print()
+
+manager = DayTypeManager()
+frames = {name: load_processed(name) for name in SAMPLE_FILES}
+frames.update({f"{name} sem Tipo": load_processed(name).assign(Tipo='') for name in SAMPLE_FILES[:2]})
+frames['Sintético (400 linhas)'] = create_synthetic_data(400)
+synthetic = create_synthetic_data(400, seed=1)
+synthetic['Tipo'] = ''
+frames['Sintético sem Tipo'] = synthetic
+
+all_ok = True
+for name, df in frames.items():
+    expected = pd.Series([manager.classify_day_automatically(row) for _, row in df.iterrows()], index=df.index)
+    result = manager.classify_days(df)
+    different = int((expected != result).sum())
+    status = '✅' if result.index.equals(df.index) and not different else '❌'
+    all_ok = all_ok and status == '✅'
+    print(f"{status} {name}: {len(df)} linhas" + (f", {different} diferentes" if different else ''))
+
+# Sem Tipo todas as regras de deteção são usadas
+detected = set(manager.classify_days(synthetic))
+status = '✅' if detected == set(manager.auto_detection_rules) else '❌'
+print(f"{status} Tipos detetados sem Tipo: {sorted(detected)}")
+
+print()
+print('✅ Classificação igual à linha a linha' if all_ok else '❌ Classificação diferente da linha a linha')
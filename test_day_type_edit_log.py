@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from utils.csv_processor import CSVProcessor
+from utils.day_type_manager import DayTypeEditLog
+from utils.punch_profile import PunchProfileIndex
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+class RecordingProcessor(CSVProcessor):
+    """CSVProcessor que regista os rótulos de cada chamada a reprocess_rows."""
+    calls = []
+    
+    def reprocess_rows(self, df, index, sector="default", recompute=None):
+        RecordingProcessor.calls.append(sorted(index))
+        return super().reprocess_rows(df, index, sector, recompute=recompute)
+
+SECTOR = 'Produção'
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma verificação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+def same_types(df, expected):
+    """Coluna Tipo igual à lista esperada (comparada como texto)."""
+    return df['Tipo'].astype(object).tolist() == list(expected)
+
+print('=== TESTE DO REGISTO DE ALTERAÇÕES DE TIPOS DE DIA ===')
+print()
+
+profile = PunchProfileIndex()
+df = CSVProcessor(punch_profile=profile).apply_sector_rules(CSVProcessor().load_and_process_csv(MockFile('Hugo Maio.csv')), SECTOR)
+original = df['Tipo'].astype(object).tolist()
+log = DayTypeEditLog(processor=RecordingProcessor(punch_profile=profile))
+
+print('--- Aplicar ---')
+# Os primeiros dias passam a um tipo que ainda não é categoria da coluna
+target = np.zeros(len(df), dtype=bool)
+target[:6] = True
+edited = df.index[target]
+check("'Licença parental' ainda não é categoria de Tipo", 'Licença parental' not in df['Tipo'].cat.categories)
+changed = log.apply(df, target, 'Tipo', 'Licença parental', 'Licença', sector=SECTOR)
+after_first = ['Licença parental' if target[i] else value for i, value in enumerate(original)]
+check(f"{changed} linhas alteradas", changed == len(edited))
+check('Tipo alterado só nas linhas pedidas', same_types(df, after_first))
+check('Tipo continua categórico, com a nova categoria',
+      isinstance(df['Tipo'].dtype, pd.CategoricalDtype) and 'Licença parental' in df['Tipo'].cat.categories)
+check('reprocess_rows só com as linhas alteradas', RecordingProcessor.calls == [sorted(edited)], str(RecordingProcessor.calls))
+
+# Uma segunda operação, sobre outras linhas e com valores por linha
+second = df.index[[10, 12, 14]]
+log.apply(df, second, 'Tipo', ['Falta', 'Feriado', 'Falta'], 'Faltas', sector=SECTOR)
+after_second = list(after_first)
+for label, value in zip(second, ['Falta', 'Feriado', 'Falta']):
+    after_second[df.index.get_loc(label)] = value
+check('Segunda operação aplicada', same_types(df, after_second) and log.history() == ['Licença', 'Faltas'])
+
+print('--- Desfazer e refazer ---')
+RecordingProcessor.calls.clear()
+check('Desfazer devolve a descrição', log.undo(df, sector=SECTOR) == 'Faltas')
+check('Desfazer repõe o Tipo anterior', same_types(df, after_first))
+check('Desfazer reprocessa só as linhas da operação', RecordingProcessor.calls == [sorted(second)], str(RecordingProcessor.calls))
+log.undo(df, sector=SECTOR)
+check('Desfazer tudo repõe o Tipo original', same_types(df, original) and not log.can_undo and log.can_redo)
+check('Nada mais para desfazer', log.undo(df, sector=SECTOR) is None)
+
+RecordingProcessor.calls.clear()
+check('Refazer devolve a descrição', log.redo(df, sector=SECTOR) == 'Licença')
+check('Refazer volta a aplicar a operação', same_types(df, after_first))
+check('Refazer reprocessa só as linhas da operação', RecordingProcessor.calls == [sorted(edited)], str(RecordingProcessor.calls))
+
+# Os resultados das regras nas linhas editadas são iguais a reprocessar o DataFrame inteiro
+full = CSVProcessor(punch_profile=profile).apply_sector_rules(df.copy(), SECTOR)
+different = [col for col in full.columns if col in df.columns
+             and not full[col].astype(object).fillna('').equals(df[col].astype(object).fillna(''))]
+check('Linhas reprocessadas iguais ao processamento completo', not different, str(different))
+
+print('--- Nova operação descarta as desfeitas ---')
+check('Ainda há uma operação para refazer', log.can_redo)
+log.apply(df, df.index[[20]], 'Tipo', 'Com extra', 'Extra', sector=SECTOR)
+check('A operação desfeita deixa de poder ser refeita', not log.can_redo and log.redo(df, sector=SECTOR) is None)
+check('Histórico só com as operações aplicadas', log.history() == ['Licença', 'Extra'], str(log.history()))
+log.undo(df, sector=SECTOR)
+log.undo(df, sector=SECTOR)
+check('Desfazer tudo repõe o Tipo original', same_types(df, original))
+
+RecordingProcessor.calls.clear()
+check('Valor igual ao atual não é registado', log.apply(df, df.index[[0]], 'Tipo', original[0], sector=SECTOR) == 0)
+check('Sem reprocessamento sem alterações', RecordingProcessor.calls == [])
+
+print()
+print('✅ Registo de alterações correto' if not failures else f'❌ {len(failures)} verificações falharam')
@@ -0,0 +1,118 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.day_type_manager import DayTypeManager
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+
+def load_employee(filename, numero):
+    """CSV processado como na aplicação, atribuído a um funcionário."""
+    df = CSVProcessor().load_and_process_csv(MockFile(filename))
+    df = calculate_legacy_metrics(CSVProcessor().apply_sector_rules(df, 'Produção'), 'Produção')
+    df['Numero'] = pd.Series([numero] * len(df), index=df.index, dtype=object)
+    return df
+
+def summary_by_loop(manager, df):
+    """Resumo por tipo de dia como na versão antiga: calculate_expected_metrics linha a linha."""
+    types = pd.Series([manager.classify_day_automatically(row) for _, row in df.iterrows()], index=df.index)
+    summary = {}
+    for day_type, count in types.value_counts().items():
+        metrics = [manager.calculate_expected_metrics(row, day_type) for _, row in df[types == day_type].iterrows()]
+        total_hours = sum(m['actual_hours'] for m in metrics)
+        summary[day_type] = {
+            'count': count,
+            'total_hours': total_hours,
+            'avg_hours': total_hours / count,
+            'compliance_rate': sum(m['compliance'] for m in metrics) / count,
+            'total_alerts': sum(len(m['alerts']) for m in metrics),
+        }
+    return summary
+
+def breakdown_by_loop(manager, df):
+    """Resumo por funcionário (138 e 138.0 são o mesmo) e tipo de dia, linha a linha."""
+    groups = {}
+    for _, row in df.iterrows():
+        day_type = manager.classify_day_automatically(row)
+        metrics = manager.calculate_expected_metrics(row, day_type)
+        groups.setdefault((str(int(float(row['Numero']))), day_type), []).append(metrics)
+    return {
+        key: {
+            'dias': len(metrics),
+            'total_horas': sum(m['actual_hours'] for m in metrics),
+            'media_horas': sum(m['actual_hours'] for m in metrics) / len(metrics),
+            'taxa_conformidade': sum(m['compliance'] for m in metrics) / len(metrics),
+            'total_alertas': sum(len(m['alerts']) for m in metrics),
+        }
+        for key, metrics in groups.items()
+    }
+
+def different_keys(expected, result):
+    """Chaves de `expected` com valores diferentes em `result` (vazia se iguais)."""
+    return [key for key, value in expected.items() if not np.isclose(float(value), float(result[key]))]
+
+print('=== TESTE DO RESUMO DE TIPOS DE DIA ===')
+print()
+
+manager = DayTypeManager()
+
+# O funcionário 138 aparece como inteiro e como 138.0; metade dos dias sem Tipo
+df = pd.concat([
+    load_employee('Hugo Abril.csv', 138),
+    load_employee('Hugo Maio.csv', 138.0),
+    load_employee('Hugo Junho.csv', '205'),
+    load_employee('Hugo Julho 1.csv', 205).assign(Tipo=''),
+], ignore_index=True)
+
+print('--- Métricas por dia (_day_type_metrics) ---')
+typed = df.assign(Tipo_Final=manager.classify_days(df))
+metrics = manager._day_type_metrics(typed)
+expected = [manager.calculate_expected_metrics(row, row['Tipo_Final']) for _, row in typed.iterrows()]
+checks = {
+    'actual_hours': np.allclose([m['actual_hours'] for m in expected], metrics['actual_hours']),
+    'compliance': [m['compliance'] for m in expected] == metrics['compliance'].tolist(),
+    'alerts': [len(m['alerts']) for m in expected] == metrics['alerts'].tolist(),
+}
+status = '✅' if all(checks.values()) else '❌'
+print(f"{status} Horas, conformidade e alertas iguais a calculate_expected_metrics: {checks}")
+
+print('--- Resumo por tipo (create_day_type_summary) ---')
+summary = manager.create_day_type_summary(df)
+reference = summary_by_loop(manager, df)
+status = '✅' if list(summary) == list(reference) else '❌'
+print(f"{status} Tipos pela ordem de frequência: {list(summary)}")
+all_ok = status == '✅'
+for day_type, values in reference.items():
+    different = different_keys(values, summary.get(day_type, {key: np.nan for key in values}))
+    status = '✅' if not different else '❌'
+    all_ok = all_ok and not different
+    print(f"{status} {day_type}: {values['count']} dias" + (f", diferente em {different}" if different else ''))
+
+print('--- Resumo por funcionário (create_day_type_breakdown) ---')
+breakdown = manager.create_day_type_breakdown(df)
+reference = breakdown_by_loop(manager, df)
+keys = list(zip(breakdown['Numero'], breakdown['Tipo']))
+status = '✅' if sorted(keys) == sorted(reference) else '❌'
+print(f"{status} Funcionários {sorted(set(breakdown['Numero']))} por tipo de dia: {len(breakdown)} linhas")
+all_ok = all_ok and status == '✅'
+different = [key for key, row in zip(keys, breakdown.to_dict('records')) if key not in reference or different_keys(reference[key], row)]
+status = '✅' if not different else '❌'
+all_ok = all_ok and not different
+print(f"{status} Dias, horas, conformidade e alertas iguais ao ciclo" + (f": {different[:3]}" if different else ''))
+
+print()
+print('✅ Resumo igual ao cálculo linha a linha' if all_ok and all(checks.values()) else '❌ Resumo diferente do cálculo linha a linha')
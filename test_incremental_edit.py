@@ -0,0 +1,71 @@
+import pandas as pd
+import sys
+sys.path.append('.')
+from utils.csv_processor import CSVProcessor
+from utils.punch_profile import PunchProfileIndex
+from utils.sector_rules_memo import SectorRulesMemo
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+class CountingProcessor(CSVProcessor):
+    """CSVProcessor que regista o número de linhas de cada chamada a apply_sector_rules."""
+    calls = []
+    
+    def apply_sector_rules(self, df, sector="default"):
+        CountingProcessor.calls.append(len(df))
+        return super().apply_sector_rules(df, sector)
+
+def edit_punch(df, processor, memo, idx, column, value, sector, register=True):
+    """Corrige uma picagem como os editores da aplicação: reprocessa a linha e regista o resultado."""
+    df.loc[idx, column] = value
+    df = processor.reprocess_rows(df, [idx], sector)
+    if register:
+        memo.record(df, sector, processor.punch_profile)
+    return df
+
+print('=== TESTE DA EDIÇÃO INCREMENTAL DE PICAGENS ===')
+print()
+
+sector = 'Produção'
+df = CSVProcessor().load_and_process_csv(MockFile('Hugo Maio.csv'))
+profile = PunchProfileIndex()
+memo = SectorRulesMemo()
+
+# Carregamento: as regras do setor são aplicadas uma vez ao DataFrame inteiro
+df = memo.apply(CountingProcessor(punch_profile=profile), df, sector)
+df = memo.apply(CountingProcessor(punch_profile=profile), df, sector)
+status = '✅' if CountingProcessor.calls == [len(df)] else '❌'
+print(f"{status} Carregamento + rerun: chamadas {CountingProcessor.calls}")
+
+# Edição: só a linha editada é reprocessada e o rerun seguinte encontra o resultado na memória
+CountingProcessor.calls.clear()
+idx = df.index[3]
+df = edit_punch(df, CountingProcessor(punch_profile=profile), memo, idx, 'E1', '09:10', sector)
+df = memo.apply(CountingProcessor(punch_profile=profile), df, sector)
+status = '✅' if CountingProcessor.calls == [1] else '❌'
+print(f"{status} Edição + rerun: chamadas {CountingProcessor.calls} (esperado [1])")
+
+# O resultado incremental é igual a reprocessar o DataFrame inteiro
+full = CSVProcessor(punch_profile=profile).apply_sector_rules(df.copy(), sector)
+try:
+    pd.testing.assert_frame_equal(df, full[df.columns], check_dtype=False, check_categorical=False)
+    print("✅ Resultado incremental igual ao reprocessamento completo")
+except AssertionError as e:
+    print(f"❌ Resultado incremental diferente do reprocessamento completo: {e}")
+
+# Sem registar o resultado, o rerun volta a processar o DataFrame inteiro
+CountingProcessor.calls.clear()
+df = edit_punch(df, CountingProcessor(punch_profile=profile), memo, idx, 'E1', '09:20', sector, register=False)
+df = memo.apply(CountingProcessor(punch_profile=profile), df, sector)
+status = '✅' if CountingProcessor.calls == [1, len(df)] else '❌'
+print(f"{status} Edição sem registo + rerun: chamadas {CountingProcessor.calls} (esperado [1, {len(df)}])")
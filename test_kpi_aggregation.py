@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from utils.kpi_calculator import SPECIAL_DAY_TYPES, KPICalculator
+from utils.time_utils import duration_hours
+
+HHMM_VALUES = ['8:00', '7:45', '10:05', '0:30', '41:30', '08:15', '', 'xx', 'a:b', '-', None, np.nan]
+
+def hhmm_hours_by_loop(values):
+    """Horas de texto 'H:MM' como na versão antiga (valores inválidos contam 0)."""
+    hours = []
+    for value in pd.Series(values, dtype=object).fillna('00:00'):
+        if isinstance(value, str) and ':' in value:
+            try:
+                parts = value.split(':')
+                hours.append(int(parts[0]) + int(parts[1]) / 60)
+            except ValueError:
+                hours.append(0)
+        else:
+            hours.append(0)
+    return hours
+
+def create_days(n_rows, seed=0):
+    """Dias com durações em texto (Efect, Extra), timedelta (total_trabalho) e horas numéricas."""
+    rng = np.random.default_rng(seed)
+    efect = rng.choice(np.array(HHMM_VALUES, dtype=object), n_rows)
+    return pd.DataFrame({
+        'Data': pd.Timestamp('2025-03-03') + pd.to_timedelta(rng.integers(0, 120, n_rows), unit='D'),
+        'Departamento': 'Produção',
+        'Tipo': rng.choice(['Normal', 'Normal', 'Folga', 'Férias', ''], n_rows),
+        'picagens_validas': rng.random(n_rows) > 0.2,
+        'Efect': efect,
+        'Extra': rng.choice(np.array(HHMM_VALUES, dtype=object), n_rows),
+        'total_trabalho': pd.to_timedelta(rng.choice([np.nan, 0, 400, 480, 535, 610], n_rows), unit='m'),
+        'horas_efetivas_num': rng.choice([np.nan, 0, 6.5, 8, 9.25], n_rows),
+    })
+
+def weekly_by_loop(df, hours, mask):
+    """Soma, média e contagem das horas por semana, nos dias úteis do `mask`."""
+    weeks = {}
+    for date, value, keep in zip(pd.to_datetime(df['Data']), hours, mask):
+        if keep:
+            weeks.setdefault(date.to_period('W').start_time, []).append(value)
+    return [(week, sum(values), np.mean(values), len(values)) for week, values in sorted(weeks.items())]
+
+print('=== TESTE DA AGREGAÇÃO DE DURAÇÕES H:MM DOS KPIs ===')
+print()
+
+calculator = KPICalculator()
+df = create_days(500)
+all_ok = True
+
+# Horas por linha de cada tipo de coluna
+cases = [
+    ('Efect (texto H:MM)', df.drop(columns=['total_trabalho']), hhmm_hours_by_loop(df['Efect'])),
+    ('total_trabalho (timedelta)', df, df['total_trabalho'].dt.total_seconds().fillna(0) / 3600),
+    ('horas_efetivas_num (numérica)', df.drop(columns=['total_trabalho', 'Efect']), df['horas_efetivas_num'].fillna(0)),
+]
+for label, frame, expected in cases:
+    hours = calculator._hours_by_row(frame)
+    ok = np.allclose(hours, expected)
+    all_ok &= ok
+    print(f"{'✅' if ok else '❌'} Horas por linha de {label}")
+
+# Totais dos KPIs (só dias com picagens válidas)
+for label, frame, expected in cases:
+    valid = frame['picagens_validas'].to_numpy()
+    total = calculator.calculate_main_kpis(frame)['total_hours']
+    ok = np.isclose(total, np.asarray(expected, dtype=float)[valid].sum())
+    all_ok &= ok
+    print(f"{'✅' if ok else '❌'} Total de horas de {label}: {total:.2f}h")
+
+# Horas extra: coluna Extra em texto e, sem ela, horas acima de 8h por dia
+valid = df['picagens_validas'].to_numpy()
+overtime = calculator.calculate_main_kpis(df)['overtime_hours']
+ok = np.isclose(overtime, np.array(hhmm_hours_by_loop(df['Extra']))[valid].sum())
+all_ok &= ok
+print(f"{'✅' if ok else '❌'} Horas extra da coluna Extra: {overtime:.2f}h")
+
+frame = df.drop(columns=['Extra', 'total_trabalho'])
+overtime = calculator.calculate_main_kpis(frame)['overtime_hours']
+expected = sum(max(0, hours - 8.0) for hours in np.array(hhmm_hours_by_loop(df['Efect']))[valid])
+ok = np.isclose(overtime, expected)
+all_ok &= ok
+print(f"{'✅' if ok else '❌'} Horas extra acima de 8h a partir de Efect: {overtime:.2f}h")
+
+# Horas por semana do gráfico semanal
+frame = df.drop(columns=['total_trabalho'])
+weekly = calculator._weekly_work_hours(frame, 'Efect')
+special = frame['Tipo'].str.contains('|'.join(SPECIAL_DAY_TYPES), case=False, na=False).to_numpy()
+mask = ~special & calculator._work_day_mask(frame)
+expected = weekly_by_loop(frame, hhmm_hours_by_loop(frame['Efect']), mask)
+result = list(weekly.itertuples(index=False, name=None))
+ok = (len(result) == len(expected)
+      and all(a[0] == b[0] and np.allclose(a[1:], b[1:]) for a, b in zip(result, expected)))
+all_ok &= ok
+print(f"{'✅' if ok else '❌'} Horas por semana: {len(result)} semanas")
+
+# duration_hours com texto numa coluna categórica
+categorical = duration_hours(df['Efect'].astype('category'))
+ok = np.allclose(categorical, hhmm_hours_by_loop(df['Efect']))
+all_ok &= ok
+print(f"{'✅' if ok else '❌'} duration_hours de uma coluna categórica")
+
+print()
+print('✅ Agregação igual ao cálculo linha a linha' if all_ok else '❌ Agregação diferente do cálculo linha a linha')
@@ -0,0 +1,124 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.kpi_aggregates import KPIAggregates
+from utils.kpi_calculator import KPICalculator
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma comparação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+def same_dict(expected, result):
+    """Chaves de `expected` com os mesmos valores em `result` (números com tolerância)."""
+    different = []
+    for key, a in expected.items():
+        b = result.get(key)
+        if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)):
+            same = np.isclose(float(a), float(b))
+        else:
+            same = a == b
+        if not same:
+            different.append(key)
+    return not different, different
+
+def load_processed(filename, sector):
+    """CSV processado como na aplicação: regras do setor e métricas de compatibilidade."""
+    df = CSVProcessor().load_and_process_csv(MockFile(filename))
+    df = CSVProcessor().apply_sector_rules(df, sector)
+    return calculate_legacy_metrics(df, sector)
+
+def delay_histogram_by_loop(df):
+    """Contagem de registos por (data, atraso), linha a linha (atrasos em falta contam 0)."""
+    counts = {}
+    delays = df['atraso_minutos'] if 'atraso_minutos' in df.columns else pd.Series(0, index=df.index)
+    for date, delay in zip(pd.to_datetime(df['Data']), delays):
+        if pd.isna(date):
+            continue
+        key = (date, 0.0 if pd.isna(delay) else float(delay))
+        counts[key] = counts.get(key, 0) + 1
+    return sorted((date, delay, n) for (date, delay), n in counts.items())
+
+def chart_series(fig):
+    """Dados (x, y e contagens) de cada traço de uma figura Plotly."""
+    return [(list(trace.x), list(trace.y), None if trace.customdata is None else list(trace.customdata)) for trace in fig.data]
+
+print('=== TESTE DO CUBO DE AGREGADOS DOS KPIs ===')
+print()
+
+calculator = KPICalculator()
+frames = {(name, sector): load_processed(name, sector) for name in SAMPLE_FILES for sector in ['Produção', 'Administrativo']}
+
+# Amostras juntas com atrasos e picagens inválidas variados (todas as categorias dos KPIs)
+rng = np.random.default_rng(0)
+varied = pd.concat([frames[(name, 'Produção')] for name in SAMPLE_FILES], ignore_index=True)
+varied['atraso_minutos'] = rng.choice([np.nan, 0, 0, 5, 10, 12, 16, 25, 31, 45, 90], len(varied))
+varied['picagens_validas'] = varied['picagens_validas'] & (rng.random(len(varied)) > 0.2)
+
+print('--- KPIs principais ---')
+for (name, sector), df in list(frames.items()) + [(('Amostras com atrasos variados', 'Produção'), varied)]:
+    label = f"{name} [{sector}]"
+    aggregates = KPIAggregates(df, calculator)
+    ok, different = same_dict(calculator.calculate_main_kpis(df), aggregates.kpis())
+    check(f"Cubo kpis() = calculate_main_kpis {label}", ok, different)
+
+# Edição aplicada ao cubo por delta
+df = frames[('Hugo Maio.csv', 'Produção')].copy()
+aggregates = KPIAggregates(df, calculator)
+rows = df.index[:5]
+old_rows = df.loc[rows].copy()
+df.loc[rows, 'atraso_minutos'] = [0, 45, 5, 20, 0]
+df.loc[rows, 'picagens_validas'] = [True, False, True, True, False]
+aggregates.update(old_rows, df.loc[rows])
+ok, different = same_dict(calculator.calculate_main_kpis(df), aggregates.kpis())
+check("Cubo atualizado por delta = calculate_main_kpis do DataFrame editado", ok, different)
+
+print()
+print('--- Atrasos por dia (gráfico de tendências) ---')
+for label, frame in [('Amostras com atrasos variados', varied), ('Sem atraso_minutos', varied.drop(columns=['atraso_minutos']))]:
+    histogram = KPIAggregates(frame, calculator).delay_histogram()
+    check(f"Histograma igual à contagem linha a linha ({label})",
+          list(histogram.itertuples(index=False, name=None)) == delay_histogram_by_loop(frame))
+
+check("Histograma atualizado por delta igual ao do DataFrame editado",
+      list(aggregates.delay_histogram().itertuples(index=False, name=None)) == delay_histogram_by_loop(df))
+
+# 20 funcionários com os mesmos dias: pontos suficientes para agregar o gráfico
+many = pd.concat([varied.assign(Numero=i, atraso_minutos=np.roll(varied['atraso_minutos'].to_numpy(), i))
+                  for i in range(20)], ignore_index=True)
+aggregates = KPIAggregates(many, calculator)
+for date_range in [None, ('2025-05-01', '2025-06-30')]:
+    label = f"intervalo {date_range[0]}..{date_range[1]}" if date_range else 'período completo'
+    expected = calculator.create_punctuality_trends_chart(many, date_range)
+    result = calculator.create_punctuality_trends_chart(many, date_range, aggregates)
+    check(f"Gráfico do cubo igual ao do DataFrame ({label}: {expected.layout.title.text})",
+          chart_series(expected) == chart_series(result) and expected.layout.title.text == result.layout.title.text)
+
+# Poucos pontos: o gráfico diário continua a usar as linhas do DataFrame
+small = frames[('Hugo Maio.csv', 'Produção')]
+expected = calculator.create_punctuality_trends_chart(small)
+result = calculator.create_punctuality_trends_chart(small, aggregates=KPIAggregates(small, calculator))
+check("Sem agregação: gráfico diário igual", chart_series(expected) == chart_series(result))
+
+print()
+print(f"{'✅ Todas as comparações coincidem' if not failures else f'❌ {len(failures)} comparações diferentes'}")
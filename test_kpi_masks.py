@@ -0,0 +1,132 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.config_manager import ConfigManager
+from utils.kpi_calculator import KPICalculator
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+
+def load_processed(filename, sector):
+    """CSV processado como na aplicação: regras do setor e métricas de compatibilidade."""
+    df = CSVProcessor().load_and_process_csv(MockFile(filename))
+    df = CSVProcessor().apply_sector_rules(df, sector)
+    return calculate_legacy_metrics(df, sector)
+
+# --- Versões antigas (linha a linha) usadas como referência ---
+
+def compliance_rate_row_by_row(df):
+    """Taxa de conformidade antiga (iterrows)."""
+    compliant_days = 0
+    for _, row in df.iterrows():
+        issues = 0
+        if not row.get('picagens_validas', True):
+            issues += 1
+        if row.get('atraso_minutos', 0) > 15:
+            issues += 1
+        if row.get('tipo_problema', '') not in ['', None]:
+            issues += 1
+        if issues == 0:
+            compliant_days += 1
+    return compliant_days / len(df) * 100
+
+def breakdown_row_by_row(df):
+    """Categorias do gráfico de conformidade antigo (iterrows)."""
+    categories = dict.fromkeys(['Perfeito', 'Pequenos Atrasos', 'Atrasos Moderados', 'Atrasos Graves',
+                                'Problemas de Picagem', 'Sem Dados'], 0)
+    for _, row in df.iterrows():
+        if not row.get('picagens_validas', True):
+            categories['Problemas de Picagem'] += 1
+        elif 'atraso_minutos' not in row or pd.isna(row.get('atraso_minutos')):
+            categories['Sem Dados'] += 1
+        else:
+            atraso = row.get('atraso_minutos', 0)
+            if atraso == 0:
+                categories['Perfeito'] += 1
+            elif atraso <= 10:
+                categories['Pequenos Atrasos'] += 1
+            elif atraso <= 30:
+                categories['Atrasos Moderados'] += 1
+            else:
+                categories['Atrasos Graves'] += 1
+    return {label: count for label, count in categories.items() if count > 0}
+
+def active_alerts_row_by_row(df):
+    """Alertas ativos: avisos de picagens, regras de intervalos disparadas e problemas de pontualidade."""
+    alerts = 0
+    for _, row in df.iterrows():
+        alerts += int(pd.notna(row['aviso_picagens']) and row['aviso_picagens'] != '')
+        alerts += int(row['regras_intervalos'] != 0)
+        alerts += int(pd.notna(row['tipo_problema']) and row['tipo_problema'] != '')
+    return alerts
+
+def alerts_summary_row_by_row(df):
+    """Resumo de alertas antigo; os dias úteis seguem o calendário do setor (sem feriados)."""
+    alerts = []
+    sectors = df['Departamento'] if 'Departamento' in df.columns else None
+    work_day, _ = ConfigManager().work_day_masks(df['Data'], sectors)
+    df_work = df[work_day]
+    for special_type in ['folga', 'férias', 'feriado', 'ausência', 'baixa médica']:
+        df_work = df_work[~df_work['Tipo'].str.contains(special_type, case=False, na=False)]
+    
+    for _, row in df_work[df_work['atraso_minutos'].fillna(0) > 30].iterrows():
+        alerts.append(('Atraso Grave', f"Atraso de {row['atraso_minutos']:.0f} minutos", row['Data'], 3))
+    for _, row in df_work[df_work['picagens_validas'] == False].iterrows():
+        if str(row.get('Tipo', '')).lower() not in ['falta', 'ausência']:
+            alerts.append(('Picagens Inválidas', row.get('aviso_picagens', 'Problema nas picagens'), row['Data'], 2))
+    issues = df_work[df_work['tipo_problema'].notna() & (df_work['tipo_problema'] != '') &
+                     ~df_work['tipo_problema'].astype(str).str.contains('fim de semana|folga|férias', case=False, na=False)]
+    for _, row in issues.iterrows():
+        alerts.append(('Problema de Pontualidade', row['tipo_problema'], row['Data'], 1))
+    
+    alerts.sort(key=lambda alert: (alert[3], alert[2]), reverse=True)
+    return [alert[:3] for alert in alerts[:10]]
+
+print('=== TESTE DAS MÁSCARAS DOS KPIs ===')
+print()
+
+calculator = KPICalculator()
+frames = {f"{name} [{sector}]": load_processed(name, sector) for name in SAMPLE_FILES for sector in ['Produção', 'Administrativo']}
+
+# Amostras juntas com atrasos e picagens inválidas variados (todas as categorias dos KPIs)
+rng = np.random.default_rng(0)
+varied = pd.concat([load_processed(name, 'Produção') for name in SAMPLE_FILES], ignore_index=True)
+varied['atraso_minutos'] = rng.choice([np.nan, 0, 0, 5, 10, 12, 16, 25, 31, 45, 90], len(varied))
+varied['picagens_validas'] = varied['picagens_validas'] & (rng.random(len(varied)) > 0.2)
+frames['Amostras com atrasos variados'] = varied
+
+all_ok = True
+for label, df in frames.items():
+    fig = calculator.create_compliance_breakdown_chart(df)
+    checks = {
+        'conformidade': np.isclose(compliance_rate_row_by_row(df), calculator._calculate_compliance_rate(df)),
+        'breakdown': dict(zip(fig.data[0].labels, fig.data[0].values)) == breakdown_row_by_row(df),
+        'alertas ativos': active_alerts_row_by_row(df) == calculator._count_active_alerts(df),
+        'resumo de alertas': alerts_summary_row_by_row(df) == [
+            (alert['title'], alert['message'], alert['date']) for alert in calculator.generate_alerts_summary(df)
+        ],
+    }
+    different = [name for name, ok in checks.items() if not ok]
+    all_ok = all_ok and not different
+    print(f"{'✅' if not different else '❌'} {label}: {len(df)} linhas" + (f", diferente em {different}" if different else ''))
+
+breakdown = breakdown_row_by_row(varied)
+status = '✅' if len(breakdown) == 6 else '❌'
+print(f"{status} Todas as categorias do breakdown nas amostras variadas: {sorted(breakdown)}")
+
+print()
+print('✅ KPIs iguais ao cálculo linha a linha' if all_ok and status == '✅' else '❌ KPIs diferentes do cálculo linha a linha')
@@ -0,0 +1,135 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+from app import calculate_legacy_metrics
+from utils.csv_processor import CSVProcessor
+from utils.rules_engine import RulesEngine
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+SECTOR = 'Produção'
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma comparação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+def same_values(expected, result):
+    """Igualdade de valores (números com tolerância, NaN/None iguais entre si)."""
+    expected, result = pd.Series(expected, dtype=object).reset_index(drop=True), pd.Series(result, dtype=object).reset_index(drop=True)
+    if len(expected) != len(result):
+        return False
+    for a, b in zip(expected, result):
+        if pd.isna(a) and pd.isna(b):
+            continue
+        if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)) and not isinstance(a, bool):
+            if not np.isclose(float(a), float(b)):
+                return False
+        elif a != b:
+            return False
+    return True
+
+def legacy_metrics_row_by_row(df, objetivo_horas=8.0):
+    """calculate_legacy_metrics antigo, com o objetivo diário indicado (era fixo em 8 horas)."""
+    objetivo_td = pd.Timedelta(hours=objetivo_horas)
+    
+    if 'total_trabalho' not in df.columns or df['total_trabalho'].isna().all():
+        df['total_trabalho'] = pd.Timedelta(0)
+        for idx, row in df.iterrows():
+            if row.get('picagens_validas', False):
+                try:
+                    punches = []
+                    for col in ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']:
+                        if col in row and pd.notna(row[col]) and str(row[col]) not in ['00:00', '0:00', '']:
+                            punches.append(pd.to_datetime(str(row[col]), format='%H:%M'))
+                    if len(punches) >= 4:
+                        e1, s1, e2, s2 = punches[:4]
+                        df.loc[idx, 'total_trabalho'] = (s1 - e1) + (s2 - e2)
+                except ValueError:
+                    df.loc[idx, 'total_trabalho'] = pd.Timedelta(0)
+    
+    if 'total_pausas' not in df.columns:
+        df['total_pausas'] = pd.Timedelta(0)
+    
+    df['total_trabalho_calc'] = df['total_trabalho']
+    df['total_intervalo_calc'] = df['total_pausas']
+    df['horas_efetivas_td'] = df['total_trabalho']
+    df['falta_td'] = pd.Timedelta(0)
+    df['extra_td'] = pd.Timedelta(0)
+    
+    df.loc[df['Tipo'].isin(['Falta', 'Férias', 'Folga', 'Feriado', 'Fim de semana']), 'horas_efetivas_td'] = pd.Timedelta(0)
+    work = df['Tipo'].isin(['Normal', 'Falta parcial', 'Com extra'])
+    df.loc[work, 'falta_td'] = (objetivo_td - df.loc[work, 'horas_efetivas_td']).apply(lambda x: max(x, pd.Timedelta(0)))
+    df.loc[work, 'extra_td'] = (df.loc[work, 'horas_efetivas_td'] - objetivo_td).apply(lambda x: max(x, pd.Timedelta(0)))
+    df.loc[df['Tipo'] == 'Falta', 'falta_td'] = objetivo_td
+    no_absence = df['Tipo'].isin(['Férias', 'Folga', 'Feriado', 'Fim de semana'])
+    df.loc[no_absence, 'falta_td'] = pd.Timedelta(0)
+    df.loc[no_absence, 'extra_td'] = pd.Timedelta(0)
+    
+    df['horas_efetivas_num'] = df['horas_efetivas_td'].dt.total_seconds() / 3600
+    df['cumpriu_horario'] = df['horas_efetivas_num'] >= objetivo_horas
+    df['dia_trabalho'] = df['Tipo'].isin(['Normal', 'Falta parcial', 'Com extra'])
+    
+    def clean_time_simple(time_str):
+        if not time_str or pd.isna(time_str) or time_str == '00:00':
+            return None
+        return str(time_str).strip()
+    
+    df['primeiro_e1'] = df['E1'].apply(clean_time_simple)
+    s_cols = [col for col in ['S4', 'S3', 'S2', 'S1'] if col in df.columns]
+    df['ultimo_s'] = df[s_cols].apply(
+        lambda row: next((clean_time_simple(row[col]) for col in s_cols if clean_time_simple(row[col])), None), axis=1)
+    return df
+
+def objetivo_horas(sector):
+    """Objetivo diário das regras do setor."""
+    return float(RulesEngine.shared().get_rules(sector).get('horas_diarias_objetivo', 8.0))
+
+print('=== TESTE DAS MÉTRICAS DE COMPATIBILIDADE ===')
+print()
+
+legacy_columns = ['total_trabalho_calc', 'total_intervalo_calc', 'horas_efetivas_td', 'falta_td', 'extra_td',
+                  'horas_efetivas_num', 'cumpriu_horario', 'dia_trabalho', 'primeiro_e1', 'ultimo_s']
+for name in SAMPLE_FILES:
+    df = CSVProcessor().apply_sector_rules(CSVProcessor().load_and_process_csv(MockFile(name)), 'Produção')
+    for label, source in [('', df), (' sem total_trabalho', df.drop(columns=['total_trabalho']))]:
+        expected = legacy_metrics_row_by_row(source.copy(), objetivo_horas(SECTOR))
+        result = calculate_legacy_metrics(source.copy(), SECTOR)
+        different = [col for col in legacy_columns if not same_values(expected[col], result[col])]
+        check(f"{name}{label}", not different, different)
+
+# Objetivo diário lido das regras do setor (um setor importado com 7 horas)
+engine = RulesEngine.shared()
+rules = engine.get_rules(SECTOR)
+rules['horas_diarias_objetivo'] = 7.0
+with tempfile.TemporaryDirectory() as workdir:
+    path = os.path.join(workdir, 'regras_7h.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rules, f, ensure_ascii=False)
+    check("Setor com objetivo de 7h importado", engine.import_rules(path, 'Teste 7h'))
+source = CSVProcessor().apply_sector_rules(CSVProcessor().load_and_process_csv(MockFile(SAMPLE_FILES[1])), SECTOR)
+expected = legacy_metrics_row_by_row(source.copy(), objetivo_horas('Teste 7h'))
+result = calculate_legacy_metrics(source.copy(), 'Teste 7h')
+different = [col for col in legacy_columns if not same_values(expected[col], result[col])]
+check(f"{SAMPLE_FILES[1]} com objetivo de 7h", not different and objetivo_horas('Teste 7h') == 7.0, different)
+
+print()
+print(f"{'✅ Todas as comparações coincidem' if not failures else f'❌ {len(failures)} comparações diferentes'}")
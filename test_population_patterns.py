@@ -0,0 +1,91 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from utils.punctuality_analyzer import PunctualityAnalyzer
+
+WINDOW = 3
+
+def create_two_employees(seed=0):
+    """Dois funcionários em dias baralhados; o número do primeiro aparece como 138 e 138.0."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for numero, department, days in [(138, 'Produção', 17), (205, 'Administrativo', 12)]:
+        for day in range(days):
+            delay = float(rng.choice([0, 0, 0, 3, 7, 12, 25, 40]))
+            rows.append({
+                'Numero': float(numero) if numero == 138 and day % 2 else numero,
+                'Departamento': department,
+                'Data': pd.Timestamp('2025-03-03') + pd.Timedelta(days=day),
+                'atraso_minutos': delay if rng.random() > 0.1 else np.nan,
+            })
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def patterns_by_employee(df, window):
+    """Métricas de cada funcionário calculadas num ciclo, dia a dia."""
+    expected = {}
+    data = df[df['atraso_minutos'].notna()].copy()
+    data['Numero'] = data['Numero'].map(lambda value: str(int(value)))
+    department_means = data.groupby('Departamento')['atraso_minutos'].mean()
+    alpha = 2 / (window + 1)
+    for numero, days in data.groupby('Numero'):
+        days = days.sort_values('Data')
+        delays = days['atraso_minutos'].tolist()
+        n = len(delays)
+        mean = sum(delays) / n
+        
+        # Média exponencial (com ajuste) no último dia
+        weights = [(1 - alpha) ** k for k in range(n)]
+        ewm = sum(w * x for w, x in zip(weights, reversed(delays))) / sum(weights)
+        
+        # Janela móvel que termina no último dia e a que termina `window` dias antes
+        last_window = np.mean(delays[max(0, n - window):])
+        previous_window = np.mean(delays[max(0, n - 2 * window):n - window]) if n > window else np.nan
+        
+        longest, current = 0, 0
+        for delay in delays:
+            current = current + 1 if delay > 0 else 0
+            longest = max(longest, current)
+        
+        weekday = {}
+        for date, delay in zip(days['Data'], delays):
+            weekday.setdefault(date.weekday(), []).append(delay)
+        
+        expected[numero] = {
+            'dias': n,
+            'atraso_medio': mean,
+            'dias_com_atraso': sum(delay > 0 for delay in delays),
+            'maior_atraso': max(delays),
+            'atraso_medio_departamento': department_means[days['Departamento'].iloc[0]],
+            'tendencia_movel': last_window - previous_window,
+            'tendencia_ewm': ewm - mean,
+            'maior_sequencia_atrasos': longest,
+            'sequencia_atrasos_atual': current,
+            **{f'atraso_{name}': np.mean(weekday[k]) if k in weekday else np.nan
+               for k, name in enumerate(PunctualityAnalyzer.WEEKDAY_NAMES)},
+        }
+    return expected
+
+print('=== TESTE DA TABELA DE PADRÕES DA POPULAÇÃO ===')
+print()
+
+df = create_two_employees()
+summary = PunctualityAnalyzer().generate_population_patterns(df, window=WINDOW)
+expected = patterns_by_employee(df, WINDOW)
+
+status = '✅' if sorted(summary.index) == sorted(expected) else '❌'
+print(f"{status} Funcionários: {sorted(summary.index)} (138 e 138.0 juntos)")
+
+all_ok = status == '✅'
+for numero, values in expected.items():
+    different = [
+        key for key, value in values.items()
+        if not (pd.isna(value) and pd.isna(summary.loc[numero, key]))
+        and not np.isclose(float(value), float(summary.loc[numero, key]))
+    ]
+    status = '✅' if not different else '❌'
+    all_ok = all_ok and not different
+    print(f"{status} Funcionário {numero}: janelas, média exponencial e sequências" + (f" diferentes em {different}" if different else ''))
+
+print()
+print('✅ Padrões iguais ao cálculo por funcionário' if all_ok else '❌ Padrões diferentes do cálculo por funcionário')
@@ -0,0 +1,118 @@
+import pandas as pd
+import numpy as np
+import sys
+import time
+sys.path.append('.')
+from utils.csv_processor import CSVProcessor
+from utils.punctuality_analyzer import PunctualityAnalyzer
+from utils.rules_engine import RulesEngine
+from utils.punch_profile import PunchProfileIndex
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+RESULT_COLUMNS = ['picagens_sugeridas', 'tipo_problema', 'correcao_sugerida', 'confianca_sugestao',
+                  'atraso_minutos', 'saida_antecipada_minutos', 'requer_verificacao_manual']
+
+def analyze_row_by_row(df, rules, punch_profile=None):
+    """Reproduz a análise antiga (linha a linha) para comparação."""
+    analyzer = PunctualityAnalyzer(rules, punch_profile=punch_profile)
+    rules = rules or analyzer.default_rules
+    results = [analyzer._analyze_row_punctuality(row, rules) for _, row in df.iterrows()]
+    return pd.DataFrame(results, index=df.index)[RESULT_COLUMNS]
+
+def create_synthetic_data(n_rows, seed=0):
+    """Gera picagens variadas: 0 a 8 picagens, setores, tipos de dia e valores inválidos."""
+    rng = np.random.default_rng(seed)
+    tipos = ['Normal', 'Folga', 'Férias', 'Falta', 'Feriado', 'Com extra', 'Falta parcial', 'Baixa Médica', '']
+    setores = ['Produção', 'Administrativo', 'Vendas', 'Logística', 'Outro']
+    punch_cols = ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
+    rows = []
+    for i in range(n_rows):
+        times = sorted(rng.choice(np.arange(300, 1400), size=8, replace=False))
+        values = ['00:00'] * 8
+        positions = sorted(rng.choice(8, size=rng.integers(0, 9), replace=False))
+        for k, pos in enumerate(positions):
+            values[pos] = f'{times[k] // 60:02d}:{times[k] % 60:02d}'
+        if rng.random() < 0.05:
+            values[rng.integers(0, 8)] = 'xx'
+        rows.append({
+            'Numero': i % 50,
+            'Departamento': setores[rng.integers(0, len(setores))],
+            'Data': pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(rng.integers(0, 365))),
+            'Tipo': tipos[rng.integers(0, len(tipos))],
+            **dict(zip(punch_cols, values))
+        })
+    return pd.DataFrame(rows)
+
+print('=== TESTE DA ANÁLISE DE PONTUALIDADE VECTORIZADA ===')
+print()
+
+df_maio = CSVProcessor().load_and_process_csv(MockFile('Hugo Maio.csv'))
+frames = {'Hugo Maio.csv': df_maio, 'Sintético (3000 linhas)': create_synthetic_data(3000)}
+
+profiles = {}
+for name, df in frames.items():
+    profiles[name] = PunchProfileIndex()
+    profiles[name].update(df)
+
+for sector in ['default', 'Produção', 'Vendas']:
+    rules = RulesEngine().get_rules(sector)
+    for name, df in frames.items():
+        for profile in [None, profiles[name]]:
+            expected = analyze_row_by_row(df, rules, profile)
+            analyzer = PunctualityAnalyzer(rules, punch_profile=profile)
+            result = analyzer.analyze_punctuality_issues(df.copy(), rules)
+            # correcao_sugerida é gerada a partir dos bits só quando é mostrada
+            result['correcao_sugerida'] = analyzer.render_corrections(result, rules)
+            result = result[RESULT_COLUMNS]
+            mismatches = (expected.astype(object) != result.astype(object)).any(axis=1).sum()
+            status = '✅' if mismatches == 0 else '❌'
+            label = 'com perfil' if profile is not None else 'sem perfil'
+            print(f'{status} {name} [{sector}, {label}]: {mismatches} linhas diferentes')
+            assert mismatches == 0
+
+print()
+print('=== PERFIL HISTÓRICO DE PICAGENS ===')
+profile = profiles['Sintético (3000 linhas)']
+before = len(profile.profiles)
+assert profile.update(frames['Sintético (3000 linhas)']) == 0  # dias já vistos não contam duas vezes
+assert len(profile.profiles) == before
+
+# Um dia incompleto só entra no perfil depois de corrigido
+corrigido = pd.DataFrame({'Numero': [999, 999], 'Data': pd.to_datetime(['2025-01-06', '2025-01-07']),
+                          'E1': ['08:00', '08:00'], 'S1': ['12:00', 'xx'], 'E2': ['13:00', '13:00'], 'S2': ['17:00', '']})
+assert profile.update(corrigido) == 1
+corrigido.loc[1, ['S1', 'S2']] = ['12:00', '17:00']
+assert profile.update(corrigido) == 1
+assert profile.update(corrigido) == 0
+print('✅ Dias com picagens em falta são acrescentados ao perfil depois de corrigidos')
+example = profile.profiles.reset_index().iloc[0]
+print(f'{before} perfis (funcionário, dia da semana, coluna); exemplo: '
+      f'{example["Numero"]} dia {example["dia_semana"]} {example["coluna"]} -> '
+      f'mediana {int(example["mediana"])}min, dispersão {example["dispersao"]}min, confiança {example["confianca"]}')
+
+print()
+print('=== BENCHMARK ===')
+df_big = create_synthetic_data(20000, seed=1)
+
+start = time.perf_counter()
+analyze_row_by_row(df_big.head(2000), None)
+row_time = (time.perf_counter() - start) * len(df_big) / 2000
+
+start = time.perf_counter()
+PunctualityAnalyzer().analyze_punctuality_issues(df_big.copy())
+batch_time = time.perf_counter() - start
+
+print(f'Linha a linha (estimado, {len(df_big)} linhas): {row_time:.2f}s')
+print(f'Vectorizado ({len(df_big)} linhas): {batch_time:.3f}s')
+print(f'Aceleração: {row_time / batch_time:.0f}x')
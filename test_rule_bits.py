@@ -0,0 +1,86 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from utils.csv_processor import CSVProcessor
+from utils.rule_dsl import CompiledRule, RuleContext, RuleResults
+from utils.rules_engine import RulesEngine
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SECTOR = 'Produção'
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma verificação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+print('=== TESTE DOS RESULTADOS DE REGRAS EM BITS ===')
+print()
+
+print('--- Coluna de bits: to_column / from_column / render ---')
+rng = np.random.default_rng(42)
+n_rows = 200
+variables = {name: rng.choice([np.nan, -5, 0, 0, 1, 2.5, 10, 30, 45, 90], n_rows).astype(float) for name in 'ab'}
+context = RuleContext({name: (lambda values=values: values) for name, values in variables.items()}, n_rows)
+rules = [CompiledRule('baixo', 'a < 1', 'Baixo ({a:.0f})'), CompiledRule('alto', 'b > 10', 'Alto ({b:.1f})'),
+         CompiledRule('ambos', 'a < 1 e b > 10', 'Ambos')]
+messages = {rule.id: rule.message for rule in rules}
+index = pd.RangeIndex(n_rows) + 100
+results = RuleResults(index, [rule.id for rule in rules], messages)
+for rule in rules:
+    results.set(rule.id, rule.evaluate(context))
+results.capture_params(context)
+column = pd.Series(results.to_column('teste_bits'), index=index)
+restored = RuleResults.from_column(column, 'teste_bits', [rule.id for rule in rules], messages)
+restored.capture_params(context)
+check('Máscaras iguais depois de guardar na coluna de bits',
+      all(np.array_equal(results.mask(rule.id), restored.mask(rule.id)) for rule in rules))
+check('Texto igual depois de guardar na coluna de bits', results.render().equals(restored.render()))
+
+low, high = variables['a'] < 1, variables['b'] > 10
+parts = [[f"Baixo ({variables['a'][i]:.0f})"] * bool(low[i]) + [f"Alto ({variables['b'][i]:.1f})"] * bool(high[i])
+         + ['Ambos'] * bool(low[i] and high[i]) for i in range(n_rows)]
+expected_text = ['; '.join(row) for row in parts]
+check('Texto igual à formatação linha a linha', list(results.render()) == expected_text)
+rows = index[[5, 0, 17]]
+check('render de algumas linhas', results.render(rows=rows).tolist() == [expected_text[5], expected_text[0], expected_text[17]])
+reordered = ['; '.join(row[::-1]) if row else '' for row in parts]
+check('render com outra ordem das mensagens', list(results.render(order=['ambos', 'alto', 'baixo'])) == reordered)
+check('Contagens por regra', results.counts() == {'baixo': int(low.sum()), 'alto': int(high.sum()), 'ambos': int((low & high).sum())})
+
+print('--- Texto só das colunas mostradas ---')
+engine = RulesEngine()
+df = CSVProcessor().apply_sector_rules(CSVProcessor().load_and_process_csv(MockFile('Hugo Maio.csv')), SECTOR)
+full = engine.render_rule_texts(df, SECTOR)
+check('Texto completo sem as colunas de bits', 'regras_intervalos' not in full.columns and 'regras_pontualidade' not in full.columns)
+
+columns = ['Data', 'Tipo', 'duracao_almoco', 'alerta_intervalos', 'coluna_inexistente']
+table = engine.render_rule_texts(df, SECTOR, columns)
+check('Só as colunas pedidas que existem, pela ordem pedida', list(table.columns) == columns[:4], str(list(table.columns)))
+check('Alertas iguais aos do texto completo', table['alerta_intervalos'].equals(full['alerta_intervalos']))
+
+# Um texto antigo no DataFrame não duplica a coluna (é substituído pelo dos bits)
+stale = df.assign(alerta_intervalos='antigo')
+table = engine.render_rule_texts(stale, SECTOR, columns)
+check("'alerta_intervalos' aparece uma vez, com o texto dos bits",
+      list(table.columns).count('alerta_intervalos') == 1 and table['alerta_intervalos'].equals(full['alerta_intervalos']))
+
+table = engine.render_rule_texts(df, SECTOR, ['Data', 'atraso_minutos', 'correcao_sugerida'])
+check('Correções sugeridas iguais às do texto completo', table['correcao_sugerida'].equals(full['correcao_sugerida']))
+
+print()
+print('✅ Resultados em bits consistentes' if not failures else f'❌ {len(failures)} verificações falharam')
@@ -0,0 +1,249 @@
+import pandas as pd
+import numpy as np
+import sys
+from datetime import datetime, timedelta
+sys.path.append('.')
+from utils.csv_processor import CSVProcessor
+from utils.interval_analyzer import IntervalAnalyzer
+from utils.rule_dsl import CompiledRule, RuleContext, RuleSyntaxError, validate_rule_definitions
+from utils.rules_engine import RulesEngine
+
+# Simular file upload
+class MockFile:
+    def __init__(self, filepath):
+        self.filepath = filepath
+    
+    def read(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def seek(self, pos):
+        pass
+
+SAMPLE_FILES = ['Hugo Abril.csv', 'Hugo Maio.csv', 'Hugo Junho.csv', 'Hugo Julho 1.csv']
+PUNCH_COLUMNS = ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
+DURATION_COLUMNS = ['duracao_almoco', 'duracao_pausa_manha', 'duracao_pausa_tarde', 'total_pausas_dia']
+BASIC_COLUMNS = ['periodo_manha', 'intervalo_almoco', 'periodo_tarde', 'total_trabalho', 'total_pausas']
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma comparação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+# --- Linguagem de regras -------------------------------------------------
+
+def random_sum(rng, depth):
+    """Expressão aritmética aleatória como (texto DSL, texto Python)."""
+    choice = rng.integers(0, 5 if depth > 0 else 2)
+    if choice == 0:
+        name = str(rng.choice(['a', 'b', 'c']))
+        return name, name
+    if choice == 1:
+        number = str(rng.choice(['0', '1', '2.5', '10', '30']))
+        return number, f'F({number})'
+    if choice == 4:
+        # O menos unário é 0 - x (sem zero negativo nas divisões)
+        dsl, py = random_sum(rng, depth - 1)
+        return f'-{dsl}', f'(F(0) - {py})'
+    operator = str(rng.choice(['+', '-', '*', '/']))
+    left, right = random_sum(rng, depth - 1), random_sum(rng, depth - 1)
+    return f'({left[0]} {operator} {right[0]})', f'({left[1]} {operator} {right[1]})'
+
+def random_condition(rng, depth):
+    """Condição aleatória (comparações combinadas com e/ou/nao) como (texto DSL, texto Python)."""
+    choice = rng.integers(0, 4 if depth > 0 else 1)
+    if choice == 0:
+        operator = str(rng.choice(['>', '>=', '<', '<=', '==', '!=']))
+        left, right = random_sum(rng, 2), random_sum(rng, 2)
+        return f'{left[0]} {operator} {right[0]}', f'({left[1]} {operator} {right[1]})'
+    if choice == 1:
+        dsl, py = random_condition(rng, depth - 1)
+        return f'nao ({dsl})', f'(not {py})'
+    words = [('e', 'and'), ('ou', 'or')][choice - 2]
+    operands = [random_condition(rng, depth - 1) for _ in range(rng.integers(2, 4))]
+    dsl = f' {words[0]} '.join(f'({operand[0]})' for operand in operands)
+    py = f' {words[1]} '.join(operand[1] for operand in operands)
+    return dsl, f'({py})'
+
+def evaluate_row_by_row(python_condition, variables):
+    """Avalia a condição linha a linha com escalares numpy (a semântica de referência)."""
+    code = compile(python_condition, '<regra>', 'eval')
+    n_rows = len(next(iter(variables.values())))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.array([
+            bool(eval(code, {'F': np.float64}, {name: np.float64(values[i]) for name, values in variables.items()}))
+            for i in range(n_rows)
+        ])
+
+# --- Análise de intervalos antiga (linha a linha) -------------------------
+
+def old_timestamps(row):
+    """Picagens válidas como na versão antiga (strptime, ignorando '00:00' e vazios)."""
+    timestamps = []
+    for col in PUNCH_COLUMNS:
+        if col in row and pd.notna(row[col]):
+            text = str(row[col]).strip()
+            if text and text not in ('00:00', 'nan'):
+                try:
+                    timestamps.append(datetime.strptime(text, '%H:%M').time())
+                except ValueError:
+                    continue
+    return timestamps
+
+def old_difference(start, end):
+    """Diferença entre duas horas em minutos, passando a meia-noite como na versão antiga."""
+    base = datetime(2000, 1, 1)
+    start_dt, end_dt = datetime.combine(base, start), datetime.combine(base, end)
+    if end_dt < start_dt:
+        end_dt += timedelta(days=1)
+    return (end_dt - start_dt).total_seconds() / 60
+
+def old_lunch_alerts(minutes, rules):
+    if minutes < rules['alerta_almoco_curto']:
+        return [f'Almoço muito curto ({minutes:.0f}min)']
+    if minutes > rules['alerta_almoco_longo']:
+        return [f'Almoço muito longo ({minutes:.0f}min)']
+    return []
+
+def analyze_intervals_row_by_row(row, rules):
+    """Reproduz a análise de intervalos antiga de uma linha (minutos em vez de Timedelta)."""
+    ts = old_timestamps(row)
+    n = len(ts)
+    hhmm = [t.strftime('%H:%M') for t in ts]
+    result = {'periodos': None, 'duracao_pausa_manha': 0.0, 'duracao_pausa_tarde': 0.0}
+    if n < 4:
+        return {**result, 'duracao_almoco': 0.0, 'total_pausas_dia': 0.0,
+                'alertas': ['Timestamps insuficientes para análise'], 'detalhes': f'Apenas {n} timestamps válidos'}
+    if n not in (4, 6, 8):
+        return {**result, 'duracao_almoco': 0.0, 'total_pausas_dia': 0.0,
+                'alertas': [f'Padrão irregular: {n} timestamps'], 'detalhes': f'Análise não suportada para {n} timestamps'}
+    
+    gaps = [old_difference(ts[k], ts[k + 1]) for k in range(n - 1)]
+    pauses = gaps[1::2]
+    alerts = []
+    if n == 4:
+        lunch = pauses[0]
+        alerts += old_lunch_alerts(lunch, rules)
+        result['periodos'] = [gaps[0], lunch, gaps[2], gaps[0] + gaps[2], lunch]
+        labels = ['🌅 Manhã', '🍽️ Almoço', '🌆 Tarde']
+        pattern = '4 picagens (apenas almoço)'
+    elif n == 6:
+        lunch = pauses[1]
+        if pauses[0] > rules['alerta_pausa_longa']:
+            alerts.append(f'Pausa manhã muito longa ({pauses[0]:.0f}min)')
+        alerts += old_lunch_alerts(lunch, rules)
+        result['duracao_pausa_manha'] = pauses[0]
+        labels = ['🌅 Manhã início', '☕ Lanche manhã', '🌅 Manhã fim', '🍽️ Almoço', '🌆 Tarde']
+        pattern = '6 picagens (lanche manhã + almoço)'
+    else:
+        # A maior pausa é o almoço (a primeira em caso de empate); duracao_almoco é sempre a pausa 2
+        longest = sorted(range(3), key=lambda k: pauses[k], reverse=True)[0]
+        for k, minutes in enumerate(pauses):
+            if k == longest:
+                alerts += old_lunch_alerts(minutes, rules)
+            elif minutes > rules['alerta_pausa_longa']:
+                alerts.append(f'Pausa {k + 1} muito longa ({minutes:.0f}min)')
+        lunch = pauses[1]
+        result['duracao_pausa_manha'], result['duracao_pausa_tarde'] = pauses[0], pauses[2]
+        labels = ['🌅 Manhã início', '☕ Lanche manhã', '🌅 Manhã fim', '🍽️ Almoço',
+                  '🌆 Tarde início', '☕ Lanche tarde', '🌆 Tarde fim']
+        pattern = '8 picagens (lanche manhã + almoço + lanche tarde)'
+    
+    details = [f'{label}: {hhmm[k]}-{hhmm[k + 1]}' + (f' ({gaps[k]:.0f}min)' if k % 2 == 1 else '')
+               for k, label in enumerate(labels)]
+    details.append(f'📋 Padrão: {pattern}')
+    return {**result, 'duracao_almoco': lunch, 'total_pausas_dia': sum(pauses),
+            'alertas': alerts, 'detalhes': ' | '.join(details)}
+
+def compare_intervals(label, df, rules):
+    """Compara a análise vectorizada com a antiga em todas as linhas."""
+    analyzer = IntervalAnalyzer(rules)
+    current_rules = {**analyzer.default_rules, **rules}
+    result = analyzer.analyze_intervals(df.copy(), rules)
+    alerts = analyzer.render_alerts(result, rules)
+    expected = [analyze_intervals_row_by_row(row, current_rules) for _, row in df.iterrows()]
+    
+    mismatches = []
+    for position, (index, old) in enumerate(zip(df.index, expected)):
+        new = result.loc[index]
+        problems = [col for col in DURATION_COLUMNS
+                    if not np.isclose(new[col].total_seconds() / 60, old[col])]
+        new_alerts = list(filter(None, alerts.loc[index].split('; ')))
+        if new_alerts != old['alertas']:
+            problems.append(f"alertas {new_alerts} != {old['alertas']}")
+        if bool(new['conformidade_intervalos']) != (not old['alertas']):
+            problems.append('conformidade_intervalos')
+        if new['detalhes_intervalos'] != old['detalhes']:
+            problems.append(f"detalhes {new['detalhes_intervalos']!r} != {old['detalhes']!r}")
+        if old['periodos'] is not None:
+            periods = [new[col].total_seconds() / 60 for col in BASIC_COLUMNS]
+            if not np.allclose(periods, old['periodos']):
+                problems.append('períodos do padrão de 4 picagens')
+        if problems:
+            mismatches.append((position, problems))
+    check(f"{label}: {len(df)} linhas", not mismatches, str(mismatches[:3]))
+
+def create_synthetic_punches(n_rows, seed=0):
+    """Gera 0 a 8 picagens por linha em minutos múltiplos de 5 (pausas empatadas), com turnos noturnos e valores inválidos."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_rows):
+        count = int(rng.integers(0, 9))
+        start = int(rng.choice([6 * 60, 8 * 60, 14 * 60, 22 * 60]))
+        minutes = start + np.cumsum(rng.choice([5, 10, 15, 20, 25, 30, 45, 60, 90, 120, 180, 240], size=count))
+        values = [f'{(m // 60) % 24:02d}:{m % 60:02d}' for m in minutes] + ['00:00'] * (8 - count)
+        if rng.random() < 0.05:
+            values[rng.integers(0, 8)] = 'xx'
+        rows.append({'Numero': i % 20, 'Data': pd.Timestamp('2025-01-01') + pd.Timedelta(days=i % 365),
+                     **dict(zip(PUNCH_COLUMNS, values))})
+    return pd.DataFrame(rows)
+
+print('=== TESTE DA LINGUAGEM DE REGRAS E DA ANÁLISE DE INTERVALOS ===')
+print()
+
+print('--- Condições compiladas vs avaliação linha a linha ---')
+rng = np.random.default_rng(42)
+n_rows = 200
+variables = {name: rng.choice([np.nan, -5, 0, 0, 1, 2.5, 10, 30, 45, 90], n_rows).astype(float) for name in 'abc'}
+context = RuleContext({name: (lambda values=values: values) for name, values in variables.items()}, n_rows)
+mismatches = []
+for i in range(300):
+    dsl, python_condition = random_condition(rng, 3)
+    compiled = CompiledRule(f'r{i}', dsl)
+    if not np.array_equal(compiled.evaluate(context), evaluate_row_by_row(python_condition, variables)):
+        mismatches.append(dsl)
+check('300 condições aleatórias (e/ou/nao, comparações, + - * /, NaN)', not mismatches, str(mismatches[:2]))
+
+# Sinónimos e precedência: 'nao' liga mais do que 'e', que liga mais do que 'ou'
+same = CompiledRule('x', 'nao a > 1 e b > 1 ou c > 1').evaluate(context)
+expected = CompiledRule('y', '((not (a > 1)) and b > 1) or c > 1').evaluate(context)
+check("Precedência nao > e > ou e sinónimos and/or/not", np.array_equal(same, expected))
+
+print('--- Erros de sintaxe ---')
+for condition in ['', 'a >', '(a > 1', 'a > 1)', 'a $ 1', 'e a > 1', 'a > > 1']:
+    try:
+        CompiledRule('invalida', condition)
+        check(f"{condition!r} rejeitada", False, 'sem RuleSyntaxError')
+    except RuleSyntaxError:
+        check(f"{condition!r} rejeitada", True)
+errors = validate_rule_definitions([{'id': 'ok', 'condicao': 'a > 1'}, {'id': 'mau', 'condicao': 'a >'}, {'condicao': 'a'}])
+check('validate_rule_definitions indica só as regras inválidas', len(errors) == 2 and 'mau' in errors[0], str(errors))
+
+print('--- Análise de intervalos vs versão antiga linha a linha ---')
+engine = RulesEngine.shared()
+for sector in ['default', 'Produção']:
+    sector_rules = engine.get_rules(sector)
+    for name in SAMPLE_FILES:
+        df = CSVProcessor().load_and_process_csv(MockFile(name))
+        compare_intervals(f"{name} [{sector}]", df, sector_rules)
+    compare_intervals(f"Sintético [{sector}]", create_synthetic_punches(1500, seed=1), sector_rules)
+
+# Limites de alertas do setor diferentes dos padrão
+custom_rules = {**engine.get_rules('default'), 'alerta_almoco_curto': 45, 'alerta_almoco_longo': 60, 'alerta_pausa_longa': 10}
+compare_intervals('Sintético [limites próprios]', create_synthetic_punches(1500, seed=2), custom_rules)
+
+print()
+print('✅ Todas as comparações coincidem' if not failures else f'❌ {len(failures)} comparações diferentes')
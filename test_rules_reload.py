@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.append('.')
+import utils.rules_engine as rules_engine
+from utils.rules_engine import RulesEngine
+
+N_READERS = 8
+N_RELOADS = 200
+
+failures = []
+
+def check(label, ok, detail=''):
+    """Mostra o resultado de uma verificação e guarda as falhas."""
+    print(f"{'✅' if ok else '❌'} {label}" + (f": {detail}" if detail and not ok else ''))
+    if not ok:
+        failures.append(label)
+
+def write_rules(directory, version):
+    """Versão das regras repartida por dois ficheiros (padrão e setor), que só fazem sentido juntos."""
+    with open(os.path.join(directory, 'default.json'), 'w', encoding='utf-8') as f:
+        json.dump({'tolerancia_atraso_minutos': version}, f)
+    with open(os.path.join(directory, 'teste.json'), 'w', encoding='utf-8') as f:
+        json.dump({'setor': 'Teste', 'max_horas_extras_dia': version, 'observacoes': 'x' * version}, f)
+
+print('=== TESTE DO RECARREGAMENTO DAS REGRAS ENTRE THREADS ===')
+print()
+
+print('--- Motor partilhado ---')
+RulesEngine._shared = None
+barrier = threading.Barrier(N_READERS)
+engines = []
+
+def create_shared():
+    barrier.wait()
+    engines.append(RulesEngine.shared())
+
+threads = [threading.Thread(target=create_shared) for _ in range(N_READERS)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+check(f"{N_READERS} threads recebem o mesmo motor", len({id(engine) for engine in engines}) == 1)
+
+print('--- Cópias devolvidas por get_rules ---')
+engine = RulesEngine()
+rules = engine.get_rules('Produção')
+rules['tolerancia_atraso_minutos'] = -1
+check('Alterar o dicionário não muda as regras do motor', engine.get_rules('Produção')['tolerancia_atraso_minutos'] != -1)
+if 'regras' in rules:
+    count = len(rules['regras'])
+    rules['regras'].append({'id': 'extra', 'condicao': 'a > 1'})
+    rules['regras'][0]['condicao'] = 'alterada'
+    again = engine.get_rules('Produção')['regras']
+    check('Alterar a lista de regras declarativas não muda as do motor',
+          len(again) == count and again[0]['condicao'] != 'alterada')
+
+with tempfile.TemporaryDirectory() as workdir:
+    rules_engine.RULES_DIR = workdir
+    
+    print('--- Alterações nos ficheiros ---')
+    write_rules(workdir, 10)
+    engine = RulesEngine()
+    version = engine.rules_version
+    check('Regras lidas dos ficheiros', engine.get_rules('Teste')['max_horas_extras_dia'] == 10)
+    engine._last_check = 0.0
+    check('Sem alterações não há recarregamento', not engine.reload_rules() and engine.rules_version == version)
+    
+    write_rules(workdir, 300)
+    engine._last_check = 0.0
+    check('Ficheiro alterado é relido', engine.reload_rules() and engine.get_rules('Teste')['max_horas_extras_dia'] == 300)
+    check('rules_version muda com as regras', engine.rules_version == version + 1)
+    
+    with open(os.path.join(workdir, 'invalido.json'), 'w', encoding='utf-8') as f:
+        json.dump({'tolerancia_atraso_minutos': 'muito'}, f)
+    engine._last_check = 0.0
+    engine.reload_rules()
+    check('Ficheiro inválido ignorado', engine.get_rules('default')['tolerancia_atraso_minutos'] == 300)
+    os.remove(os.path.join(workdir, 'invalido.json'))
+    
+    print('--- Leituras durante recarregamentos ---')
+    # Só as recargas forçadas da thread de escrita leem os ficheiros (entre ficheiros escritos ao meio não há leituras)
+    engine.RULES_CHECK_INTERVAL = 3600
+    stop = threading.Event()
+    seen = [[] for _ in range(N_READERS)]
+    errors = []
+    
+    def read(position):
+        try:
+            while not stop.is_set():
+                rules = engine.get_rules('Teste')
+                seen[position].append((rules['tolerancia_atraso_minutos'], rules['max_horas_extras_dia']))
+        except Exception as e:
+            errors.append(repr(e))
+    
+    readers = [threading.Thread(target=read, args=(i,)) for i in range(N_READERS)]
+    for reader in readers:
+        reader.start()
+    version = engine.rules_version
+    for i in range(N_RELOADS):
+        write_rules(workdir, 10 if i % 2 else 300)
+        engine.reload_rules(force=True)
+    stop.set()
+    for reader in readers:
+        reader.join()
+    
+    pairs = [pair for values in seen for pair in values]
+    mixed = [pair for pair in pairs if pair[0] != pair[1]]
+    check(f"{len(pairs)} leituras sem erros", not errors, str(errors[:3]))
+    check('Nenhuma leitura mistura regras antigas e novas', not mixed, str(mixed[:3]))
+    check("rules_version aumenta uma vez por recarregamento", engine.rules_version == version + N_RELOADS)
+
+print()
+print('✅ Regras consistentes entre threads' if not failures else f'❌ {len(failures)} verificações falharam')
@@ -0,0 +1,62 @@
+import pandas as pd
+import numpy as np
+import sys
+from datetime import date
+sys.path.append('.')
+from utils.config_manager import ConfigManager
+from utils.work_calendar import WEEKDAY_NAMES, easter_sunday, national_holidays
+
+def holidays_row_by_row(day, config, sector):
+    """Feriados nacionais e locais (globais + setor) de um dia, verificados um a um."""
+    if day in national_holidays(day.year):
+        return True
+    local = config.current_config.get('feriados_locais', []) + config.get_sector_config(sector).get('feriados_locais', [])
+    for value in local:
+        parts = value.split('-')
+        if len(parts) == 2 and (day.month, day.day) == (int(parts[0]), int(parts[1])):
+            return True
+        if len(parts) == 3 and day == date(int(parts[0]), int(parts[1]), int(parts[2])):
+            return True
+    return False
+
+print('=== TESTE DO CALENDÁRIO DE DIAS ÚTEIS ===')
+print()
+
+# Páscoa conhecida (feriados móveis dependem dela)
+easters = {2024: date(2024, 3, 31), 2025: date(2025, 4, 20), 2026: date(2026, 4, 5)}
+status = '✅' if all(easter_sunday(year) == day for year, day in easters.items()) else '❌'
+print(f"{status} Domingo de Páscoa de 2024 a 2026")
+
+config = ConfigManager()
+config.current_config['feriados_locais'] = ['06-24', '2025-02-14']
+vendas = dict(config.get_sector_config('Vendas'), feriados_locais=['03-15'])
+config.update_sector_config('Vendas', vendas)
+
+# Datas de três anos em setores com semanas diferentes, com uma data inválida
+rng = np.random.default_rng(0)
+sectors = rng.choice(['Produção', 'Vendas', 'Logística'], 2000)
+dates = pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365, 2000), unit='D'))
+dates[7] = pd.NaT
+work, holidays = config.work_day_masks(dates, sectors)
+
+expected_work, expected_holidays = [], []
+for timestamp, sector in zip(dates, sectors):
+    if pd.isna(timestamp):
+        expected_work.append(False)
+        expected_holidays.append(False)
+        continue
+    day = timestamp.date()
+    holiday = holidays_row_by_row(day, config, sector)
+    work_week = WEEKDAY_NAMES[day.weekday()] in config.get_sector_config(sector)['dias_trabalho']
+    expected_work.append(work_week and not holiday)
+    expected_holidays.append(holiday)
+
+status = '✅' if np.array_equal(work, expected_work) else '❌'
+print(f"{status} Dias úteis iguais à verificação dia a dia ({int(work.sum())} de {len(dates)})")
+status = '✅' if np.array_equal(holidays, expected_holidays) else '❌'
+print(f"{status} Feriados nacionais e locais iguais à verificação dia a dia ({int(holidays.sum())} de {len(dates)})")
+
+same = all(config.is_work_day(timestamp, sector) == expected for timestamp, sector, expected
+           in zip(dates, sectors, expected_work) if pd.notna(timestamp))
+status = '✅' if same else '❌'
+print(f"{status} is_work_day igual às máscaras")
@@ -0,0 +1,129 @@
+import pandas as pd
+import numpy as np
+import sys
+sys.path.append('.')
+from utils.config_manager import ConfigManager
+from utils.rules_engine import RulesEngine
+
+SECTOR = 'Produção'
+
+def create_shifts(seed=0):
+    """Turnos de três funcionários (o 7 também como 7.0), com turnos noturnos, fins de semana e uma data em falta."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for numero in [7, 12, 31]:
+        day = pd.Timestamp('2025-03-01')
+        for _ in range(45):
+            day += pd.Timedelta(days=int(rng.choice([1, 1, 1, 1, 2, 3])))
+            if rng.random() < 0.25:
+                entry, hours = int(rng.integers(20 * 60, 23 * 60)), float(rng.choice([7, 8, 10]))
+            else:
+                entry, hours = int(rng.integers(6 * 60, 10 * 60)), float(rng.choice([0, 6, 8, 8, 9, 11]))
+            exit_ = (entry + int(hours * 60) + 60) % 1440
+            rows.append({
+                'Numero': float(numero) if numero == 7 and rng.random() < 0.5 else numero,
+                'Data': day,
+                'dia_trabalho': True,
+                'horas_efetivas_num': hours,
+                'primeiro_e1': f'{entry // 60:02d}:{entry % 60:02d}',
+                'ultimo_s': f'{exit_ // 60:02d}:{exit_ % 60:02d}',
+            })
+    df = pd.DataFrame(rows).astype({'Numero': object})
+    df.loc[10, 'Data'] = pd.NaT
+    df.loc[50, 'dia_trabalho'] = False
+    return df.sample(frac=1, random_state=seed)
+
+def clock(text):
+    hours, minutes = text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def working_time_by_loop(df, rules):
+    """Descanso, horas em 7 dias e dias consecutivos calculados dia a dia para cada funcionário."""
+    config = ConfigManager()
+    result = {}
+    work = df[df['dia_trabalho'] == True]
+    for numero in {str(int(float(value))) for value in work['Numero']}:
+        days = []
+        for index, row in work.iterrows():
+            if str(int(float(row['Numero']))) != numero or pd.isna(row['Data']):
+                continue
+            # Folgas do calendário sem horas não são dias trabalhados
+            if not config.is_work_day(row['Data'], SECTOR) and row['horas_efetivas_num'] <= 0:
+                continue
+            days.append((row['Data'], index, row))
+        days.sort(key=lambda item: item[0])
+        
+        previous_exit = None
+        for position, (date, index, row) in enumerate(days):
+            entry, exit_ = clock(row['primeiro_e1']), clock(row['ultimo_s'])
+            start = date.toordinal() * 1440 + entry
+            rest = (start - previous_exit) / 60 if previous_exit is not None else np.nan
+            # Saída antes da entrada: turno noturno se durar no máximo 16 horas
+            if exit_ < entry:
+                previous_exit = date.toordinal() * 1440 + exit_ + 1440 if exit_ + 1440 - entry <= 16 * 60 else np.nan
+            else:
+                previous_exit = date.toordinal() * 1440 + exit_
+            
+            hours_7_days = sum(other['horas_efetivas_num'] for other_date, _, other in days[:position + 1]
+                               if (date - other_date).days <= 6)
+            consecutive = 1
+            while position - consecutive >= 0 and (date - days[position - consecutive][0]).days == consecutive:
+                consecutive += 1
+            
+            result[index] = {
+                'descanso_horas': rest,
+                'descanso_insuficiente': bool(rest < rules['min_intervalo_turnos']),
+                'horas_7_dias': hours_7_days,
+                'excesso_horas_semana': hours_7_days > rules['max_horas_semana'],
+                'dias_consecutivos': consecutive,
+                'excesso_dias_consecutivos': consecutive > rules['max_dias_consecutivos'],
+            }
+    return result
+
+def same_value(a, b):
+    return (pd.isna(a) and pd.isna(b)) or (not pd.isna(a) and not pd.isna(b) and np.isclose(float(a), float(b)))
+
+print('=== TESTE DO DESCANSO ENTRE TURNOS E HORAS SEMANAIS ===')
+print()
+
+engine = RulesEngine()
+rules = engine.get_rules(SECTOR)
+df = create_shifts()
+result = engine.analyze_working_time(df, sector=SECTOR)
+expected = working_time_by_loop(df, rules)
+
+status = '✅' if list(result.index) == list(df[df['dia_trabalho'] == True].index) else '❌'
+print(f"{status} Uma linha por dia de trabalho, pela ordem original")
+
+analyzed = result.dropna(subset=['horas_7_dias'])
+status = '✅' if sorted(analyzed.index) == sorted(expected) else '❌'
+print(f"{status} Dias analisados: {len(analyzed)} (sem a data em falta nem folgas sem horas)")
+
+nat_row = result.loc[10]
+status = '✅' if nat_row.isna().all() else '❌'
+print(f"{status} Linha sem data fica com resultado vazio")
+
+different = [(index, column) for index, values in expected.items() for column, value in values.items()
+             if not same_value(value, result.loc[index, column])]
+status = '✅' if not different else '❌'
+print(f"{status} Descanso, horas em 7 dias e dias consecutivos iguais ao ciclo por funcionário" + (f": {different[:5]}" if different else ''))
+
+counts = {column: sum(values[column] for values in expected.values())
+          for column in ['descanso_insuficiente', 'excesso_horas_semana', 'excesso_dias_consecutivos']}
+status = '✅' if all(counts.values()) else '❌'
+print(f"{status} Os três limites são ultrapassados nos dados: {counts}")
+
+# Resumo em analyze_compliance (secção 'descanso')
+summary = engine.analyze_compliance(df, SECTOR)['descanso']
+rests = [values['descanso_horas'] for values in expected.values() if not pd.isna(values['descanso_horas'])]
+reference = {
+    'dias_descanso_insuficiente': counts['descanso_insuficiente'],
+    'menor_descanso_horas': min(rests),
+    'maior_horas_7_dias': max(values['horas_7_dias'] for values in expected.values()),
+    'dias_excesso_horas_semana': counts['excesso_horas_semana'],
+    'maior_sequencia_dias': max(values['dias_consecutivos'] for values in expected.values()),
+    'dias_excesso_consecutivos': counts['excesso_dias_consecutivos'],
+}
+different = [key for key, value in reference.items() if not same_value(value, summary[key])]
+status = '✅' if not different else '❌'
+print(f"{status} Resumo 'descanso' de analyze_compliance" + (f" diferente em {different}" if different else ''))
@@ -0,0 +1,72 @@
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+
+# Conjuntos fixos de categorias das colunas de estado produzidas pelo pipeline.
+# Uma coluna categórica guarda cada valor como um código inteiro, por isso
+# filtros como `df['tipo_problema'] != ''` ou `df['Tipo'].isin([...])`
+# passam a comparar inteiros em vez de strings Python.
+
+# Tipos de dia: exportados pelo sistema de ponto, usados pelos editores
+# (app.py) e pelo DayTypeManager
+TIPOS_DIA = [
+    '', 'Normal', 'Falta', 'Falta parcial', 'Com extra', 'Folga', 'Fim de semana',
+    'Feriado', 'Férias', 'Baixa médica', 'Baixa Médica', 'Compensação', 'Formação',
+    'Meio-dia', 'Falta Justificada', 'Falta Não Justificada', 'Trabalho Remoto'
+]
+
+# Problemas detectados pelo PunctualityAnalyzer (ver PUNCTUALITY_DECISION_TABLE)
+TIPOS_PROBLEMA = [
+    '', 'Picagens em dia não útil', 'Sem dados', 'Entrada em falta', 'Saída em falta',
+    'Possível esquecimento de entrada', 'Atraso na entrada', 'Padrão irregular'
+]
+
+# Dias da semana em português (coluna 'Dia da Semana')
+DIAS_SEMANA = [
+    'Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira',
+    'Sexta-feira', 'Sábado', 'Domingo'
+]
+
+# Setores configurados por omissão (ConfigManager / RulesEngine)
+DEPARTAMENTOS = ['Produção', 'Administrativo', 'Vendas', 'Logística']
+
+# Categorias base de cada coluna. `aviso_picagens` é texto livre (inclui
+# horas), por isso a lista base tem apenas o valor vazio e as restantes
+# categorias vêm dos valores observados.
+CATEGORICAL_COLUMNS: Dict[str, List[str]] = {
+    'Tipo': TIPOS_DIA,
+    'tipo_problema': TIPOS_PROBLEMA,
+    'Dia da Semana': DIAS_SEMANA,
+    'Departamento': DEPARTAMENTOS,
+    'aviso_picagens': [''],
+}
+
+
+def build_categorical(values: pd.Series, base_categories: Iterable[str]) -> pd.Series:
+    """
+    Converte uma série para categórica com as categorias base primeiro.
+
+    Valores observados fora da lista base são acrescentados (ordenados) para
+    nunca perder dados vindos de ficheiros com tipos desconhecidos.
+    """
+    base = list(base_categories)
+    observed = pd.unique(values.dropna().astype(str))
+    extra = sorted(set(observed) - set(base))
+    dtype = pd.CategoricalDtype(categories=base + extra)
+    return values.astype(object).where(values.isna(), values.astype(str)).astype(dtype)
+
+
+def apply_categorical_dtypes(df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Converte as colunas de estado existentes no DataFrame para categóricas."""
+    for col in (columns or CATEGORICAL_COLUMNS):
+        if col in df.columns:
+            df[col] = build_categorical(df[col], CATEGORICAL_COLUMNS.get(col, []))
+    return df
+
+
+def ensure_categories(df: pd.DataFrame, column: str, values: Iterable[str]) -> None:
+    """Acrescenta categorias em falta antes de atribuir novos valores a uma coluna categórica."""
+    if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+        missing = [value for value in pd.unique(pd.Series(list(values), dtype=object))
+                   if pd.notna(value) and value not in df[column].cat.categories]
+        if missing:
+            df[column] = df[column].cat.add_categories(missing)
@@ -0,0 +1,125 @@
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Tuple
+import plotly.graph_objects as go
+
+# Número máximo de pontos enviados ao browser por série
+MAX_CHART_POINTS = 1500
+
+# Níveis de agregação por ordem de preferência: (frequência pandas, nome, dias aproximados por período)
+AGGREGATION_LEVELS = [('D', 'dia', 1), ('W', 'semana', 7), ('M', 'mês', 30.44)]
+
+
+def choose_aggregation_level(dates: pd.Series, max_points: int = MAX_CHART_POINTS,
+                             date_range: Optional[Tuple] = None,
+                             n_points: Optional[int] = None) -> Optional[Tuple[str, str]]:
+    """
+    Escolhe o nível de agregação de uma série temporal para caber no orçamento de pontos.
+
+    Args:
+        dates: Datas de cada ponto
+        max_points: Número máximo de pontos desejado
+        date_range: Intervalo visível (início, fim); por omissão o das próprias datas
+        n_points: Número de pontos da série, quando cada data representa vários
+            (por omissão, o número de datas válidas)
+
+    Returns:
+        (frequência, nome) do nível mais fino que cabe no orçamento, ou None se
+        os pontos originais já cabem (sem agregação)
+    """
+    dates = pd.to_datetime(dates).dropna()
+    if (len(dates) if n_points is None else n_points) <= max_points:
+        return None
+    start, end = date_range if date_range is not None else (dates.min(), dates.max())
+    span_days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for freq, name, days in AGGREGATION_LEVELS:
+        if span_days / days <= max_points:
+            return freq, name
+    freq, name, _ = AGGREGATION_LEVELS[-1]
+    return freq, name
+
+
+def downsample_series(df: pd.DataFrame, x: str, y: str, max_points: int = MAX_CHART_POINTS,
+                      date_range: Optional[Tuple] = None,
+                      weight: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Reduz uma série diária (possivelmente com vários funcionários por dia) para o gráfico.
+
+    Quando os pontos excedem o orçamento, agrega por dia, semana ou mês e
+    devolve a média e o envelope mínimo/máximo de cada período, para que os
+    valores extremos continuem visíveis.
+
+    Args:
+        df: DataFrame com a série
+        x: Coluna de datas
+        y: Coluna de valores
+        max_points: Número máximo de pontos desejado
+        date_range: Intervalo visível (início, fim) a mostrar
+        weight: Coluna com o número de pontos que cada linha representa
+            (ex.: histograma de `KPIAggregates.delay_histogram`)
+
+    Returns:
+        Tuplo (dados, nível): sem agregação, os dados são as colunas x e y
+        originais (e a de pesos) e o nível é None; com agregação, as colunas são x, y (média),
+        'y_min', 'y_max' e 'n' (pontos no período) e o nível é 'dia',
+        'semana' ou 'mês'
+    """
+    data = pd.DataFrame({x: pd.to_datetime(df[x]), y: pd.to_numeric(df[y], errors='coerce')})
+    if weight is not None:
+        data[weight] = df[weight].to_numpy()
+    if date_range is not None:
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+        data = data[(data[x] >= start) & (data[x] <= end)]
+
+    n_points = None if weight is None else int(data.loc[data[x].notna(), weight].sum())
+    level = choose_aggregation_level(data[x], max_points, date_range, n_points)
+    if level is None:
+        return data, None
+
+    freq, name = level
+    data = data.dropna(subset=[x])
+    period = data[x].dt.to_period(freq).dt.start_time
+    if weight is None:
+        grouped = data.groupby(period, sort=True)[y].agg(['mean', 'min', 'max', 'count'])
+    else:
+        # Média ponderada pelo número de pontos; valores em falta não contam
+        counts = data[weight].where(data[y].notna(), 0)
+        sums = pd.DataFrame({'soma': data[y].fillna(0) * counts, 'count': counts}).groupby(period, sort=True).sum()
+        grouped = data.groupby(period, sort=True)[y].agg(['min', 'max'])
+        grouped['count'] = sums['count']
+        grouped['mean'] = sums['soma'] / sums['count'].where(sums['count'] > 0)
+    reduced = pd.DataFrame({
+        x: grouped.index,
+        y: grouped['mean'].to_numpy(),
+        'y_min': grouped['min'].to_numpy(),
+        'y_max': grouped['max'].to_numpy(),
+        'n': grouped['count'].to_numpy(),
+    })
+    return reduced, name
+
+
+def envelope_traces(reduced: pd.DataFrame, x: str, y: str, name: str, color: str,
+                    unit: str = '') -> List[go.Scatter]:
+    """
+    Traços Plotly de uma série agregada: banda mínimo–máximo e linha da média.
+
+    Args:
+        reduced: Resultado agregado de `downsample_series`
+        x: Coluna de datas
+        y: Coluna da média
+        name: Nome da série na legenda
+        color: Cor da linha (hex '#rrggbb')
+        unit: Unidade mostrada no hover
+    """
+    red, green, blue = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    band_color = f'rgba({red}, {green}, {blue}, 0.2)'
+    return [
+        go.Scatter(x=reduced[x], y=reduced['y_max'], mode='lines', line=dict(width=0, color=band_color),
+                   name='Máximo', showlegend=False, hovertemplate=f'Máximo: %{{y:.1f}}{unit}<extra></extra>'),
+        go.Scatter(x=reduced[x], y=reduced['y_min'], mode='lines', line=dict(width=0, color=band_color),
+                   fill='tonexty', fillcolor=band_color, name='Mínimo–máximo',
+                   hovertemplate=f'Mínimo: %{{y:.1f}}{unit}<extra></extra>'),
+        go.Scatter(x=reduced[x], y=reduced[y], mode='lines', line=dict(width=2, color=color), name=name,
+                   customdata=np.asarray(reduced['n']),
+                   hovertemplate=f'<b>%{{x}}</b><br>Média: %{{y:.1f}}{unit} (%{{customdata}} registos)<extra></extra>'),
+    ]
@@ -1,8 +1,49 @@
 import json
+import os
+import copy
+import tempfile
 import pandas as pd
+from contextlib import contextmanager
 from datetime import datetime, time
 from typing import Dict, List, Optional, Tuple
 import streamlit as st
+import numpy as np
+from .work_calendar import year_calendar
+
+# Bloqueio entre processos: fcntl em Linux/macOS, msvcrt em Windows
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+CONFIG_DIR = 'config'
+CONFIG_PATH = os.path.join(CONFIG_DIR, 'horarios.json')
+
+def employee_key(value) -> str:
+    """Número de funcionário normalizado como texto ('138', não '138.0'; '' se ausente)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def employee_keys(values) -> np.ndarray:
+    """`employee_key` de cada valor de uma série (calculado uma vez por valor distinto)."""
+    codes, uniques = pd.factorize(pd.Series(values))
+    return np.array([employee_key(value) for value in uniques] + [''], dtype=object)[codes]
+
+
+def config_file_key() -> Optional[Tuple[int, int]]:
+    """(mtime, tamanho) do ficheiro de configurações gravado, ou None se não existir."""
+    try:
+        stat = os.stat(CONFIG_PATH)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
 
 class ConfigManager:
     """
@@ -11,8 +52,18 @@ class ConfigManager:
     - Tolerâncias personalizadas
     - Perfis de funcionários
     - Regras de deteção inteligente
+    
+    O ficheiro guarda uma versão ('versao') que aumenta a cada gravação.
+    As gravações são atómicas (ficheiro temporário + rename) e só são
+    aceites se a versão no disco ainda for a que foi carregada.
     """
     
+    # Conteúdo do ficheiro já lido, partilhado entre instâncias: (mtime, tamanho) -> configuração
+    _file_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+    
+    # Tabelas resolvidas por `_resolve_pairs`, por (versão, pares funcionário/setor)
+    _resolved_cache: Dict[Tuple, Tuple[np.ndarray, pd.DataFrame]] = {}
+    
     def __init__(self):
         """Inicializa o gestor de configurações."""
         self.default_config = {
@@ -74,7 +125,10 @@ class ConfigManager:
                     'dias_trabalho': ['segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado']
                 }
             },
-            'perfis_funcionario': {},  # Para configurações individuais
+            'configuracao_global': {},  # Campos comuns a todos os setores (sobrepostos pelo setor)
+            'perfis_equipa': {},  # Campos alterados por equipa
+            'perfis_funcionario': {},  # Campos alterados por funcionário ('equipa' indica a equipa)
+            'feriados_locais': [],  # 'MM-DD' (todos os anos) ou 'YYYY-MM-DD'; os setores podem acrescentar os seus
             'tipos_dia_sem_picagem': ['folga', 'férias', 'feriado', 'ausência', 'baixa médica'],
             'algoritmos_detecao': {
                 'esquecimento_vs_atraso': True,
@@ -83,34 +137,126 @@ class ConfigManager:
             }
         }
         
-        # Tentar carregar configurações salvas
+        # Tentar carregar configurações salvas (define também self.version)
+        self.version = 0
+        self._file_key = None
+        self.save_conflict = False
+        self._modified = False
         self.current_config = self._load_config()
     
     def _load_config(self) -> Dict:
-        """Carrega configurações salvas ou usa padrão."""
+        """
+        Carrega configurações salvas ou usa padrão.
+        
+        O ficheiro só é relido quando muda (mtime/tamanho); caso contrário
+        usa-se a cópia partilhada entre instâncias.
+        """
         try:
-            with open('config/horarios.json', 'r', encoding='utf-8') as f:
-                saved_config = json.load(f)
-                # Mesclar com configurações padrão para garantir completude
-                config = self.default_config.copy()
-                config.update(saved_config)
-                return config
+            stat = os.stat(CONFIG_PATH)
+            file_key = (stat.st_mtime_ns, stat.st_size)
+            cached = ConfigManager._file_cache.get(CONFIG_PATH)
+            if cached is None or cached[0] != file_key:
+                with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+                    cached = (file_key, json.load(f))
+                ConfigManager._file_cache[CONFIG_PATH] = cached
+            saved_config = copy.deepcopy(cached[1])
+            self.version = int(saved_config.pop('versao', 0))
+            self._file_key = file_key
+            
+            # Mesclar com configurações padrão para garantir completude
+            config = self.default_config.copy()
+            config.update(saved_config)
+            return config
         except (FileNotFoundError, json.JSONDecodeError):
+            self.version = 0
+            self._file_key = None
             return self.default_config.copy()
     
+    def _read_disk_version(self) -> int:
+        """Versão atualmente gravada no disco (0 se não houver ficheiro válido)."""
+        try:
+            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+                return int(json.load(f).get('versao', 0))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+    
+    @contextmanager
+    def _config_lock(self):
+        """
+        Bloqueio exclusivo entre processos durante a gravação.
+        
+        Em Windows bloqueia o primeiro byte do ficheiro de bloqueio com
+        msvcrt (LK_LOCK tenta durante cerca de 10 segundos e depois falha
+        com OSError; continua-se a tentar até obter o bloqueio).
+        """
+        with open(CONFIG_PATH + '.lock', 'a+') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                return
+            
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    
     def save_config(self) -> bool:
-        """Salva configurações atuais."""
+        """
+        Salva configurações atuais de forma atómica.
+        
+        Falha (devolve False e marca `save_conflict`) se outra sessão gravou
+        entretanto uma versão mais recente; nesse caso é preciso recarregar.
+        """
+        self.save_conflict = False
         try:
-            import os
-            os.makedirs('config', exist_ok=True)
+            os.makedirs(CONFIG_DIR, exist_ok=True)
             
-            with open('config/horarios.json', 'w', encoding='utf-8') as f:
-                json.dump(self.current_config, f, indent=2, ensure_ascii=False)
+            with self._config_lock():
+                disk_version = self._read_disk_version()
+                if disk_version != self.version:
+                    self.save_conflict = True
+                    print(f"Erro ao salvar configurações: versão {disk_version} no disco, "
+                          f"esperada {self.version} (alterada por outra sessão)")
+                    return False
+                
+                new_version = self.version + 1
+                data = dict(self.current_config, versao=new_version)
+                fd, temp_path = tempfile.mkstemp(dir=CONFIG_DIR, prefix='.horarios.', suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, indent=2, ensure_ascii=False)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_path, CONFIG_PATH)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+                
+                self.version = new_version
+                self._modified = False
             return True
         except Exception as e:
             print(f"Erro ao salvar configurações: {e}")
             return False
     
+    def reload_config(self) -> None:
+        """Descarta alterações locais e carrega a versão mais recente do disco."""
+        self.current_config = self._load_config()
+        self.save_conflict = False
+        self._modified = False
+    
     def get_sector_config(self, sector: str) -> Dict:
         """Obtém configuração de um setor específico."""
         return self.current_config['horarios_setor'].get(
@@ -119,23 +265,118 @@ class ConfigManager:
         )
     
     def get_employee_config(self, employee_number: str, sector: str) -> Dict:
-        """Obtém configuração específica de um funcionário ou do setor."""
-        # Verificar se há configuração individual
-        if employee_number in self.current_config['perfis_funcionario']:
-            return self.current_config['perfis_funcionario'][employee_number]
+        """
+        Obtém a configuração efectiva de um funcionário.
+        
+        As camadas são herdadas por esta ordem: global, setor, equipa e
+        funcionário. Cada perfil de equipa ou funcionário guarda apenas os
+        campos que altera; o funcionário indica a equipa no campo 'equipa'.
+        """
+        profile = self.current_config['perfis_funcionario'].get(employee_key(employee_number), {})
+        config = self._inherited_config(sector, profile.get('equipa'))
+        config.update({key: value for key, value in profile.items() if key != 'equipa'})
+        return config
+    
+    def get_team_config(self, team: str) -> Dict:
+        """Obtém os campos alterados pelo perfil de uma equipa."""
+        return self.current_config.get('perfis_equipa', {}).get(team, {})
+    
+    def _inherited_config(self, sector: str, team: Optional[str] = None) -> Dict:
+        """Configuração global, sobreposta pela do setor e pela da equipa (se houver)."""
+        config = dict(self.current_config.get('configuracao_global', {}))
+        config.update(self.get_sector_config(sector))
+        if team:
+            config.update(self.get_team_config(team))
+        return config
+    
+    def resolve_employee_configs(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Resolve a configuração efectiva de cada funcionário presente num DataFrame.
         
-        # Usar configuração do setor
-        return self.get_sector_config(sector)
+        A herança é resolvida uma vez por par (Numero, Departamento) e o
+        resultado é uma tabela em colunas, uma linha por par.
+        
+        Returns:
+            DataFrame com Numero, Departamento e um campo de configuração por coluna
+        """
+        _, table = self._resolve_pairs(df)
+        return table.copy()
+    
+    def join_employee_configs(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Configuração efectiva de cada linha, alinhada com o índice do DataFrame.
+        
+        Junta a tabela de `resolve_employee_configs` às linhas por (Numero,
+        Departamento), sem resolver dicionários linha a linha.
+        """
+        codes, table = self._resolve_pairs(df)
+        return table.drop(columns=['Numero', 'Departamento']).iloc[codes].set_axis(df.index)
+    
+    def _resolve_pairs(self, df: pd.DataFrame) -> Tuple[np.ndarray, pd.DataFrame]:
+        """Códigos do par (Numero, Departamento) de cada linha e tabela resolvida por par."""
+        pairs = self._employee_sector_pairs(df)
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(pairs), use_na_sentinel=False)
+        
+        # Com a configuração igual à do disco, a tabela só depende da versão
+        # (e do ficheiro, caso seja editado à mão sem mudar a versão) e dos pares
+        cache_key = None if self._modified else (self.version, self._file_key, tuple(uniques))
+        if cache_key is not None and cache_key in ConfigManager._resolved_cache:
+            return codes, ConfigManager._resolved_cache[cache_key]
+        
+        unique_pairs = pd.DataFrame(list(uniques), columns=['Numero', 'Departamento'])
+        records = [self.get_employee_config(numero, sector)
+                   for numero, sector in zip(unique_pairs['Numero'], unique_pairs['Departamento'])]
+        table = pd.concat([unique_pairs, pd.DataFrame.from_records(records)], axis=1)
+        if cache_key is not None:
+            # Versões antigas deixam de ser usadas: manter apenas a atual
+            for key in [key for key in ConfigManager._resolved_cache if key[:2] != cache_key[:2]]:
+                del ConfigManager._resolved_cache[key]
+            ConfigManager._resolved_cache[cache_key] = table
+        return codes, table
+    
+    def _employee_sector_pairs(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Pares (Numero, Departamento) de cada linha (Numero '' e Produção por omissão)."""
+        if 'Numero' in df.columns:
+            numeros = employee_keys(df['Numero'])
+        else:
+            numeros = np.full(len(df), '', dtype=object)
+        sectors = (df['Departamento'].to_numpy(dtype=object) if 'Departamento' in df.columns
+                   else np.full(len(df), 'Produção', dtype=object))
+        return pd.DataFrame({'Numero': numeros, 'Departamento': sectors})
     
     def update_sector_config(self, sector: str, config: Dict) -> None:
         """Atualiza configuração de um setor."""
         self.current_config['horarios_setor'][sector] = config
+        self._modified = True
     
-    def update_employee_config(self, employee_number: str, config: Dict) -> None:
-        """Atualiza configuração individual de um funcionário."""
-        self.current_config['perfis_funcionario'][employee_number] = config
+    def update_team_config(self, team: str, config: Dict, sector: Optional[str] = None) -> None:
+        """
+        Atualiza o perfil de uma equipa.
+        
+        Com `sector`, guarda apenas os campos diferentes da configuração herdada.
+        """
+        if sector is not None:
+            inherited = self._inherited_config(sector)
+            config = {key: value for key, value in config.items() if inherited.get(key) != value}
+        self.current_config.setdefault('perfis_equipa', {})[team] = config
+        self._modified = True
     
-    def analyze_punch_pattern(self, timestamps: List[Tuple[str, str]], config: Dict) -> Dict:
+    def update_employee_config(self, employee_number: str, config: Dict, sector: Optional[str] = None) -> None:
+        """
+        Atualiza configuração individual de um funcionário.
+        
+        Com `sector`, guarda apenas os campos diferentes da configuração
+        herdada (global, setor e equipa).
+        """
+        if sector is not None:
+            inherited = self._inherited_config(sector, config.get('equipa'))
+            config = {key: value for key, value in config.items()
+                      if key == 'equipa' or inherited.get(key) != value}
+        self.current_config['perfis_funcionario'][employee_key(employee_number)] = config
+        self._modified = True
+    
+    def analyze_punch_pattern(self, timestamps: List[Tuple[str, str]], config: Dict,
+                              profile: Optional[Dict[str, Dict]] = None) -> Dict:
         """
         Analisa padrão de picagens usando configurações dinâmicas.
         
@@ -144,6 +385,9 @@ class ConfigManager:
         - Esquecimento de picagem (atraso > tolerância de esquecimento)
         - Saída antecipada
         - Padrão normal
+        
+        `profile` (coluna -> perfil do PunchProfileIndex) permite sugerir as
+        picagens em falta a partir do histórico do funcionário.
         """
         if not timestamps:
             return {
@@ -172,19 +416,23 @@ class ConfigManager:
             )
             
             if col_primeira.startswith('S'):  # Começou com saída
+                hora_entrada, confianca = self._suggest_from_profile(
+                    profile, 'E' + col_primeira[1:], entrada_padrao, 0.9, before=hora_primeira)
                 return {
                     'tipo_analise': 'esqueceu_entrada',
-                    'confianca': 0.9,
-                    'sugestao': f'Adicionar entrada às {entrada_padrao}',
+                    'confianca': confianca,
+                    'sugestao': f'Adicionar entrada às {hora_entrada}',
                     'detalhes': f'Primeira picagem é saída ({hora_primeira}), falta entrada'
                 }
             
             elif diferenca_entrada > tolerancia_esquecimento:
                 # Atraso muito grande - provavelmente esqueceu de picar
-                hora_sugerida = self._calculate_suggested_entry_time(hora_primeira, entrada_padrao)
+                profile_entry = (profile or {}).get(col_primeira)
+                hora_sugerida = self._calculate_suggested_entry_time(hora_primeira, entrada_padrao, profile_entry)
+                confianca = profile_entry['confianca'] if hora_sugerida == self._profile_time(profile_entry) else 0.8
                 return {
                     'tipo_analise': 'possivel_esquecimento_entrada',
-                    'confianca': 0.8,
+                    'confianca': confianca,
                     'sugestao': f'Verificar se esqueceu entrada às {hora_sugerida}',
                     'detalhes': f'Atraso de {diferenca_entrada}min (>{tolerancia_esquecimento}min) sugere esquecimento'
                 }
@@ -200,7 +448,7 @@ class ConfigManager:
         
         # Analisar padrão geral
         if len(timestamps) % 2 != 0:
-            return self._analyze_odd_pattern(timestamps, config)
+            return self._analyze_odd_pattern(timestamps, config, profile)
         
         # Analisar última picagem (saída)
         if len(timestamps) >= 2:
@@ -208,10 +456,12 @@ class ConfigManager:
             col_ultima, hora_ultima = ultima_picagem
             
             if col_ultima.startswith('E'):  # Terminou com entrada
+                hora_saida, confianca = self._suggest_from_profile(
+                    profile, 'S' + col_ultima[1:], saida_padrao, 0.8, after=hora_ultima)
                 return {
                     'tipo_analise': 'esqueceu_saida',
-                    'confianca': 0.8,
-                    'sugestao': f'Adicionar saída às {saida_padrao}',
+                    'confianca': confianca,
+                    'sugestao': f'Adicionar saída às {hora_saida}',
                     'detalhes': f'Última picagem é entrada ({hora_ultima}), falta saída'
                 }
         
@@ -222,17 +472,20 @@ class ConfigManager:
             'detalhes': 'Padrão de picagens normal'
         }
     
-    def _analyze_odd_pattern(self, timestamps: List[Tuple[str, str]], config: Dict) -> Dict:
+    def _analyze_odd_pattern(self, timestamps: List[Tuple[str, str]], config: Dict,
+                             profile: Optional[Dict[str, Dict]] = None) -> Dict:
         """Analisa padrões com número ímpar de timestamps."""
         count = len(timestamps)
         
         if count == 1:
             primeira = timestamps[0]
             if primeira[0].startswith('E'):
+                hora_saida, confianca = self._suggest_from_profile(
+                    profile, 'S' + primeira[0][1:], config['saida_padrao'], 0.9, after=primeira[1])
                 return {
                     'tipo_analise': 'esqueceu_saida',
-                    'confianca': 0.9,
-                    'sugestao': f'Adicionar saída às {config["saida_padrao"]}',
+                    'confianca': confianca,
+                    'sugestao': f'Adicionar saída às {hora_saida}',
                     'detalhes': 'Apenas entrada registada'
                 }
             else:
@@ -287,8 +540,19 @@ class ConfigManager:
         except ValueError:
             return 0
     
-    def _calculate_suggested_entry_time(self, first_punch: str, standard_entry: str) -> str:
-        """Calcula horário de entrada sugerido baseado na primeira picagem."""
+    def _calculate_suggested_entry_time(self, first_punch: str, standard_entry: str,
+                                        profile_entry: Optional[Dict] = None) -> str:
+        """
+        Calcula horário de entrada sugerido baseado na primeira picagem.
+        
+        Com perfil histórico, sugere a entrada habitual do funcionário (se for
+        anterior à primeira picagem); caso contrário, o ponto médio entre o
+        horário padrão e a primeira picagem.
+        """
+        profile_time = self._profile_time(profile_entry)
+        if profile_time and self._calculate_time_difference_minutes(profile_time, first_punch) > 0:
+            return profile_time
+        
         try:
             first_time = datetime.strptime(first_punch, '%H:%M').time()
             standard_time = datetime.strptime(standard_entry, '%H:%M').time()
@@ -307,16 +571,102 @@ class ConfigManager:
         except ValueError:
             return standard_entry
     
-    def is_work_day(self, date: datetime, sector: str) -> bool:
-        """Verifica se uma data é dia de trabalho para um setor."""
+    def _profile_time(self, profile_entry: Optional[Dict]) -> str:
+        """Hora mediana (HH:MM) de um perfil de picagem, ou '' sem perfil."""
+        if not profile_entry:
+            return ''
+        minutes = int(profile_entry['mediana'])
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+    
+    def _suggest_from_profile(self, profile: Optional[Dict[str, Dict]], column: str, default_time: str,
+                              default_confidence: float, before: str = '', after: str = '') -> Tuple[str, float]:
+        """
+        Sugere a hora de uma picagem em falta a partir do perfil do funcionário.
+        
+        O perfil só é usado se for coerente com as picagens vizinhas (antes de
+        `before` / depois de `after`); caso contrário mantém-se a hora padrão.
+        """
+        profile_entry = (profile or {}).get(column)
+        profile_time = self._profile_time(profile_entry)
+        if not profile_time:
+            return default_time, default_confidence
+        if before and self._calculate_time_difference_minutes(profile_time, before) <= 0:
+            return default_time, default_confidence
+        if after and self._calculate_time_difference_minutes(after, profile_time) <= 0:
+            return default_time, default_confidence
+        return profile_time, profile_entry['confianca']
+    
+    def _calendar_key(self, sector: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Dias de trabalho e feriados locais (globais + setor) que definem o calendário de um setor."""
         config = self.get_sector_config(sector)
-        day_names = {
-            0: 'segunda', 1: 'terça', 2: 'quarta', 3: 'quinta',
-            4: 'sexta', 5: 'sábado', 6: 'domingo'
-        }
+        local_holidays = list(self.current_config.get('feriados_locais', [])) + list(config.get('feriados_locais', []))
+        return tuple(config.get('dias_trabalho', [])), tuple(local_holidays)
+    
+    def is_work_day(self, date: datetime, sector: str) -> bool:
+        """Verifica se uma data é dia de trabalho para um setor (exclui feriados)."""
+        work, _ = year_calendar(date.year, *self._calendar_key(sector))
+        return bool(work[date.timetuple().tm_yday - 1])
+    
+    def is_holiday(self, date: datetime, sector: str) -> bool:
+        """Verifica se uma data é feriado nacional ou local para um setor."""
+        _, holidays = year_calendar(date.year, *self._calendar_key(sector))
+        return bool(holidays[date.timetuple().tm_yday - 1])
+    
+    def get_work_calendar(self, sector: str, start, end) -> pd.DataFrame:
+        """
+        Calendário diário de um setor entre duas datas (inclusive).
         
-        day_name = day_names.get(date.weekday(), '')
-        return day_name in config.get('dias_trabalho', [])
+        Returns:
+            DataFrame indexado por data com as colunas booleanas
+            'dia_util' e 'feriado'
+        """
+        days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+        key = self._calendar_key(sector)
+        work, holidays = [], []
+        for year in range(days[0].year, days[-1].year + 1) if len(days) else []:
+            year_work, year_holidays = year_calendar(year, *key)
+            work.append(year_work)
+            holidays.append(year_holidays)
+        if not work:
+            return pd.DataFrame({'dia_util': [], 'feriado': []}, index=days, dtype=bool)
+        offset = days[0].dayofyear - 1
+        return pd.DataFrame({
+            'dia_util': np.concatenate(work)[offset:offset + len(days)],
+            'feriado': np.concatenate(holidays)[offset:offset + len(days)],
+        }, index=days)
+    
+    def work_day_masks(self, dates, sectors=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Máscaras de dia útil e de feriado para uma série de datas.
+        
+        Constrói o calendário de cada setor presente sobre o intervalo de
+        datas e obtém as máscaras com uma única indexação (setor, dia).
+        
+        Args:
+            dates: Série de datas
+            sectors: Setor de cada linha (None = Produção)
+        
+        Returns:
+            Tuplo (dia_util, feriado) de arrays booleanos; datas inválidas são False
+        """
+        dates = pd.to_datetime(pd.Series(dates), errors='coerce').dt.normalize()
+        n_rows = len(dates)
+        valid = dates.notna().to_numpy()
+        if not valid.any():
+            return np.zeros(n_rows, dtype=bool), np.zeros(n_rows, dtype=bool)
+        
+        if sectors is None:
+            sector_codes, unique_sectors = np.zeros(n_rows, dtype=int), ['Produção']
+        else:
+            sector_codes, unique_sectors = pd.factorize(pd.Series(sectors), use_na_sentinel=False)
+        
+        start, end = dates.min(), dates.max()
+        calendars = [self.get_work_calendar(sector, start, end) for sector in unique_sectors]
+        work = np.vstack([calendar['dia_util'].to_numpy() for calendar in calendars])
+        holidays = np.vstack([calendar['feriado'].to_numpy() for calendar in calendars])
+        
+        offset = np.where(valid, (dates - start).dt.days.fillna(0).astype(int).to_numpy(), 0)
+        return work[sector_codes, offset] & valid, holidays[sector_codes, offset] & valid
     
     def should_ignore_missing_punches(self, day_type: str) -> bool:
         """Verifica se um tipo de dia deve ignorar picagens em falta."""
@@ -441,6 +791,13 @@ class ConfigManager:
             key=f"dias_{sector}"
         )
         
+        feriados_texto = st.text_input(
+            "Feriados Locais",
+            value=', '.join(current_config.get('feriados_locais', [])),
+            help="Além dos feriados nacionais. Datas separadas por vírgula: MM-DD (todos os anos) ou AAAA-MM-DD",
+            key=f"feriados_{sector}"
+        )
+        
         # Botão para salvar
         if st.button(f"💾 Salvar Configurações - {sector}", key=f"save_{sector}"):
             new_config = {
@@ -455,12 +812,16 @@ class ConfigManager:
                 'tolerancia_esquecimento': int(tolerancia_esquecimento),
                 'tolerancia_intervalo': int(tolerancia_intervalo),
                 'picagens_esperadas': picagens_esperadas if picagens_esperadas == 'auto' else int(picagens_esperadas),
-                'dias_trabalho': dias_selecionados
+                'dias_trabalho': dias_selecionados,
+                'feriados_locais': [data.strip() for data in feriados_texto.split(',') if data.strip()]
             }
             
             self.update_sector_config(sector, new_config)
             if self.save_config():
                 st.success(f"✅ Configurações do setor {sector} salvas com sucesso!")
+            elif self.save_conflict:
+                self.reload_config()
+                st.error("❌ As configurações foram alteradas noutra sessão. Foram recarregadas; volte a aplicar as alterações.")
             else:
                 st.error("❌ Erro ao salvar configurações")
         
@@ -5,9 +5,14 @@ import streamlit as st
 import csv
 import io
 import hashlib
+from .categories import apply_categorical_dtypes, ensure_categories
+from .punch_profile import PunchProfileIndex
 
 class CSVProcessor:
-    def __init__(self):
+    def __init__(self, punch_profile=None):
+        # Histórico de picagens por funcionário (partilhável entre processadores)
+        self.punch_profile = punch_profile if punch_profile is not None else PunchProfileIndex()
+        
         # Mapa para normalizar nomes de colunas que variam entre ficheiros
         self.HEADER_NORMALIZATION_MAP = {
             'Obj.': 'Obj',
@@ -405,6 +410,9 @@ class CSVProcessor:
             # 9. Análise avançada de pontualidade (Fase 3)
             df = self._analyze_advanced_punctuality(df)
             
+            # 10. Colunas de estado como categóricas (menos memória, filtros por código)
+            df = apply_categorical_dtypes(df)
+            
             return df
             
         except Exception as e:
@@ -508,8 +516,7 @@ class CSVProcessor:
         try:
             from .rules_engine import RulesEngine
             
-            rules_engine = RulesEngine()
-            sector_rules = rules_engine.get_rules(sector)
+            sector_rules = RulesEngine.shared().get_rules(sector)
             
             # Reaplicar análise de intervalos com regras do setor
             df = self._analyze_detailed_intervals(df, sector_rules)
@@ -517,7 +524,7 @@ class CSVProcessor:
             # Reaplicar análise de pontualidade com regras do setor
             df = self._analyze_advanced_punctuality(df, sector_rules)
             
-            return df
+            return apply_categorical_dtypes(df)
             
         except ImportError:
             return df
@@ -525,13 +532,36 @@ class CSVProcessor:
             print(f"Aviso: Erro ao aplicar regras do setor {sector}: {e}")
             return df
     
+    def reprocess_rows(self, df, index, sector="default", recompute=None):
+        """
+        Reaplica as regras do setor apenas às linhas indicadas, atualizando `df` no lugar.
+        
+        As análises de intervalos e de pontualidade são independentes por linha,
+        por isso corrigir uma picagem não obriga a reprocessar o DataFrame inteiro.
+        `recompute` (DataFrame -> DataFrame) recalcula as métricas derivadas das
+        mesmas linhas depois das regras.
+        """
+        rows = self.apply_sector_rules(df.loc[index].copy(), sector)
+        if recompute is not None:
+            rows = recompute(rows)
+        for col in rows.columns:
+            values = rows[col]
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                values = values.astype(object)
+                ensure_categories(df, col, values.dropna())
+            df.loc[index, col] = values
+        return df
+    
     def _analyze_advanced_punctuality(self, df, sector_rules=None):
         """Aplica análise avançada de pontualidade usando o PunctualityAnalyzer."""
         try:
             from .punctuality_analyzer import PunctualityAnalyzer
             
+            # Acrescentar os dias ainda não vistos ao histórico de picagens
+            self.punch_profile.update(df)
+            
             # Criar analisador com regras específicas ou padrão
-            analyzer = PunctualityAnalyzer(sector_rules)
+            analyzer = PunctualityAnalyzer(sector_rules, punch_profile=self.punch_profile)
             
             # Aplicar análise de pontualidade
             df = analyzer.analyze_punctuality_issues(df, sector_rules)
@@ -621,7 +651,7 @@ class CSVProcessor:
         stats = {
             'total_dias': len(df),
             'periodo_analisado': f"{df['Data'].min().strftime('%d/%m/%Y')} - {df['Data'].max().strftime('%d/%m/%Y')}",
-            'tipos_dia': df['Tipo'].value_counts().to_dict(),
+            'tipos_dia': df['Tipo'].value_counts().loc[lambda counts: counts > 0].to_dict(),
             'total_trabalho': df['total_trabalho'].sum(),
             'total_pausas': df['total_pausas'].sum()
         }
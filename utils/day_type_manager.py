@@ -1,7 +1,143 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime, time, timedelta
 from typing import Dict, List, Optional, Tuple
 import streamlit as st
+from .categories import ensure_categories
+from .config_manager import employee_keys
+from .csv_processor import CSVProcessor
+from .time_utils import EMPTY_PUNCH_VALUES, punch_matrix, compact_punches
+
+# Valores que não contam como picagem na classificação de dias
+DAY_TYPE_EMPTY_PUNCHES = EMPTY_PUNCH_VALUES + ('0:00',)
+
+
+class DayTypeEditLog:
+    """
+    Registo de alterações em massa com desfazer/refazer.
+    
+    Cada operação guarda apenas as linhas afetadas (rótulos do índice), a
+    coluna e os valores antigos e novos, e é aplicada como uma única
+    atribuição vectorizada. Desfazer/refazer move um cursor e reaplica os
+    valores guardados, sem cópias do DataFrame; só as linhas afetadas são
+    reprocessadas com as regras do setor (`CSVProcessor.reprocess_rows`) e
+    as suas métricas derivadas recalculadas (função `recompute`).
+    """
+    
+    def __init__(self, kpi_calc=None, processor=None, memo=None):
+        """
+        Inicializa um registo vazio.
+        
+        Args:
+            kpi_calc: KPICalculator cujo cubo de agregados é atualizado por delta a cada escrita
+            processor: CSVProcessor que reaplica as regras do setor às linhas alteradas
+            memo: SectorRulesMemo onde o DataFrame resultante é registado (o rerun seguinte não o reprocessa)
+        """
+        self._operations: List[Dict] = []
+        self._cursor = 0
+        self.kpi_calc = kpi_calc
+        self.processor = processor
+        self.memo = memo
+    
+    def __len__(self) -> int:
+        return self._cursor
+    
+    @property
+    def can_undo(self) -> bool:
+        return self._cursor > 0
+    
+    @property
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._operations)
+    
+    def apply(self, df: pd.DataFrame, mask, column: str, new_values, description: str = '',
+              recompute=None, sector: str = "default") -> int:
+        """
+        Altera `column` nas linhas da máscara e regista a operação.
+        
+        Args:
+            df: DataFrame alterado no local
+            mask: Máscara booleana (ou rótulos) das linhas a alterar
+            column: Coluna a alterar
+            new_values: Valor único ou um valor por linha selecionada
+            description: Texto mostrado no histórico
+            recompute: Função DataFrame -> DataFrame que recalcula as métricas derivadas
+            sector: Setor cujas regras são reaplicadas às linhas alteradas
+            
+        Returns:
+            Número de linhas efetivamente alteradas
+        """
+        keys = df.index[mask] if np.asarray(mask).dtype == bool else pd.Index(mask)
+        new = np.broadcast_to(np.asarray(new_values, dtype=object), (len(keys),))
+        old = df.loc[keys, column].astype(object).to_numpy() if column in df.columns else np.full(len(keys), None, dtype=object)
+        
+        # Ignorar linhas que já têm o valor pretendido
+        changed = np.array([not (o == n or (pd.isna(o) and pd.isna(n))) for o, n in zip(old, new)], dtype=bool)
+        if not changed.any():
+            return 0
+        
+        operation = {
+            'keys': keys[changed], 'column': column,
+            'old': old[changed], 'new': np.array(new[changed], dtype=object),
+            'description': description or f"{column}: {int(changed.sum())} linhas",
+        }
+        # Uma nova operação descarta as operações desfeitas (refazer)
+        del self._operations[self._cursor:]
+        self._operations.append(operation)
+        self._cursor += 1
+        self._write(df, operation['keys'], column, operation['new'], recompute, sector)
+        return int(changed.sum())
+    
+    def undo(self, df: pd.DataFrame, recompute=None, sector: str = "default") -> Optional[str]:
+        """Desfaz a última operação; devolve a sua descrição (None se não houver)."""
+        if not self.can_undo:
+            return None
+        self._cursor -= 1
+        operation = self._operations[self._cursor]
+        self._write(df, operation['keys'], operation['column'], operation['old'], recompute, sector)
+        return operation['description']
+    
+    def redo(self, df: pd.DataFrame, recompute=None, sector: str = "default") -> Optional[str]:
+        """Refaz a última operação desfeita; devolve a sua descrição (None se não houver)."""
+        if not self.can_redo:
+            return None
+        operation = self._operations[self._cursor]
+        self._cursor += 1
+        self._write(df, operation['keys'], operation['column'], operation['new'], recompute, sector)
+        return operation['description']
+    
+    def history(self) -> List[str]:
+        """Descrições das operações aplicadas (mais antiga primeiro)."""
+        return [operation['description'] for operation in self._operations[:self._cursor]]
+    
+    def _write(self, df: pd.DataFrame, keys: pd.Index, column: str, values: np.ndarray, recompute=None,
+               sector: str = "default"):
+        """Escreve os valores numa só atribuição e reprocessa só as linhas afetadas."""
+        # Linhas entretanto removidas do DataFrame são ignoradas
+        present = keys.isin(df.index)
+        keys, values = keys[present], values[present]
+        snapshot = self.kpi_calc.snapshot_rows(df, keys) if self.kpi_calc is not None and len(keys) else None
+        
+        DayTypeEditLog._assign(df, keys, column, values)
+        if self.processor is not None and len(keys) > 0:
+            # O tipo de dia entra na análise de pontualidade
+            self.processor.reprocess_rows(df, keys, sector, recompute=recompute)
+        elif recompute is not None and len(keys) > 0:
+            updated = recompute(df.loc[keys].copy())
+            for derived in updated.columns:
+                DayTypeEditLog._assign(df, keys, derived, updated[derived].to_numpy())
+        
+        if snapshot is not None:
+            self.kpi_calc.apply_row_edit(df, snapshot)
+        if self.memo is not None and self.processor is not None:
+            self.memo.record(df, sector, self.processor.punch_profile)
+    
+    @staticmethod
+    def _assign(df: pd.DataFrame, keys: pd.Index, column: str, values):
+        """Atribuição que respeita colunas categóricas (acrescenta categorias em falta)."""
+        if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+            ensure_categories(df, column, pd.unique(pd.Series(values, dtype=object).dropna()))
+        df.loc[keys, column] = values
 
 class DayTypeManager:
     """
@@ -123,6 +259,79 @@ class DayTypeManager:
         
         return 'Normal'  # Default
     
+    def classify_days(self, df: pd.DataFrame, work_days: Optional[np.ndarray] = None) -> pd.Series:
+        """
+        Classifica todos os dias de uma vez (mesmo resultado que
+        `classify_day_automatically` linha a linha).
+        
+        As regras de detecção passam a ser máscaras sobre o número de
+        picagens válidas, a duração entre picagens e o calendário:
+        - Normal: 2, 4, 6 ou 8 picagens e 6 a 12 horas da primeira à última
+        - Meio-dia: 2 picagens com 3.5 a 5 horas entre elas
+        - Falta Não Justificada: sem picagens num dia de trabalho
+        
+        Args:
+            df: DataFrame com colunas E/S, Data e (opcional) Tipo
+            work_days: Máscara de dias de trabalho (por omissão, o calendário do
+                setor de cada linha, sem fins de semana nem feriados)
+            
+        Returns:
+            Série com o tipo de cada dia (o Tipo já definido é mantido)
+        """
+        if df.empty:
+            return pd.Series(dtype=object, index=df.index)
+        
+        count, total_hours, pair_hours = self._punch_spans(df)
+        with np.errstate(invalid='ignore'):
+            normal = np.isin(count, [2, 4, 6, 8]) & (total_hours >= 6.0) & (total_hours <= 12.0)
+            half_day = (count == 2) & (pair_hours >= 3.5) & (pair_hours <= 5.0)
+        
+        if work_days is None:
+            if 'Data' in df.columns:
+                from .config_manager import ConfigManager
+                sectors = df['Departamento'] if 'Departamento' in df.columns else None
+                work_days, _ = ConfigManager().work_day_masks(df['Data'], sectors)
+            else:
+                work_days = np.zeros(len(df), dtype=bool)
+        absence = (count == 0) & np.asarray(work_days, dtype=bool)
+        
+        detected = np.select([normal, half_day, absence], ['Normal', 'Meio-dia', 'Falta Não Justificada'], default='Normal')
+        result = pd.Series(detected.astype(object), index=df.index)
+        
+        # Se já tem tipo definido manualmente, manter
+        if 'Tipo' in df.columns:
+            current = df['Tipo'].astype(object)
+            has_type = current.notna() & (current != '')
+            result = result.where(~has_type, current)
+        return result
+    
+    def _punch_spans(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Picagens válidas por linha e durações (horas) da primeira à última
+        e da primeira à segunda picagem (NaN se não existirem).
+        """
+        columns, present, minutes, _ = punch_matrix(df, empty_values=DAY_TYPE_EMPTY_PUNCHES)
+        valid = present & ~np.isnan(minutes)
+        order, count = compact_punches(valid)
+        rows = np.arange(len(df))
+        
+        def punch_at(position):
+            # Minutos da picagem válida na posição indicada (NaN se não existir)
+            if not columns:
+                return np.full(len(df), np.nan)
+            column = order[rows, np.clip(position, 0, len(columns) - 1)]
+            return np.where(position < count, minutes[rows, column], np.nan)
+        
+        def duration_hours(start, end):
+            # Se o fim é anterior ao início, assume que passou da meia-noite
+            return np.mod(end - start, 24 * 60) / 60.0
+        
+        first = punch_at(np.zeros(len(df), dtype=int))
+        with np.errstate(invalid='ignore'):
+            total_hours = duration_hours(first, punch_at(count - 1))
+            pair_hours = duration_hours(first, punch_at(np.ones(len(df), dtype=int)))
+        return count, total_hours, pair_hours
+    
     def _detect_normal_day(self, row: pd.Series) -> bool:
         """Detecta se é um dia normal de trabalho."""
         valid_punches = self._count_valid_punches(row)
@@ -157,11 +366,12 @@ class DayTypeManager:
         
         # Sem picagens válidas num dia que deveria ser de trabalho
         if valid_punches == 0:
-            # Verificar se é dia da semana (não fim de semana)
+            # Verificar se é dia de trabalho no calendário do setor (não fim de semana nem feriado)
             if 'Data' in row and pd.notna(row['Data']):
                 try:
+                    from .config_manager import ConfigManager
                     date = pd.to_datetime(row['Data'])
-                    return date.weekday() < 5  # Segunda a sexta
+                    return ConfigManager().is_work_day(date, row.get('Departamento', 'Produção'))
                 except:
                     pass
         
@@ -266,9 +476,11 @@ class DayTypeManager:
                 # Cálculo simples: primeira até última picagem menos pausas
                 total_span = self._calculate_duration_hours(timestamps[0], timestamps[-1])
                 
-                # Estimar pausas (almoço + intervalos)
-                estimated_breaks = self._estimate_break_time(timestamps)
-                metrics['actual_hours'] = max(0, total_span - estimated_breaks)
+                # Pausas reais da análise de intervalos (estimativa se não existir)
+                breaks = self._row_break_hours(row)
+                if breaks is None:
+                    breaks = self._estimate_break_time(timestamps)
+                metrics['actual_hours'] = max(0, total_span - breaks)
         
         # Verificar conformidade
         if day_info['requires_full_schedule']:
@@ -298,6 +510,15 @@ class DayTypeManager:
         
         return metrics
     
+    def _row_break_hours(self, row: pd.Series) -> Optional[float]:
+        """Pausas reais (horas) calculadas pelo IntervalAnalyzer, ou None se não disponíveis."""
+        if 'total_pausas_dia' not in row or pd.isna(row['total_pausas_dia']):
+            return None
+        try:
+            return pd.to_timedelta(row['total_pausas_dia']).total_seconds() / 3600
+        except (ValueError, TypeError):
+            return None
+    
     def _estimate_break_time(self, timestamps: List[str]) -> float:
         """Estima tempo total de pausas baseado no número de picagens."""
         num_punches = len(timestamps)
@@ -324,63 +545,116 @@ class DayTypeManager:
         if df.empty:
             return {}
         
-        # Classificar todos os dias automaticamente se necessário
+        # Classificar todos os dias de uma vez; o tipo original é mantido quando definido
         df_copy = df.copy()
-        df_copy['Tipo_Calculado'] = df_copy.apply(self.classify_day_automatically, axis=1)
+        df_copy['Tipo_Final'] = self.classify_days(df_copy)
         
-        # Usar tipo calculado se tipo original estiver vazio
-        df_copy['Tipo_Final'] = df_copy.apply(
-            lambda row: row['Tipo'] if pd.notna(row.get('Tipo', '')) and row.get('Tipo', '') != '' 
-            else row['Tipo_Calculado'], 
-            axis=1
-        )
+        day_metrics = self._day_type_metrics(df_copy)
         
-        # Contar tipos
-        type_counts = df_copy['Tipo_Final'].value_counts().to_dict()
+        # Uma única agregação por tipo, pela ordem de value_counts (mais frequente primeiro)
+        grouped = day_metrics.groupby('Tipo_Final', sort=False, observed=True).agg(
+            count=('actual_hours', 'size'),
+            total_hours=('actual_hours', 'sum'),
+            compliant_days=('compliance', 'sum'),
+            total_alerts=('alerts', 'sum'),
+        ).sort_values('count', ascending=False, kind='stable')
         
-        # Calcular métricas por tipo
         summary = {}
-        for day_type, count in type_counts.items():
-            day_info = self.get_day_type_info(day_type)
-            
-            # Filtrar linhas deste tipo
-            type_rows = df_copy[df_copy['Tipo_Final'] == day_type]
-            
-            # Calcular métricas
-            total_hours = 0
-            compliant_days = 0
-            total_alerts = 0
-            
-            for _, row in type_rows.iterrows():
-                metrics = self.calculate_expected_metrics(row, day_type)
-                total_hours += metrics['actual_hours']
-                if metrics['compliance']:
-                    compliant_days += 1
-                total_alerts += len(metrics['alerts'])
-            
+        for day_type, data in grouped.iterrows():
+            count = int(data['count'])
             summary[day_type] = {
                 'count': count,
-                'info': day_info,
-                'total_hours': total_hours,
-                'avg_hours': total_hours / count if count > 0 else 0,
-                'compliance_rate': compliant_days / count if count > 0 else 0,
-                'total_alerts': total_alerts
+                'info': self.get_day_type_info(day_type),
+                'total_hours': data['total_hours'],
+                'avg_hours': data['total_hours'] / count if count > 0 else 0,
+                'compliance_rate': data['compliant_days'] / count if count > 0 else 0,
+                'total_alerts': int(data['total_alerts'])
             }
         
         return summary
     
-    def create_streamlit_day_type_interface(self, df: pd.DataFrame) -> pd.DataFrame:
+    def create_day_type_breakdown(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Resumo de tipos de dia por funcionário (Numero, Tipo) numa só agregação.
+        
+        Returns:
+            DataFrame com dias, total_horas, media_horas, taxa_conformidade e
+            total_alertas por funcionário e tipo de dia
+        """
+        columns = ['Numero', 'Tipo', 'dias', 'total_horas', 'media_horas', 'taxa_conformidade', 'total_alertas']
+        if df.empty or 'Numero' not in df.columns:
+            return pd.DataFrame(columns=columns)
+        
+        day_metrics = self._day_type_metrics(df.assign(Tipo_Final=self.classify_days(df)))
+        day_metrics['Numero'] = employee_keys(df['Numero'])
+        breakdown = day_metrics.groupby(['Numero', 'Tipo_Final'], observed=True).agg(
+            dias=('actual_hours', 'size'),
+            total_horas=('actual_hours', 'sum'),
+            media_horas=('actual_hours', 'mean'),
+            taxa_conformidade=('compliance', 'mean'),
+            total_alertas=('alerts', 'sum'),
+        ).reset_index().rename(columns={'Tipo_Final': 'Tipo'})
+        return breakdown[columns]
+    
+    def _day_type_metrics(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Métricas de `calculate_expected_metrics` para todas as linhas de uma vez.
+        
+        Horas reais = primeira à última picagem menos as pausas reais da
+        análise de intervalos (total_pausas_dia); sem essa coluna usa-se a
+        estimativa por número de picagens.
+        """
+        day_types = df['Tipo_Final'].astype(object)
+        count, total_hours, _ = self._punch_spans(df)
+        
+        if 'total_pausas_dia' in df.columns:
+            breaks = pd.to_timedelta(df['total_pausas_dia'], errors='coerce').dt.total_seconds().to_numpy() / 3600
+        else:
+            breaks = np.full(len(df), np.nan)
+        estimated = np.select([count <= 2, count <= 4, count <= 6], [0.0, 1.0, 1.25], default=1.5)
+        breaks = np.where(np.isnan(breaks), estimated, breaks)
+        actual = np.where(count >= 2, np.maximum(0, total_hours - breaks), 0.0)
+        
+        # Propriedades de cada tipo (tipos desconhecidos usam as de 'Normal')
+        unique_types = pd.unique(day_types)
+        info = {day_type: self.get_day_type_info(day_type) for day_type in unique_types}
+        requires_full = day_types.map({t: i['requires_full_schedule'] for t, i in info.items()}).to_numpy(dtype=bool)
+        expected = day_types.map({t: i['expected_hours'] for t, i in info.items()}).to_numpy(dtype=float)
+        
+        # Tolerância de 30 minutos; mais de 1h extra gera alerta sem afetar a conformidade
+        short = requires_full & (actual < expected - 0.5)
+        overtime = requires_full & ~short & (actual > expected + 1.0)
+        unexpected = ~requires_full & (count > 0) & day_types.isin(['Férias', 'Falta Justificada', 'Feriado']).to_numpy()
+        
+        return pd.DataFrame({
+            'Tipo_Final': day_types,
+            'actual_hours': actual,
+            'compliance': ~(short | unexpected),
+            'alerts': (short | overtime | unexpected).astype(int),
+        }, index=df.index)
+    
+    def create_streamlit_day_type_interface(self, df: pd.DataFrame, recompute=None,
+                                            sector: str = "default") -> pd.DataFrame:
         """
         Cria interface Streamlit para gestão de tipos de dia.
         
         Args:
             df: DataFrame atual
+            recompute: Função que recalcula as métricas derivadas das linhas alteradas
+            sector: Setor cujas regras são reaplicadas às linhas alteradas
             
         Returns:
             DataFrame atualizado
         """
         st.write("### 📅 Gestão de Tipos de Dia")
         
+        if 'day_type_edit_log' not in st.session_state:
+            st.session_state['day_type_edit_log'] = DayTypeEditLog(
+                kpi_calc=st.session_state.get('kpi_calculator'),
+                processor=CSVProcessor(punch_profile=st.session_state.get('punch_profile')),
+                memo=st.session_state.get('sector_rules_memo'))
+        edit_log = st.session_state['day_type_edit_log']
+        
         # Mostrar resumo de tipos
         summary = self.create_day_type_summary(df)
         
@@ -416,6 +690,11 @@ class DayTypeManager:
                     </div>
                     """, unsafe_allow_html=True)
         
+        # Resumo por funcionário quando há vários
+        if 'Numero' in df.columns and df['Numero'].nunique() > 1:
+            with st.expander("👥 Tipos de dia por funcionário"):
+                st.dataframe(self.create_day_type_breakdown(df), use_container_width=True)
+        
         # Interface para edição em massa
         st.write("#### ✏️ Edição de Tipos de Dia")
         
@@ -445,9 +724,11 @@ class DayTypeManager:
                 st.write("")  # Espaçamento
                 if st.button("🔄 Aplicar Alterações", help="Aplicar novo tipo às datas selecionadas"):
                     if selected_dates:
-                        # Aplicar alterações
-                        mask = df['Data'].dt.date.isin(selected_dates)
-                        df.loc[mask, 'Tipo'] = new_type
+                        # Aplicar alterações (uma operação no registo, só as linhas afetadas são recalculadas)
+                        mask = df['Data'].dt.date.isin(selected_dates).to_numpy()
+                        edit_log.apply(df, mask, 'Tipo', new_type,
+                                       description=f"Tipo '{new_type}' em {len(selected_dates)} datas",
+                                       recompute=recompute, sector=sector)
                         
                         st.success(f"✅ Tipo '{new_type}' aplicado a {len(selected_dates)} dias!")
                         st.rerun()
@@ -461,15 +742,13 @@ class DayTypeManager:
         
         with col1:
             if st.button("🔍 Executar Detecção Automática", help="Classifica automaticamente dias sem tipo definido"):
-                updated_count = 0
-                
-                for index, row in df.iterrows():
-                    current_type = row.get('Tipo', '')
-                    if pd.isna(current_type) or current_type == '':
-                        new_type = self.classify_day_automatically(row)
-                        if new_type != 'Normal':  # Só atualizar se detectou algo específico
-                            df.loc[index, 'Tipo'] = new_type
-                            updated_count += 1
+                detected = self.classify_days(df)
+                current_type = df['Tipo'].astype(object) if 'Tipo' in df.columns else pd.Series('', index=df.index)
+                # Só atualizar dias sem tipo em que se detectou algo específico
+                mask = ((current_type.isna() | (current_type == '')) & (detected != 'Normal')).to_numpy()
+                updated_count = edit_log.apply(df, mask, 'Tipo', detected[mask].to_numpy(),
+                                               description="Detecção automática", recompute=recompute,
+                                               sector=sector)
                 
                 if updated_count > 0:
                     st.success(f"✅ {updated_count} dias classificados automaticamente!")
@@ -482,4 +761,20 @@ class DayTypeManager:
                 for day_type, info in self.day_types.items():
                     st.markdown(f"**{info['icon']} {day_type}:** {info['description']}")
         
+        # Desfazer / refazer alterações
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("↩️ Desfazer", disabled=not edit_log.can_undo, help="Desfaz a última alteração de tipos de dia"):
+                description = edit_log.undo(df, recompute=recompute, sector=sector)
+                st.success(f"↩️ Desfeito: {description}")
+                st.rerun()
+        with col2:
+            if st.button("↪️ Refazer", disabled=not edit_log.can_redo, help="Refaz a última alteração desfeita"):
+                description = edit_log.redo(df, recompute=recompute, sector=sector)
+                st.success(f"↪️ Refeito: {description}")
+                st.rerun()
+        with col3:
+            if edit_log.history():
+                st.caption("Histórico: " + " → ".join(edit_log.history()[-3:]))
+        
         return df 
\ No newline at end of file
@@ -1,13 +1,39 @@
 import pandas as pd
-from datetime import datetime, timedelta
 import numpy as np
+from typing import Callable, Dict, List, Optional
+from .rule_dsl import CompiledRule, RuleContext, RuleResults, compile_rule
+from .time_utils import punch_matrix, compact_punches, minutes_to_hhmm
 
 class IntervalAnalyzer:
     """
     Classe responsável pela análise detalhada de intervalos de trabalho,
     incluindo pausas, almoços e validação de limites configuráveis.
+    
+    As durações são calculadas sobre a matriz de picagens de todas as linhas
+    de uma vez; os alertas são as regras declarativas ('regras' em
+    rules/*.json) cujas variáveis são de intervalos, compiladas em
+    predicados sobre colunas. Os alertas disparados ficam em bits na coluna
+    RULES_COLUMN; o texto só é gerado por `render_alerts` para as linhas
+    mostradas ou exportadas.
     """
     
+    # Coluna (uint64) com os bits das regras de intervalos disparadas em cada linha
+    RULES_COLUMN = 'regras_intervalos'
+    
+    # Limites de intervalos da configuração de cada funcionário (ConfigManager),
+    # disponíveis nas condições das regras com o mesmo nome
+    CONFIG_LIMITS = ['almoco_duracao', 'intervalo_manha', 'intervalo_tarde', 'tolerancia_intervalo']
+    
+    # Regras do almoço, mostradas na posição da pausa tratada como almoço (ver `render_alerts`)
+    LUNCH_RULES = ('almoco_curto', 'almoco_longo')
+    
+    # Padrões suportados: número de picagens -> descrição
+    PATTERNS = {
+        4: 'apenas almoço',
+        6: 'lanche manhã + almoço',
+        8: 'lanche manhã + almoço + lanche tarde',
+    }
+    
     def __init__(self, rules=None):
         """Inicializa o analisador com regras específicas."""
         self.default_rules = {
@@ -29,337 +55,248 @@ class IntervalAnalyzer:
         
         Args:
             df: DataFrame com colunas E1, S1, E2, S2, etc.
-            rules: Regras específicas para validação
-            
+            rules: Regras específicas para validação (os limites em falta
+                usam os valores padrão)
+        
         Returns:
             DataFrame enriquecido com análise de intervalos
         """
         if df.empty:
             return df
         
-        # Usar regras fornecidas ou padrão
-        current_rules = rules or self.default_rules
-        
-        # Criar colunas para análise detalhada
-        interval_columns = {
-            'periodo_manha': pd.Timedelta(0),
-            'intervalo_lanche': pd.Timedelta(0),
-            'intervalo_almoco': pd.Timedelta(0),
-            'periodo_tarde': pd.Timedelta(0),
-            'total_trabalho': pd.Timedelta(0),
-            'total_pausas': pd.Timedelta(0),
-            'duracao_almoco': pd.Timedelta(0),
-            'duracao_pausa_manha': pd.Timedelta(0),
-            'duracao_pausa_tarde': pd.Timedelta(0),
-            'total_pausas_dia': pd.Timedelta(0),
-            'alerta_intervalos': '',
-            'conformidade_intervalos': True,
-            'detalhes_intervalos': ''
-        }
+        # Regras fornecidas sobre os valores padrão (setores sem alertas próprios)
+        current_rules = dict(self.default_rules)
+        current_rules.update(rules or {})
         
-        for col, default in interval_columns.items():
-            if col not in df.columns:
-                df[col] = default
+        breaks = self._interval_minutes(df)
+        count = breaks['num_picagens']
         
-        # Analisar cada linha
-        for index, row in df.iterrows():
-            interval_analysis = self._analyze_row_intervals(row, current_rules)
-            
-            # Aplicar resultados da análise
-            for key, value in interval_analysis.items():
-                if key in df.columns:
-                    df.loc[index, key] = value
+        def as_timedelta(minutes):
+            return pd.to_timedelta(np.nan_to_num(minutes, nan=0.0), unit='m')
+        
+        for col in ('periodo_manha', 'intervalo_lanche', 'intervalo_almoco', 'periodo_tarde',
+                    'total_trabalho', 'total_pausas'):
+            if col not in df.columns:
+                df[col] = pd.Timedelta(0)
+        
+        # Padrão básico de 4 picagens: os períodos são os da análise de intervalos
+        basic = count == 4
+        if basic.any():
+            morning, afternoon = breaks['trabalho'][:, 0], breaks['trabalho'][:, 1]
+            df.loc[basic, 'periodo_manha'] = as_timedelta(morning[basic])
+            df.loc[basic, 'intervalo_lanche'] = pd.Timedelta(0)
+            df.loc[basic, 'intervalo_almoco'] = as_timedelta(breaks['pausa_1_minutos'][basic])
+            df.loc[basic, 'periodo_tarde'] = as_timedelta(afternoon[basic])
+            df.loc[basic, 'total_trabalho'] = as_timedelta((morning + afternoon)[basic])
+            df.loc[basic, 'total_pausas'] = as_timedelta(breaks['pausa_1_minutos'][basic])
+        
+        # Com 8 picagens a duração do almoço é sempre a pausa do meio do dia
+        lunch = np.where(count == 8, breaks['pausa_2_minutos'], breaks['almoco_minutos'])
+        df['duracao_almoco'] = as_timedelta(lunch)
+        df['duracao_pausa_manha'] = as_timedelta(breaks['pausa_manha_minutos'])
+        df['duracao_pausa_tarde'] = as_timedelta(breaks['pausa_tarde_minutos'])
+        df['total_pausas_dia'] = as_timedelta(breaks['pausas_minutos'])
+        
+        results = self.evaluate_rules(df, current_rules, self.rule_context(df, current_rules, breaks))
+        df[self.RULES_COLUMN] = results.to_column(self.RULES_COLUMN)
+        df['conformidade_intervalos'] = ~results.bits.any(axis=1)
+        df['detalhes_intervalos'] = self._render_details(breaks)
         
         return df
     
-    def _analyze_row_intervals(self, row, rules):
-        """Analisa intervalos para uma linha específica."""
-        # Coletar timestamps válidos
-        timestamps = self._extract_valid_timestamps(row)
-        
-        if len(timestamps) < 4:
-            return {
-                'duracao_almoco': pd.Timedelta(0),
-                'duracao_pausa_manha': pd.Timedelta(0),
-                'duracao_pausa_tarde': pd.Timedelta(0),
-                'total_pausas_dia': pd.Timedelta(0),
-                'alerta_intervalos': 'Timestamps insuficientes para análise',
-                'conformidade_intervalos': False,
-                'detalhes_intervalos': f'Apenas {len(timestamps)} timestamps válidos'
-            }
-        
-        # Analisar baseado no número de timestamps
-        if len(timestamps) == 3:
-            return self._analyze_3_timestamps(timestamps, rules)
-        elif len(timestamps) == 4:
-            return self._analyze_4_timestamps(timestamps, rules)
-        elif len(timestamps) == 6:
-            return self._analyze_6_timestamps(timestamps, rules)
-        elif len(timestamps) == 8:
-            return self._analyze_8_timestamps(timestamps, rules)
-        else:
-            return self._analyze_irregular_timestamps(timestamps, rules)
-    
-    def _extract_valid_timestamps(self, row):
-        """Extrai timestamps válidos de uma linha."""
-        time_columns = ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
-        timestamps = []
-        
-        for col in time_columns:
-            if col in row and pd.notna(row[col]):
-                time_str = str(row[col]).strip()
-                if time_str and time_str != '00:00' and time_str != 'nan':
-                    # Converter para objeto time para cálculos
-                    try:
-                        time_obj = datetime.strptime(time_str, '%H:%M').time()
-                        timestamps.append(time_obj)
-                    except ValueError:
-                        continue
-        
-        return timestamps
-    
-    def _analyze_3_timestamps(self, timestamps, rules):
-        """Analisa padrão incompleto E1-S1-E2 (3 timestamps) - falta saída final."""
-        e1, s1, e2 = timestamps
-        
-        # PADRÃO INCOMPLETO: E1=entrada, S1=saída almoço, E2=entrada almoço, FALTA S2=saída final
-        
-        # Calcular duração do almoço (S1 até E2)
-        almoco_duration = self._calculate_time_difference(s1, e2)
-        almoco_minutos = almoco_duration.total_seconds() / 60
-        
-        # Calcular período de manhã (E1 até S1)
-        periodo_manha = self._calculate_time_difference(e1, s1)
-        
-        # Verificar conformidade do almoço
-        alerta_almoco_curto = rules.get('alerta_almoco_curto', 25)
-        alerta_almoco_longo = rules.get('alerta_almoco_longo', 75)
-        
-        alertas = ['Padrão incompleto: falta saída final (S2)']
-        if almoco_minutos < alerta_almoco_curto:
-            alertas.append(f"Almoço muito curto ({almoco_minutos:.0f}min)")
-        elif almoco_minutos > alerta_almoco_longo:
-            alertas.append(f"Almoço muito longo ({almoco_minutos:.0f}min)")
-        
-        # Padrão incompleto = não conforme
-        conformidade = False
+    def evaluate_rules(self, df, rules=None, context: Optional[RuleContext] = None) -> RuleResults:
+        """
+        Avalia as regras de intervalos sobre todas as linhas.
         
-        return {
-            'periodo_manha': periodo_manha,
-            'intervalo_lanche': pd.Timedelta(0),  # Não aplicável
-            'intervalo_almoco': almoco_duration,
-            'periodo_tarde': pd.Timedelta(0),  # Não calculável sem saída final
-            'total_trabalho': periodo_manha,  # Apenas período da manhã calculável
-            'total_pausas': almoco_duration,
-            'duracao_almoco': almoco_duration,
-            'duracao_pausa_manha': pd.Timedelta(0),  # Não aplicável
-            'duracao_pausa_tarde': pd.Timedelta(0),  # Não aplicável
-            'total_pausas_dia': almoco_duration,
-            'alerta_intervalos': '; '.join(alertas),
-            'conformidade_intervalos': conformidade,
-            'detalhes_intervalos': f'⚠️ Padrão incompleto (3/4 picagens): falta saída final. Manhã: {self.format_timedelta_to_minutes(periodo_manha)}, Almoço: {self.format_timedelta_to_minutes(almoco_duration)}'
-        }
+        São regras de intervalos as de `rules['regras']` (ou, sem elas, as do
+        RulesEngine) cujas variáveis são todas de `rule_context`; as
+        restantes ficam para a análise de conformidade.
+        """
+        current_rules = dict(self.default_rules)
+        current_rules.update(rules or {})
+        context = context or self.rule_context(df, current_rules)
+        compiled = self._interval_rules(current_rules, context)
+        results = RuleResults(df.index, [rule.id for rule in compiled], {rule.id: rule.message for rule in compiled})
+        for rule in sorted(compiled, key=lambda rule: rule.cost):
+            results.set(rule.id, rule.evaluate(context))
+        results.capture_params(context)
+        return results
     
-    def _analyze_4_timestamps(self, timestamps, rules):
+    def render_alerts(self, df, rules=None, separator: str = '; ') -> pd.Series:
         """
-        Analisa padrão básico E1-S1-E2-S2 (4 timestamps).
+        Texto dos alertas de intervalos das linhas recebidas, a partir de RULES_COLUMN.
         
-        PADRÃO: Trabalho com apenas pausa para almoço
-        - E1: Entrada manhã - S1: Saída almoço - E2: Entrada almoço - S2: Saída final
+        Os valores das mensagens (minutos das pausas e limites) são
+        recalculados só para estas linhas; regras que já não existem nas
+        regras atuais não são mostradas.
         """
-        e1, s1, e2, s2 = timestamps
-        
-        # Calcular duração do almoço (S1 até E2)
-        almoco_duration = self._calculate_time_difference(s1, e2)
-        
-        # Gerar alertas
-        alertas = []
-        detalhes = []
-        conformidade = True
-        
-        # Validar duração do almoço
-        almoco_minutos = almoco_duration.total_seconds() / 60
-        
-        if almoco_minutos < rules['alerta_almoco_curto']:
-            alertas.append(f'Almoço muito curto ({almoco_minutos:.0f}min)')
-            conformidade = False
-        elif almoco_minutos > rules['alerta_almoco_longo']:
-            alertas.append(f'Almoço muito longo ({almoco_minutos:.0f}min)')
-            conformidade = False
-        
-        # Detalhes da análise
-        detalhes.append(f'🌅 Manhã: {e1.strftime("%H:%M")}-{s1.strftime("%H:%M")}')
-        detalhes.append(f'🍽️ Almoço: {s1.strftime("%H:%M")}-{e2.strftime("%H:%M")} ({almoco_minutos:.0f}min)')
-        detalhes.append(f'🌆 Tarde: {e2.strftime("%H:%M")}-{s2.strftime("%H:%M")}')
-        detalhes.append(f'📋 Padrão: 4 picagens (apenas almoço)')
-        
-        # Calcular períodos de trabalho
-        periodo_manha = self._calculate_time_difference(e1, s1)
-        periodo_tarde = self._calculate_time_difference(e2, s2)
-        total_trabalho = periodo_manha + periodo_tarde
-        
-        return {
-            'periodo_manha': periodo_manha,
-            'intervalo_lanche': pd.Timedelta(0),  # Não aplicável
-            'intervalo_almoco': almoco_duration,
-            'periodo_tarde': periodo_tarde,
-            'total_trabalho': total_trabalho,
-            'total_pausas': almoco_duration,
-            'duracao_almoco': almoco_duration,
-            'duracao_pausa_manha': pd.Timedelta(0),
-            'duracao_pausa_tarde': pd.Timedelta(0),
-            'total_pausas_dia': almoco_duration,
-            'alerta_intervalos': '; '.join(alertas) if alertas else '',
-            'conformidade_intervalos': conformidade,
-            'detalhes_intervalos': ' | '.join(detalhes)
+        if df.empty or self.RULES_COLUMN not in df.columns:
+            return pd.Series('', index=df.index, dtype=object)
+        current_rules = dict(self.default_rules)
+        current_rules.update(rules or {})
+        context = self.rule_context(df, current_rules)
+        compiled = self._interval_rules(current_rules, context)
+        results = RuleResults.from_column(df[self.RULES_COLUMN], self.RULES_COLUMN, [rule.id for rule in compiled],
+                                          {rule.id: rule.message for rule in compiled})
+        results.capture_params(context)
+        texts = results.render(separator=separator)
+        
+        # Com 8 picagens as mensagens seguem a ordem das pausas no dia: as do almoço
+        # ficam na posição da pausa que foi tratada como almoço (ex.: depois da pausa 2)
+        lunch_ids = [rule_id for rule_id in results.rule_ids if rule_id in self.LUNCH_RULES]
+        if lunch_ids:
+            lunch_pause = context.get('almoco_pausa')
+            count = context.get('num_picagens')
+            others = [rule_id for rule_id in results.rule_ids if rule_id not in self.LUNCH_RULES]
+            for pause in (1, 2, 3):
+                pause_id = f'pausa_{pause}_longa'
+                position = others.index(pause_id) if pause_id in others else len(others)
+                order = others[:position] + lunch_ids + others[position:]
+                rows = (count == 8) & (lunch_pause == pause)
+                if order != results.rule_ids and rows.any():
+                    texts[rows] = results.render(rows=df.index[rows], separator=separator, order=order).to_numpy()
+        return texts
+    
+    def _interval_rules(self, rules, context: RuleContext) -> List[CompiledRule]:
+        """Regras compiladas de `rules['regras']` (ou do RulesEngine) cujas variáveis existem no contexto."""
+        definitions = rules.get('regras')
+        if definitions is None:
+            from .rules_engine import RulesEngine
+            definitions = RulesEngine.shared().get_rules().get('regras', [])
+        compiled = [compile_rule(definition) for definition in definitions]
+        return [rule for rule in compiled if all(name in context for name in rule.variables)]
+    
+    def rule_context(self, df, rules, breaks: Optional[Dict[str, np.ndarray]] = None) -> RuleContext:
+        """Variáveis de intervalos e limites numéricos das regras, para as condições."""
+        providers = {
+            name: (lambda value=value: np.float64(value))
+            for name, value in rules.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
         }
+        providers.update(self.interval_providers(df, breaks))
+        return RuleContext(providers, len(df))
     
-    def _analyze_6_timestamps(self, timestamps, rules):
+    def interval_providers(self, df, breaks: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Callable[[], np.ndarray]]:
         """
-        Analisa padrão com intervalo manhã E1-S1-E2-S2-E3-S3 (6 timestamps).
-        
-        PADRÃO: Trabalho com lanche manhã + almoço
-        - E1: Entrada - S1: Saída lanche manhã - E2: Entrada lanche - S2: Saída almoço - E3: Entrada almoço - S3: Saída final
+        Variáveis de intervalos de cada linha (minutos; NaN se não aplicável).
+        
+        - num_picagens: picagens válidas (HH:MM)
+        - almoco_minutos: pausa tratada como almoço (com 8 picagens, a maior)
+        - almoco_pausa: número (1 a 3) da pausa tratada como almoço
+        - pausa_1_minutos, pausa_2_minutos, pausa_3_minutos: pausas por ordem
+        - pausa_manha_minutos, pausa_tarde_minutos, pausas_minutos
+        - os limites de CONFIG_LIMITS da configuração de cada funcionário
+        
+        Só os padrões de 4, 6 e 8 picagens têm pausas; as matrizes são
+        calculadas uma vez, na primeira variável pedida (ou recebidas em
+        `breaks`, de `_interval_minutes`).
         """
-        e1, s1, e2, s2, e3, s3 = timestamps
-        
-        # Calcular durações
-        pausa1_duration = self._calculate_time_difference(s1, e2)  # Lanche manhã
-        almoco_duration = self._calculate_time_difference(s2, e3)  # Almoço
-        
-        # Gerar alertas
-        alertas = []
-        detalhes = []
-        conformidade = True
-        
-        # Validar primeira pausa
-        pausa1_minutos = pausa1_duration.total_seconds() / 60
-        if pausa1_minutos > rules['alerta_pausa_longa']:
-            alertas.append(f'Pausa manhã muito longa ({pausa1_minutos:.0f}min)')
-            conformidade = False
-        
-        # Validar almoço
-        almoco_minutos = almoco_duration.total_seconds() / 60
-        if almoco_minutos < rules['alerta_almoco_curto']:
-            alertas.append(f'Almoço muito curto ({almoco_minutos:.0f}min)')
-            conformidade = False
-        elif almoco_minutos > rules['alerta_almoco_longo']:
-            alertas.append(f'Almoço muito longo ({almoco_minutos:.0f}min)')
-            conformidade = False
-        
-        # Detalhes da análise  
-        detalhes.append(f'🌅 Manhã início: {e1.strftime("%H:%M")}-{s1.strftime("%H:%M")}')
-        detalhes.append(f'☕ Lanche manhã: {s1.strftime("%H:%M")}-{e2.strftime("%H:%M")} ({pausa1_minutos:.0f}min)')
-        detalhes.append(f'🌅 Manhã fim: {e2.strftime("%H:%M")}-{s2.strftime("%H:%M")}')
-        detalhes.append(f'🍽️ Almoço: {s2.strftime("%H:%M")}-{e3.strftime("%H:%M")} ({almoco_minutos:.0f}min)')
-        detalhes.append(f'🌆 Tarde: {e3.strftime("%H:%M")}-{s3.strftime("%H:%M")}')
-        detalhes.append(f'📋 Padrão: 6 picagens (lanche manhã + almoço)')
-        
-        total_pausas = pausa1_duration + almoco_duration
-        
-        return {
-            'duracao_almoco': almoco_duration,
-            'duracao_pausa_manha': pausa1_duration,
-            'duracao_pausa_tarde': pd.Timedelta(0),
-            'total_pausas_dia': total_pausas,
-            'alerta_intervalos': '; '.join(alertas) if alertas else '',
-            'conformidade_intervalos': conformidade,
-            'detalhes_intervalos': ' | '.join(detalhes)
+        cache = {'breaks': breaks}
+        
+        def interval_minutes():
+            if cache['breaks'] is None:
+                cache['breaks'] = self._interval_minutes(df)
+            return cache['breaks']
+        
+        def config_limits():
+            if 'config' not in cache:
+                from .config_manager import ConfigManager
+                cache['config'] = ConfigManager().join_employee_configs(df)
+            return cache['config']
+        
+        def config_limit(name):
+            def value():
+                config = config_limits()
+                if name not in config.columns:
+                    return np.full(len(df), np.nan)
+                return pd.to_numeric(config[name], errors='coerce').to_numpy(dtype=float)
+            return value
+        
+        providers = {
+            name: (lambda name=name: interval_minutes()[name])
+            for name in ('num_picagens', 'almoco_minutos', 'almoco_pausa', 'pausa_1_minutos',
+                         'pausa_2_minutos', 'pausa_3_minutos', 'pausa_manha_minutos',
+                         'pausa_tarde_minutos', 'pausas_minutos')
         }
+        providers.update({name: config_limit(name) for name in self.CONFIG_LIMITS})
+        return providers
     
-    def _analyze_8_timestamps(self, timestamps, rules):
+    def _interval_minutes(self, df) -> Dict[str, np.ndarray]:
         """
-        Analisa padrão completo E1-S1-E2-S2-E3-S3-E4-S4 (8 timestamps).
+        Durações de trabalho e pausas de todas as linhas, a partir da matriz de picagens.
         
-        PADRÃO: Trabalho com lanche manhã + almoço + lanche tarde  
-        - E1: Entrada - S1: Saída lanche manhã - E2: Entrada - S2: Saída almoço 
-        - E3: Entrada almoço - S3: Saída lanche tarde - E4: Entrada - S4: Saída final
+        As diferenças passam a meia-noite quando a segunda hora é anterior
+        à primeira (como um turno noturno).
         """
-        e1, s1, e2, s2, e3, s3, e4, s4 = timestamps
-        
-        # Calcular durações
-        pausa1_duration = self._calculate_time_difference(s1, e2)  # Lanche manhã
-        pausa2_duration = self._calculate_time_difference(s2, e3)  # Almoço  
-        pausa3_duration = self._calculate_time_difference(s3, e4)  # Lanche tarde
-        
-        # Identificar qual é o almoço (maior pausa)
-        pausas = [
-            ('Pausa 1', pausa1_duration, s1, e2),
-            ('Pausa 2', pausa2_duration, s2, e3),
-            ('Pausa 3', pausa3_duration, s3, e4)
-        ]
-        
-        # Ordenar por duração para identificar o almoço
-        pausas_ordenadas = sorted(pausas, key=lambda x: x[1], reverse=True)
-        almoco_info = pausas_ordenadas[0]  # Maior pausa = almoço
-        
-        # Gerar alertas
-        alertas = []
-        detalhes = []
-        conformidade = True
-        
-        # Criar detalhes visuais primeiro
-        detalhes.append(f'🌅 Manhã início: {e1.strftime("%H:%M")}-{s1.strftime("%H:%M")}')
-        detalhes.append(f'☕ Lanche manhã: {s1.strftime("%H:%M")}-{e2.strftime("%H:%M")} ({pausa1_duration.total_seconds()/60:.0f}min)')
-        detalhes.append(f'🌅 Manhã fim: {e2.strftime("%H:%M")}-{s2.strftime("%H:%M")}')
-        detalhes.append(f'🍽️ Almoço: {s2.strftime("%H:%M")}-{e3.strftime("%H:%M")} ({pausa2_duration.total_seconds()/60:.0f}min)')
-        detalhes.append(f'🌆 Tarde início: {e3.strftime("%H:%M")}-{s3.strftime("%H:%M")}')
-        detalhes.append(f'☕ Lanche tarde: {s3.strftime("%H:%M")}-{e4.strftime("%H:%M")} ({pausa3_duration.total_seconds()/60:.0f}min)')
-        detalhes.append(f'🌆 Tarde fim: {e4.strftime("%H:%M")}-{s4.strftime("%H:%M")}')
-        detalhes.append(f'📋 Padrão: 8 picagens (lanche manhã + almoço + lanche tarde)')
-        
-        # Validar cada pausa
-        for nome, duracao, inicio, fim in pausas:
-            minutos = duracao.total_seconds() / 60
-            
-            if nome == almoco_info[0]:  # É o almoço
-                if minutos < rules['alerta_almoco_curto']:
-                    alertas.append(f'Almoço muito curto ({minutos:.0f}min)')
-                    conformidade = False
-                elif minutos > rules['alerta_almoco_longo']:
-                    alertas.append(f'Almoço muito longo ({minutos:.0f}min)')
-                    conformidade = False
-            else:  # É pausa normal
-                if minutos > rules['alerta_pausa_longa']:
-                    alertas.append(f'{nome} muito longa ({minutos:.0f}min)')
-                    conformidade = False
-        
-        total_pausas = pausa1_duration + pausa2_duration + pausa3_duration
+        n_rows = len(df)
+        columns, present, minutes, _ = punch_matrix(df)
+        valid = present & ~np.isnan(minutes)
+        order, count = compact_punches(valid)
+        
+        times = np.full((n_rows, 8), np.nan)
+        if columns:
+            compacted = np.take_along_axis(minutes, order, axis=1)[:, :8]
+            times[:, :compacted.shape[1]] = compacted
+        times[np.arange(8) >= count[:, None]] = np.nan
+        gaps = np.mod(np.diff(times, axis=1), 24 * 60)
+        
+        pattern = np.isin(count, list(self.PATTERNS))
+        pauses = np.where(pattern[:, None], gaps[:, 1::2], np.nan)
+        # Maior pausa = almoço (a primeira em caso de empate); com 4 e 6 picagens
+        # o almoço é a última pausa
+        lunch_pause = np.select([count == 4, count == 6, count == 8],
+                                [0, 1, np.argmax(np.nan_to_num(pauses, nan=-1.0), axis=1)], default=-1)
+        rows = np.arange(n_rows)
         
         return {
-            'duracao_almoco': pausa2_duration,  # Pausa 2 é sempre o almoço (meio do dia)
-            'duracao_pausa_manha': pausa1_duration,  # Lanche manhã
-            'duracao_pausa_tarde': pausa3_duration,  # Lanche tarde
-            'total_pausas_dia': total_pausas,
-            'alerta_intervalos': '; '.join(alertas) if alertas else '',
-            'conformidade_intervalos': conformidade,
-            'detalhes_intervalos': ' | '.join(detalhes)
+            'num_picagens': count.astype(float),
+            'horas': times,
+            'trabalho': gaps[:, 0::2],
+            'almoco_minutos': np.where(pattern, pauses[rows, np.maximum(lunch_pause, 0)], np.nan),
+            'almoco_pausa': np.where(pattern, lunch_pause + 1, np.nan),
+            'pausa_1_minutos': pauses[:, 0],
+            'pausa_2_minutos': pauses[:, 1],
+            'pausa_3_minutos': pauses[:, 2],
+            'pausa_manha_minutos': np.where(count >= 6, pauses[:, 0], np.nan),
+            'pausa_tarde_minutos': np.where(count == 8, pauses[:, 2], np.nan),
+            'pausas_minutos': np.where(pattern, np.nansum(pauses, axis=1), np.nan),
         }
     
-    def _analyze_irregular_timestamps(self, timestamps, rules):
-        """Analisa padrões irregulares de timestamps."""
-        return {
-            'duracao_almoco': pd.Timedelta(0),
-            'duracao_pausa_manha': pd.Timedelta(0),
-            'duracao_pausa_tarde': pd.Timedelta(0),
-            'total_pausas_dia': pd.Timedelta(0),
-            'alerta_intervalos': f'Padrão irregular: {len(timestamps)} timestamps',
-            'conformidade_intervalos': False,
-            'detalhes_intervalos': f'Análise não suportada para {len(timestamps)} timestamps'
+    def _render_details(self, breaks: Dict[str, np.ndarray]) -> np.ndarray:
+        """Descrição dos períodos de cada linha, construída por padrão de picagens."""
+        count = breaks['num_picagens'].astype(int)
+        times = breaks['horas']
+        details = np.empty(len(count), dtype=object)
+        
+        few = count < 4
+        details[few] = 'Apenas ' + count[few].astype(str).astype(object) + ' timestamps válidos'
+        irregular = ~few & ~np.isin(count, list(self.PATTERNS))
+        details[irregular] = 'Análise não suportada para ' + count[irregular].astype(str).astype(object) + ' timestamps'
+        
+        labels = {
+            4: ['🌅 Manhã', '🍽️ Almoço', '🌆 Tarde'],
+            6: ['🌅 Manhã início', '☕ Lanche manhã', '🌅 Manhã fim', '🍽️ Almoço', '🌆 Tarde'],
+            8: ['🌅 Manhã início', '☕ Lanche manhã', '🌅 Manhã fim', '🍽️ Almoço',
+                '🌆 Tarde início', '☕ Lanche tarde', '🌆 Tarde fim'],
         }
-    
-    def _calculate_time_difference(self, start_time, end_time):
-        """Calcula diferença entre dois objetos time, retornando Timedelta."""
-        # Converter time objects para datetime para cálculos
-        base_date = datetime.today().date()
-        start_dt = datetime.combine(base_date, start_time)
-        end_dt = datetime.combine(base_date, end_time)
-        
-        # Se end_time é menor que start_time, assumir que é no dia seguinte
-        if end_dt < start_dt:
-            end_dt += timedelta(days=1)
-        
-        return end_dt - start_dt
+        for size, description in self.PATTERNS.items():
+            rows = np.flatnonzero(count == size)
+            if len(rows) == 0:
+                continue
+            clock = [minutes_to_hhmm(times[rows, k]).to_numpy() for k in range(size)]
+            parts = []
+            for k, label in enumerate(labels[size]):
+                text = label + ': ' + clock[k] + '-' + clock[k + 1]
+                if k % 2 == 1:
+                    pause = (times[rows, k + 1] - times[rows, k]) % (24 * 60)
+                    text = text + ' (' + pause.astype(int).astype(str).astype(object) + 'min)'
+                parts.append(text)
+            parts.append(f'📋 Padrão: {size} picagens ({description})')
+            text = parts[0]
+            for part in parts[1:]:
+                text = text + ' | ' + part
+            details[rows] = text
+        return details
     
     def generate_interval_summary(self, df):
         """Gera resumo estatístico dos intervalos."""
@@ -387,7 +324,7 @@ class IntervalAnalyzer:
         
         # Contar problemas
         problemas = {
-            'dias_com_alertas': len(df[df['alerta_intervalos'] != '']),
+            'dias_com_alertas': int((df[self.RULES_COLUMN].fillna(0) != 0).sum()) if self.RULES_COLUMN in df.columns else 0,
             'dias_nao_conformes': len(df[df['conformidade_intervalos'] == False]),
             'total_dias_analisados': len(df)
         }
@@ -404,4 +341,4 @@ class IntervalAnalyzer:
             return "0 min"
         
         total_minutes = int(td.total_seconds() / 60)
-        return f"{total_minutes} min" 
\ No newline at end of file
+        return f"{total_minutes} min"
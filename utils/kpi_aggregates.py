@@ -0,0 +1,250 @@
+import pandas as pd
+import numpy as np
+from collections import Counter
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+from .kpi_calculator import KPICalculator, HOUR_COLUMNS, SPECIAL_DAY_TYPES
+
+
+class KPIAggregates:
+    """
+    Cubo de agregados aditivos por funcionário, departamento, semana ISO e tipo de dia:
+    - Somas e contagens por célula (Numero, Departamento, Semana, Mes, Tipo), com os totais globais ao lado
+    - Histogramas (contagem por valor) de atrasos e datas para máximo e período
+    - Histograma de atrasos por dia (data, atraso) para o gráfico de tendências
+    - Edição de linhas aplicada como delta (subtrai as linhas antigas, soma as novas)
+    - Agregações semanais, mensais ou por departamento somando células (`rollup`)
+
+    `Mes` acompanha a semana para que os totais mensais sejam exatos quando uma
+    semana atravessa dois meses. `kpis()` devolve o mesmo dicionário que
+    `KPICalculator.calculate_main_kpis` sem voltar a percorrer o DataFrame.
+    """
+
+    # Dimensões de cada célula do cubo
+    DIMENSIONS = ['Numero', 'Departamento', 'Semana', 'Mes', 'Tipo']
+
+    # Medidas aditivas calculadas por linha
+    MEASURES = [
+        'dias', 'dias_validos', 'horas', 'horas_extra', 'dias_pontuais', 'soma_atrasos',
+        'dias_com_atraso', 'dias_conformes', 'alertas', 'dias_perfeitos', 'dias_problematicos',
+        'dias_uteis', 'horas_dias_uteis'
+    ]
+
+    def __init__(self, df: pd.DataFrame, calculator: Optional[KPICalculator] = None):
+        """
+        Constrói o cubo a partir do DataFrame completo.
+
+        Args:
+            df: DataFrame com dados processados
+            calculator: Calculador cujas regras de KPI são usadas por linha
+        """
+        self.calculator = calculator or KPICalculator()
+        self.schema = self._schema(df)
+        self.has_delays = 'atraso_minutos' in df.columns
+        self.buckets: Dict[Tuple[Hashable, ...], np.ndarray] = {}
+        self.totals = np.zeros(len(self.MEASURES))
+        self.delays = Counter()
+        self.dates = Counter()
+        self.daily_delays = Counter()
+        self._cube = None
+        self._add(df, 1)
+
+    @staticmethod
+    def _schema(df: pd.DataFrame) -> Tuple[bool, ...]:
+        """Colunas relevantes presentes (decidem que coluna alimenta cada medida)."""
+        columns = ('Data', 'Numero', 'Departamento', 'Tipo', 'picagens_validas', 'atraso_minutos',
+                   'tipo_problema', 'aviso_picagens', 'regras_intervalos', 'Extra', 'extra_td') + HOUR_COLUMNS
+        return tuple(col in df.columns for col in columns)
+
+    def update(self, old_rows: pd.DataFrame, new_rows: pd.DataFrame) -> None:
+        """
+        Aplica a edição de linhas: retira a contribuição das versões antigas e soma a das novas.
+
+        Args:
+            old_rows: Linhas antes da edição
+            new_rows: As mesmas linhas depois da edição (já reprocessadas)
+        """
+        if self._schema(old_rows) != self.schema or self._schema(new_rows) != self.schema:
+            raise ValueError("As linhas editadas não têm as mesmas colunas que os agregados")
+        self._add(old_rows, -1)
+        self._add(new_rows, 1)
+
+    def _contributions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Contribuição de cada linha para as medidas aditivas (vectorizado)."""
+        calc = self.calculator
+        valid = (df['picagens_validas'] == True).to_numpy() if 'picagens_validas' in df.columns else np.zeros(len(df), dtype=bool)
+        hours = calc._hours_by_row(df).to_numpy(dtype=float)
+        values = {
+            'dias': np.ones(len(df)),
+            'dias_validos': valid,
+            'horas': np.where(valid, hours, 0.0),
+            'horas_extra': np.where(valid, calc._overtime_by_row(df).to_numpy(dtype=float), 0.0),
+            'dias_conformes': ~calc._compliance_issues_mask(df),
+            'alertas': calc._alerts_by_row(df),
+            'dias_problematicos': calc._text_mask(df, 'tipo_problema'),
+        }
+        if self.has_delays:
+            delays = df['atraso_minutos'].fillna(0).to_numpy(dtype=float)
+            values.update({
+                'dias_pontuais': valid & (delays <= 10),
+                'soma_atrasos': np.where(valid & (delays > 0), delays, 0.0),
+                'dias_com_atraso': valid & (delays > 0),
+                'dias_perfeitos': delays == 0,
+            })
+        if 'Data' in df.columns:
+            # Dias úteis do calendário do setor, sem feriados (usado no gráfico de horas semanais)
+            work_day = calc._work_day_mask(df)
+            values.update({
+                'dias_uteis': work_day,
+                'horas_dias_uteis': np.where(work_day, hours, 0.0),
+            })
+        zeros = np.zeros(len(df))
+        return pd.DataFrame({name: np.asarray(values[name], dtype=float) if name in values else zeros
+                             for name in self.MEASURES}, index=df.index)
+
+    def _dimensions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Dimensões da célula de cada linha (valores em falta ficam None)."""
+        dimensions = pd.DataFrame(index=df.index)
+        for col in ['Numero', 'Departamento']:
+            dimensions[col] = df[col].astype(object) if col in df.columns else None
+        if 'Data' in df.columns:
+            dates = pd.to_datetime(df['Data']).dt.normalize()
+            # Segunda-feira da semana ISO e primeiro dia do mês
+            dimensions['Semana'] = (dates - pd.to_timedelta(dates.dt.weekday, unit='D')).astype(object)
+            dimensions['Mes'] = dates.dt.to_period('M').dt.start_time.astype(object)
+        else:
+            dimensions['Semana'] = None
+            dimensions['Mes'] = None
+        dimensions['Tipo'] = df['Tipo'].astype(object) if 'Tipo' in df.columns else None
+        return dimensions.where(dimensions.notna(), None)
+
+    def _add(self, df: pd.DataFrame, sign: int) -> None:
+        """Soma (sign=1) ou subtrai (sign=-1) a contribuição das linhas."""
+        if df.empty:
+            return
+        self._cube = None
+        contributions = self._contributions(df)
+        dimensions = self._dimensions(df)
+        grouped = contributions.groupby([dimensions[col] for col in self.DIMENSIONS], dropna=False, sort=False).sum()
+        for key, values in zip(grouped.index, grouped.to_numpy()):
+            key = tuple(None if pd.isna(value) else value for value in key)
+            bucket = self.buckets.get(key)
+            bucket = sign * values if bucket is None else bucket + sign * values
+            if bucket[0] == 0:
+                # Célula sem dias: descartar para não acumular resíduos
+                self.buckets.pop(key, None)
+            else:
+                self.buckets[key] = bucket
+            self.totals += sign * values
+
+        if self.has_delays:
+            self._update_counter(self.delays, df['atraso_minutos'].fillna(0), sign)
+        if 'Data' in df.columns:
+            dates = pd.to_datetime(df['Data'])
+            self._update_counter(self.dates, dates.dropna(), sign)
+            # Sem coluna de atrasos o gráfico de tendências mostra atraso 0
+            delays = df['atraso_minutos'].fillna(0).astype(float) if self.has_delays else pd.Series(0.0, index=df.index)
+            daily = pd.DataFrame({'Data': dates, 'atraso_minutos': delays})
+            self._update_counter(self.daily_delays, daily.dropna(subset=['Data']), sign)
+
+    @staticmethod
+    def _update_counter(counter: Counter, values, sign: int) -> None:
+        """Atualiza um histograma (valor -> contagem), removendo valores que deixam de existir."""
+        for value, count in values.value_counts(sort=False).items():
+            counter[value] += sign * count
+            if counter[value] <= 0:
+                del counter[value]
+
+    def delay_histogram(self) -> pd.DataFrame:
+        """
+        Atrasos por dia como histograma (dados de `create_punctuality_trends_chart`).
+
+        Returns:
+            DataFrame com 'Data', 'atraso_minutos' e 'n' (número de registos
+            desse dia com esse atraso), ordenado por data
+        """
+        keys = list(self.daily_delays.keys())
+        histogram = pd.DataFrame(keys or None, columns=['Data', 'atraso_minutos'])
+        histogram['Data'] = pd.to_datetime(histogram['Data'])
+        histogram['atraso_minutos'] = histogram['atraso_minutos'].astype(float)
+        histogram['n'] = np.array(list(self.daily_delays.values()), dtype=int)
+        return histogram.sort_values(['Data', 'atraso_minutos'], ignore_index=True)
+
+    def cube(self) -> pd.DataFrame:
+        """Células do cubo como DataFrame (uma linha por célula; guardado até à próxima edição)."""
+        if self._cube is None:
+            keys = list(self.buckets.keys())
+            values = np.vstack(list(self.buckets.values())) if keys else np.zeros((0, len(self.MEASURES)))
+            cube = pd.DataFrame(keys or None, columns=self.DIMENSIONS)
+            # Dimensões com tipos compactos para agrupar depressa
+            cube['Semana'] = pd.to_datetime(cube['Semana'])
+            cube['Mes'] = pd.to_datetime(cube['Mes'])
+            cube['Departamento'] = cube['Departamento'].astype('category')
+            cube['Tipo'] = cube['Tipo'].astype('category')
+            cube[self.MEASURES] = values
+            self._cube = cube
+        return self._cube
+
+    def rollup(self, by: Iterable[str], exclude_types: Iterable[str] = ()) -> pd.DataFrame:
+        """
+        Soma as células do cubo pelas dimensões indicadas.
+
+        Args:
+            by: Dimensões a manter (ex.: ['Semana'], ['Mes', 'Departamento'])
+            exclude_types: Tipos de dia a excluir (comparação parcial, sem distinção de maiúsculas)
+
+        Returns:
+            DataFrame com as dimensões e as medidas somadas, ordenado pelas dimensões
+        """
+        cube = self.cube()
+        exclude_types = list(exclude_types)
+        if exclude_types:
+            # Filtrar pelas categorias (poucas) em vez de comparar texto célula a célula
+            types = cube['Tipo'].cat.categories
+            special = types[types.astype(str).str.contains('|'.join(exclude_types), case=False)]
+            cube = cube[~cube['Tipo'].isin(special)]
+        return cube.groupby(list(by), sort=True, observed=True)[self.MEASURES].sum().reset_index()
+
+    def weekly_work_hours(self) -> pd.DataFrame:
+        """Horas por semana em dias úteis, sem tipos especiais (dados de `create_weekly_hours_chart`)."""
+        weekly = self.rollup(['Semana'], exclude_types=SPECIAL_DAY_TYPES)
+        weekly = weekly[weekly['dias_uteis'] > 0]
+        return pd.DataFrame({
+            'Semana': weekly['Semana'],
+            'Total_Horas': weekly['horas_dias_uteis'],
+            'Media_Horas': weekly['horas_dias_uteis'] / weekly['dias_uteis'],
+            'Dias_Trabalhados': weekly['dias_uteis'].astype(int),
+        }).reset_index(drop=True)
+
+    def kpis(self) -> Dict:
+        """KPIs principais derivados dos totais (mesmo formato de `calculate_main_kpis`)."""
+        totals = dict(zip(self.MEASURES, self.totals))
+        total_days = int(round(totals['dias']))
+        if total_days == 0:
+            return self.calculator._get_empty_kpis()
+
+        work_days = int(round(totals['dias_validos']))
+        delayed_days = int(round(totals['dias_com_atraso']))
+        if work_days == 0:
+            punctuality_rate = 0.0
+        elif self.has_delays:
+            punctuality_rate = totals['dias_pontuais'] / work_days * 100
+        else:
+            punctuality_rate = 100.0
+
+        return {
+            'total_days': total_days,
+            'work_days': work_days,
+            'absence_days': total_days - work_days,
+            'total_hours': totals['horas'],
+            'avg_daily_hours': totals['horas'] / work_days if work_days > 0 else 0.0,
+            'punctuality_rate': punctuality_rate,
+            'avg_delay_minutes': totals['soma_atrasos'] / delayed_days if delayed_days > 0 else 0.0,
+            'overtime_hours': totals['horas_extra'],
+            'compliance_rate': totals['dias_conformes'] / total_days * 100,
+            'active_alerts': int(round(totals['alertas'])),
+            'period_start': min(self.dates).date() if self.dates else None,
+            'period_end': max(self.dates).date() if self.dates else None,
+            'longest_delay': max(self.delays) if self.delays else 0,
+            'perfect_days': int(round(totals['dias_perfeitos'])),
+            'problematic_days': int(round(totals['dias_problematicos']))
+        }
@@ -1,11 +1,44 @@
+import hashlib
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
 import streamlit as st
+from .chart_sampling import downsample_series, envelope_traces
+from .config_manager import ConfigManager, config_file_key
+from .rules_engine import RulesEngine
+from .time_utils import duration_hours
+
+# Colunas de durações em texto 'H:MM' (as restantes são timedelta ou horas numéricas)
+HHMM_DURATION_COLUMNS = ('Efect', 'Extra', 'total_trabalho')
+
+# Colunas de horas consultadas pelos KPIs, por ordem de preferência
+HOUR_COLUMNS = ('total_trabalho', 'Efect', 'horas_efetivas_num', 'horas_trabalhadas', 'total_trabalho_calc', 'horas_efetivas_td')
+
+# Tipos de dia excluídos dos alertas e do gráfico de horas semanais (comparação parcial)
+SPECIAL_DAY_TYPES = ['folga', 'férias', 'feriado', 'ausência', 'baixa médica']
+
+
+def column_fingerprint(values: pd.Series) -> str:
+    """Impressão digital barata de uma coluna (valores, índice e dtype), calculada de forma vetorizada."""
+    try:
+        hashed = pd.util.hash_pandas_object(values, index=True)
+    except TypeError:
+        # Valores não hasheáveis (ex.: listas) são comparados pela sua representação em texto
+        hashed = pd.util.hash_pandas_object(values.astype(str), index=True)
+    digest = hashlib.blake2b(hashed.to_numpy().tobytes(), digest_size=16)
+    digest.update(str(values.dtype).encode())
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Impressão digital de um DataFrame inteiro (nomes e conteúdo de todas as colunas)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for col in df.columns:
+        digest.update(f"{col}\x00{column_fingerprint(df[col])}".encode())
+    return digest.hexdigest()
+
 
 class KPICalculator:
     """
@@ -16,9 +49,89 @@ class KPICalculator:
     - Comparações e benchmarks
     """
     
+    # Colunas de que cada KPI/gráfico depende: só uma alteração nestas colunas
+    # (ou nas regras) obriga a recalcular a entrada correspondente da cache
+    KPI_DEPENDENCIES = {
+        'main_kpis': ('Data', 'picagens_validas', 'atraso_minutos', 'tipo_problema', 'aviso_picagens',
+                      'regras_intervalos', 'Extra', 'extra_td') + HOUR_COLUMNS,
+        'punctuality_trends': ('Data', 'atraso_minutos'),
+        'compliance_breakdown': ('picagens_validas', 'atraso_minutos'),
+        'weekly_hours': ('Data', 'Departamento', 'Tipo') + HOUR_COLUMNS,
+        'alerts_summary': ('Data', 'Departamento', 'Tipo', 'atraso_minutos', 'picagens_validas', 'aviso_picagens',
+                           'tipo_problema'),
+    }
+    
+    # Colunas do cubo de agregados (medidas dos KPIs principais e dimensões das células)
+    AGGREGATE_DEPENDENCIES = KPI_DEPENDENCIES['main_kpis'] + ('Numero', 'Departamento', 'Tipo')
+    
     def __init__(self):
         """Inicializa o calculador de KPIs."""
-        pass
+        # nome do KPI -> (chave de dependências, resultado); guarda só o último resultado de cada KPI
+        self._cache = {}
+        # Cubo de agregados aditivos e a chave do DataFrame que representa (atualizado por delta nas edições)
+        self.aggregates = None
+        self._aggregates_key = None
+    
+    def _cache_key(self, name: str, df: pd.DataFrame, fingerprints: Dict[str, str]) -> Tuple:
+        """Chave de cache de um KPI: versões das regras e do calendário e impressões digitais das colunas de que depende."""
+        return self._dependency_key(self.KPI_DEPENDENCIES[name], df, fingerprints)
+    
+    def _dependency_key(self, dependencies: Tuple[str, ...], df: pd.DataFrame, fingerprints: Dict[str, str]) -> Tuple:
+        """Versão das regras, ficheiro de configurações (calendário) e impressões digitais das colunas indicadas."""
+        engine = RulesEngine.shared()
+        engine.reload_rules()
+        columns = []
+        for col in dependencies:
+            if col in df.columns and col not in fingerprints:
+                fingerprints[col] = column_fingerprint(df[col])
+            columns.append((col, fingerprints.get(col)))
+        return (engine.rules_version, config_file_key(), len(df), tuple(columns))
+    
+    def cached(self, name: str, df: pd.DataFrame, compute: Callable[[pd.DataFrame], Any],
+               fingerprints: Optional[Dict[str, str]] = None, params: Tuple = ()) -> Any:
+        """
+        Devolve o resultado de um KPI/gráfico, recalculando-o só se as suas dependências mudaram.
+        
+        Args:
+            name: Nome do KPI (chave de KPI_DEPENDENCIES)
+            df: DataFrame com dados processados
+            compute: Função que calcula o KPI a partir do DataFrame
+            fingerprints: Impressões digitais já calculadas neste render (partilhadas entre KPIs)
+            params: Outros parâmetros do cálculo (ex.: período visível), parte da chave
+        """
+        key = (self._cache_key(name, df, {} if fingerprints is None else fingerprints), params)
+        entry = self._cache.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        result = compute(df)
+        self._cache[name] = (key, result)
+        return result
+    
+    def calculate_dashboard(self, df: pd.DataFrame, date_range: Optional[Tuple] = None) -> Dict:
+        """
+        Calcula (ou reutiliza da cache) os KPIs e gráficos do dashboard.
+        
+        Cada coluna é resumida uma única vez por chamada; editar por exemplo
+        'Tipo' só recalcula os KPIs que dependem de 'Tipo'.
+        
+        Args:
+            df: DataFrame com dados processados
+            date_range: Período visível (início, fim) do gráfico de tendências
+            
+        Returns:
+            Dict com 'kpis', 'punctuality_trends', 'compliance_breakdown',
+            'weekly_hours' e 'alerts'
+        """
+        fingerprints = {}
+        return {
+            'kpis': self.cached('main_kpis', df, lambda data: self.get_aggregates(data, fingerprints).kpis(), fingerprints),
+            'punctuality_trends': self.cached('punctuality_trends', df, lambda data: self.create_punctuality_trends_chart(
+                data, date_range, self.get_aggregates(data, fingerprints)), fingerprints, params=(date_range,)),
+            'compliance_breakdown': self.cached('compliance_breakdown', df, self.create_compliance_breakdown_chart, fingerprints),
+            'weekly_hours': self.cached('weekly_hours', df, lambda data: self.create_weekly_hours_chart(
+                data, self.get_aggregates(data, fingerprints)), fingerprints),
+            'alerts': self.cached('alerts_summary', df, self.generate_alerts_summary, fingerprints),
+        }
     
     def calculate_main_kpis(self, df: pd.DataFrame) -> Dict:
         """
@@ -78,6 +191,48 @@ class KPICalculator:
         
         return kpis
     
+    def get_aggregates(self, df: pd.DataFrame, fingerprints: Optional[Dict[str, str]] = None):
+        """
+        Cubo de agregados (KPIAggregates) do DataFrame.
+        
+        É construído uma vez e reutilizado enquanto as colunas de que depende
+        não mudam; as edições de linhas atualizam-no por delta (`apply_row_edit`).
+        """
+        from .kpi_aggregates import KPIAggregates
+        
+        key = self._dependency_key(self.AGGREGATE_DEPENDENCIES, df, {} if fingerprints is None else fingerprints)
+        if self.aggregates is None or self._aggregates_key != key:
+            self.aggregates = KPIAggregates(df, self)
+            self._aggregates_key = key
+        return self.aggregates
+    
+    def snapshot_rows(self, df: pd.DataFrame, index) -> Tuple:
+        """Guarda as linhas a editar (e a chave do DataFrame) antes de uma edição."""
+        return self._dependency_key(self.AGGREGATE_DEPENDENCIES, df, {}), df.loc[index].copy()
+    
+    def apply_row_edit(self, df: pd.DataFrame, snapshot: Tuple) -> None:
+        """
+        Atualiza o cubo de agregados após editar linhas, só com o delta dessas linhas.
+        
+        Os KPIs e gráficos que dependem do cubo são depois obtidos dele sem
+        percorrer o DataFrame. Se o cubo não corresponde ao DataFrame anterior à
+        edição, nada é feito e o cubo é reconstruído no próximo render.
+        
+        Args:
+            df: DataFrame já com as linhas editadas e reprocessadas
+            snapshot: Resultado de `snapshot_rows` antes da edição
+        """
+        old_key, old_rows = snapshot
+        if self.aggregates is None or self._aggregates_key != old_key:
+            return
+        try:
+            self.aggregates.update(old_rows, df.loc[old_rows.index])
+            self._aggregates_key = self._dependency_key(self.AGGREGATE_DEPENDENCIES, df, {})
+        except Exception as e:
+            print(f"Aviso: Erro ao atualizar KPIs incrementalmente: {e}")
+            self.aggregates = None
+            self._aggregates_key = None
+    
     def _get_empty_kpis(self) -> Dict:
         """Retorna KPIs vazios para DataFrames sem dados."""
         return {
@@ -98,36 +253,21 @@ class KPICalculator:
             'problematic_days': 0
         }
     
-    def _calculate_total_hours(self, df: pd.DataFrame) -> float:
-        """Calcula total de horas trabalhadas."""
+    def _column_hours(self, df: pd.DataFrame, col: str) -> pd.Series:
+        """Horas por linha de uma coluna de durações (timedelta, 'H:MM' ou numérica)."""
+        return duration_hours(df[col], text_durations=col in HHMM_DURATION_COLUMNS)
+    
+    def _hours_by_row(self, df: pd.DataFrame) -> pd.Series:
+        """Horas trabalhadas por linha, da primeira coluna de horas disponível."""
         # Procurar por diferentes possíveis nomes de colunas
-        hour_columns = ['total_trabalho', 'Efect', 'horas_efetivas_num', 'horas_trabalhadas', 'total_trabalho_calc', 'horas_efetivas_td']
-        
-        for col in hour_columns:
+        for col in HOUR_COLUMNS:
             if col in df.columns:
-                # Se for timedelta, converter para horas
-                if df[col].dtype == 'timedelta64[ns]':
-                    return df[col].fillna(pd.Timedelta(0)).dt.total_seconds().sum() / 3600
-                elif col in ['Efect', 'total_trabalho']:
-                    # Colunas em formato HH:MM como string ou timedelta
-                    if df[col].dtype == 'timedelta64[ns]':
-                        return df[col].fillna(pd.Timedelta(0)).dt.total_seconds().sum() / 3600
-                    else:
-                        total_seconds = 0
-                        for value in df[col].fillna('00:00'):
-                            if isinstance(value, str) and ':' in value:
-                                try:
-                                    parts = value.split(':')
-                                    if len(parts) == 2:
-                                        hours = int(parts[0])
-                                        minutes = int(parts[1])
-                                        total_seconds += hours * 3600 + minutes * 60
-                                except:
-                                    pass
-                        return total_seconds / 3600
-                else:
-                    return df[col].fillna(0).sum()
-        return 0.0
+                return self._column_hours(df, col)
+        return pd.Series(0.0, index=df.index)
+    
+    def _calculate_total_hours(self, df: pd.DataFrame) -> float:
+        """Calcula total de horas trabalhadas."""
+        return self._hours_by_row(df).sum()
     
     def _calculate_punctuality_rate(self, df: pd.DataFrame) -> float:
         """Calcula taxa de pontualidade."""
@@ -147,107 +287,70 @@ class KPICalculator:
             return delays[delays > 0].mean() if len(delays[delays > 0]) > 0 else 0.0
         return 0.0
     
-    def _calculate_overtime_hours(self, df: pd.DataFrame) -> float:
-        """Calcula total de horas extra."""
+    def _overtime_by_row(self, df: pd.DataFrame) -> pd.Series:
+        """Horas extra por linha."""
         # Procurar coluna de horas extras específica primeiro
-        if 'Extra' in df.columns:
-            # Coluna Extra está em formato HH:MM como string
-            total_seconds = 0
-            for value in df['Extra'].fillna('00:00'):
-                if isinstance(value, str) and ':' in value:
-                    try:
-                        parts = value.split(':')
-                        if len(parts) == 2:
-                            hours = int(parts[0])
-                            minutes = int(parts[1])
-                            total_seconds += hours * 3600 + minutes * 60
-                    except:
-                        pass
-            return total_seconds / 3600
-        
-        elif 'extra_td' in df.columns:
-            if df['extra_td'].dtype == 'timedelta64[ns]':
-                return df['extra_td'].fillna(pd.Timedelta(0)).dt.total_seconds().sum() / 3600
-            else:
-                return df['extra_td'].fillna(0).sum()
+        for col in ['Extra', 'extra_td']:
+            if col in df.columns:
+                return self._column_hours(df, col)
         
         # Fallback: calcular baseado nas horas efetivas
         hour_columns = ['total_trabalho', 'Efect', 'horas_efetivas_num', 'horas_trabalhadas']
         for col in hour_columns:
             if col in df.columns:
-                if df[col].dtype == 'timedelta64[ns]':
-                    hours = df[col].fillna(pd.Timedelta(0)).dt.total_seconds() / 3600
-                elif col in ['Efect', 'total_trabalho']:
-                    # Processar formato HH:MM ou timedelta
-                    if df[col].dtype == 'timedelta64[ns]':
-                        hours = df[col].fillna(pd.Timedelta(0)).dt.total_seconds() / 3600
-                    else:
-                        hours = []
-                        for value in df[col].fillna('00:00'):
-                            if isinstance(value, str) and ':' in value:
-                                try:
-                                    parts = value.split(':')
-                                    if len(parts) == 2:
-                                        h = int(parts[0]) + int(parts[1]) / 60
-                                        hours.append(h)
-                                except:
-                                    hours.append(0)
-                            else:
-                                hours.append(0)
-                        hours = pd.Series(hours)
-                else:
-                    hours = df[col].fillna(0)
                 # Assumir 8h como padrão
-                overtime = hours - 8.0
-                return overtime[overtime > 0].sum()
-        return 0.0
+                return (self._column_hours(df, col) - 8.0).clip(lower=0)
+        return pd.Series(0.0, index=df.index)
+    
+    def _calculate_overtime_hours(self, df: pd.DataFrame) -> float:
+        """Calcula total de horas extra."""
+        return self._overtime_by_row(df).sum()
+    
+    def _invalid_punches_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Dias com picagens inválidas (sem a coluna, todas são consideradas válidas)."""
+        if 'picagens_validas' not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        return ~df['picagens_validas'].astype(bool).to_numpy()
+    
+    def _text_mask(self, df: pd.DataFrame, col: str) -> np.ndarray:
+        """Linhas com texto preenchido (não nulo nem vazio) numa coluna de avisos."""
+        if col not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        values = df[col]
+        return (values.notna() & (values.astype(str) != '')).to_numpy()
     
     def _calculate_compliance_rate(self, df: pd.DataFrame) -> float:
         """Calcula taxa de conformidade geral."""
         if df.empty:
             return 0.0
         
-        compliant_days = 0
-        total_days = len(df)
-        
-        for _, row in df.iterrows():
-            # Verificar múltiplos fatores de conformidade
-            issues = 0
-            
-            # Picagens válidas
-            if not row.get('picagens_validas', True):
-                issues += 1
-            
-            # Atrasos significativos (>15min)
-            if row.get('atraso_minutos', 0) > 15:
-                issues += 1
-            
-            # Problemas de pontualidade
-            if row.get('tipo_problema', '') not in ['', None]:
-                issues += 1
-            
-            # Se não tem problemas, é conforme
-            if issues == 0:
-                compliant_days += 1
-        
-        return (compliant_days / total_days) * 100 if total_days > 0 else 0.0
+        return (1 - self._compliance_issues_mask(df).mean()) * 100
+    
+    def _work_day_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Dias úteis segundo o calendário do setor de cada linha (sem fins de semana nem feriados)."""
+        if 'Data' not in df.columns:
+            return np.ones(len(df), dtype=bool)
+        sectors = df['Departamento'] if 'Departamento' in df.columns else None
+        work_day, _ = ConfigManager().work_day_masks(df['Data'], sectors)
+        return work_day
+    
+    def _compliance_issues_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Dias não conformes: picagens inválidas, atrasos >15min ou problemas de pontualidade."""
+        issues = self._invalid_punches_mask(df) | self._text_mask(df, 'tipo_problema')
+        if 'atraso_minutos' in df.columns:
+            issues |= (df['atraso_minutos'] > 15).to_numpy()
+        return issues
     
     def _count_active_alerts(self, df: pd.DataFrame) -> int:
         """Conta alertas ativos."""
-        alerts = 0
-        
-        # Alertas de picagens
-        if 'aviso_picagens' in df.columns:
-            alerts += len(df[df['aviso_picagens'].notna() & (df['aviso_picagens'] != '')])
-        
-        # Alertas de intervalos
-        if 'alertas_intervalos' in df.columns:
-            alerts += len(df[df['alertas_intervalos'].notna() & (df['alertas_intervalos'] != '')])
-        
-        # Problemas de pontualidade
-        if 'tipo_problema' in df.columns:
-            alerts += len(df[df['tipo_problema'].notna() & (df['tipo_problema'] != '')])
-        
+        return int(self._alerts_by_row(df).sum())
+    
+    def _alerts_by_row(self, df: pd.DataFrame) -> np.ndarray:
+        """Número de alertas ativos por linha (picagens, intervalos e pontualidade)."""
+        alerts = sum(self._text_mask(df, col).astype(int) for col in ['aviso_picagens', 'tipo_problema'])
+        if 'regras_intervalos' in df.columns:
+            # Regras de intervalos disparadas (bits do IntervalAnalyzer)
+            alerts = alerts + (df['regras_intervalos'].fillna(0) != 0).to_numpy().astype(int)
         return alerts
     
     def create_kpi_cards(self, kpis: Dict) -> None:
@@ -360,12 +463,17 @@ class KPICalculator:
         </div>
         """, unsafe_allow_html=True)
     
-    def create_punctuality_trends_chart(self, df: pd.DataFrame) -> Optional[go.Figure]:
+    def create_punctuality_trends_chart(self, df: pd.DataFrame, date_range: Optional[Tuple] = None,
+                                        aggregates=None) -> Optional[go.Figure]:
         """
         Cria gráfico de tendências de pontualidade.
         
         Args:
             df: DataFrame com dados processados
+            date_range: Período visível (início, fim); o nível de agregação é
+                escolhido a partir dele, por isso um período curto mostra o detalhe diário
+            aggregates: KPIAggregates de `df`; a série agregada sai do seu
+                histograma de atrasos por dia, sem percorrer o DataFrame
             
         Returns:
             Figura Plotly ou None se não há dados
@@ -373,12 +481,26 @@ class KPICalculator:
         if df.empty or 'Data' not in df.columns:
             return None
         
+        if aggregates is not None:
+            histogram = aggregates.delay_histogram()
+            reduced, level = downsample_series(histogram, 'Data', 'atraso_minutos', date_range=date_range, weight='n')
+            if level is not None:
+                return self._punctuality_envelope_chart(reduced, level)
+        
         # Preparar dados
         df_chart = df.copy()
         df_chart['Data'] = pd.to_datetime(df_chart['Data'])
         
         if 'atraso_minutos' not in df_chart.columns:
             df_chart['atraso_minutos'] = 0
+        if date_range is not None:
+            df_chart = df_chart[df_chart['Data'].between(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))]
+        
+        # Muitos pontos (períodos longos, vários funcionários): agregar com envelope mínimo/máximo
+        df_chart['atraso_minutos'] = df_chart['atraso_minutos'].fillna(0)
+        reduced, level = downsample_series(df_chart, 'Data', 'atraso_minutos', date_range=date_range)
+        if level is not None:
+            return self._punctuality_envelope_chart(reduced, level)
         
         # Criar figura simples para atrasos diários
         fig = go.Figure()
@@ -419,6 +541,22 @@ class KPICalculator:
         
         return fig
     
+    def _punctuality_envelope_chart(self, reduced: pd.DataFrame, level: str) -> go.Figure:
+        """Gráfico de atrasos agregados por período (média e envelope mínimo/máximo)."""
+        fig = go.Figure(envelope_traces(reduced, 'Data', 'atraso_minutos', f'Atraso médio por {level} (min)',
+                                        '#6c757d', unit=' min'))
+        fig.add_hline(y=15, line_dash="dash", line_color="red", 
+                     annotation_text="Limite tolerância")
+        fig.update_layout(
+            title=f"📈 Atrasos (média por {level})",
+            showlegend=True,
+            height=400,
+            template="plotly_white",
+            xaxis_title="Data",
+            yaxis_title="Atraso (minutos)"
+        )
+        return fig
+    
     def create_compliance_breakdown_chart(self, df: pd.DataFrame) -> Optional[go.Figure]:
         """
         Cria gráfico de breakdown de conformidade.
@@ -451,26 +589,21 @@ class KPICalculator:
             'Sem Dados': '#6c757d'
         }
         
-        for _, row in df.iterrows():
-            # Verificar picagens válidas
-            if not row.get('picagens_validas', True):
-                categories['Problemas de Picagem'] += 1
-            
-            # Verificar se tem dados de atraso
-            elif 'atraso_minutos' not in row or pd.isna(row.get('atraso_minutos')):
-                categories['Sem Dados'] += 1
-            
-            else:
-                atraso = row.get('atraso_minutos', 0)
-                
-                if atraso == 0:
-                    categories['Perfeito'] += 1
-                elif atraso <= 10:
-                    categories['Pequenos Atrasos'] += 1
-                elif atraso <= 30:
-                    categories['Atrasos Moderados'] += 1
-                else:
-                    categories['Atrasos Graves'] += 1
+        # Classificar todos os dias de uma vez (a primeira condição verdadeira define a categoria)
+        invalid = self._invalid_punches_mask(df)
+        if 'atraso_minutos' in df.columns:
+            atraso = df['atraso_minutos'].to_numpy(dtype=float, na_value=np.nan)
+        else:
+            atraso = np.full(len(df), np.nan)
+        
+        with np.errstate(invalid='ignore'):
+            conditions = [invalid, np.isnan(atraso), atraso == 0, atraso <= 10, atraso <= 30]
+        labels = list(categories.keys())
+        codes = np.select(conditions, [labels.index(label) for label in
+                                       ['Problemas de Picagem', 'Sem Dados', 'Perfeito', 'Pequenos Atrasos', 'Atrasos Moderados']],
+                          default=labels.index('Atrasos Graves'))
+        for label, count in zip(labels, np.bincount(codes, minlength=len(labels))):
+            categories[label] = int(count)
         
         # Filtrar categorias com dados
         active_categories = {k: v for k, v in categories.items() if v > 0}
@@ -503,12 +636,14 @@ class KPICalculator:
         
         return fig
     
-    def create_weekly_hours_chart(self, df: pd.DataFrame) -> Optional[go.Figure]:
+    def create_weekly_hours_chart(self, df: pd.DataFrame, aggregates=None) -> Optional[go.Figure]:
         """
         Cria gráfico de horas trabalhadas por semana.
         
         Args:
             df: DataFrame com dados processados
+            aggregates: Cubo de agregados (KPIAggregates) do mesmo DataFrame; quando
+                indicado, os totais semanais são lidos do cubo em vez de agrupar os dias
             
         Returns:
             Figura Plotly ou None se não há dados
@@ -526,54 +661,10 @@ class KPICalculator:
         if hour_col is None:
             return None
         
-        # Preparar dados
-        df_chart = df.copy()
-        df_chart['Data'] = pd.to_datetime(df_chart['Data'])
-        df_chart['Semana'] = df_chart['Data'].dt.to_period('W').dt.start_time
-        
-        # Preparar dados para agregação
-        if df_chart[hour_col].dtype == 'timedelta64[ns]':
-            df_chart['horas_num'] = df_chart[hour_col].dt.total_seconds() / 3600
-        elif hour_col in ['Efect', 'total_trabalho']:
-            # Processar formato HH:MM ou timedelta
-            if df_chart[hour_col].dtype == 'timedelta64[ns]':
-                df_chart['horas_num'] = df_chart[hour_col].dt.total_seconds() / 3600
-            else:
-                hours = []
-                for value in df_chart[hour_col].fillna('00:00'):
-                    if isinstance(value, str) and ':' in value:
-                        try:
-                            parts = value.split(':')
-                            if len(parts) == 2:
-                                h = int(parts[0]) + int(parts[1]) / 60
-                                hours.append(h)
-                        except:
-                            hours.append(0)
-                    else:
-                        hours.append(0)
-                df_chart['horas_num'] = hours
+        if aggregates is not None:
+            weekly_data = aggregates.weekly_work_hours()
         else:
-            df_chart['horas_num'] = df_chart[hour_col].fillna(0)
-        
-        # Filtrar apenas dias de trabalho (não fins de semana/férias)
-        df_work_days = df_chart.copy()
-        
-        # Aplicar filtros para dias úteis
-        if 'Tipo' in df_work_days.columns:
-            # Remover tipos especiais
-            special_types = ['folga', 'férias', 'feriado', 'ausência', 'baixa médica']
-            for special_type in special_types:
-                df_work_days = df_work_days[~df_work_days['Tipo'].str.contains(special_type, case=False, na=False)]
-        
-        # Remover fins de semana
-        df_work_days = df_work_days[df_work_days['Data'].dt.weekday < 5]  # Segunda=0 a Sexta=4
-        
-        # Agrupar por semana
-        weekly_data = df_work_days.groupby('Semana').agg({
-            'horas_num': ['sum', 'mean', 'count']
-        }).reset_index()
-        
-        weekly_data.columns = ['Semana', 'Total_Horas', 'Media_Horas', 'Dias_Trabalhados']
+            weekly_data = self._weekly_work_hours(df, hour_col)
         
         # Criar gráfico
         fig = make_subplots(
@@ -625,12 +716,64 @@ class KPICalculator:
         
         return fig
     
-    def generate_alerts_summary(self, df: pd.DataFrame) -> List[Dict]:
+    def _latest_positions(self, order_key: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+        """
+        Posições das k linhas mais recentes de `mask`, sem ordenar todas as candidatas.
+        
+        `order_key` é a data invertida (menor = mais recente); empates mantêm a ordem original.
+        """
+        positions = np.flatnonzero(mask)
+        if k <= 0 or len(positions) == 0:
+            return positions[:0]
+        keys = order_key[positions]
+        if len(positions) > k:
+            # Seleção top-k: só as candidatas até à k-ésima data entram na ordenação final
+            threshold = np.partition(keys, k - 1)[k - 1]
+            selected = keys <= threshold
+            positions, keys = positions[selected], keys[selected]
+        return positions[np.lexsort((positions, keys))][:k]
+    
+    def _weekly_work_hours(self, df: pd.DataFrame, hour_col: str) -> pd.DataFrame:
+        """Horas por semana em dias úteis, agrupando os dias do DataFrame."""
+        # Preparar dados
+        df_chart = df.copy()
+        df_chart['Data'] = pd.to_datetime(df_chart['Data'])
+        df_chart['Semana'] = df_chart['Data'].dt.to_period('W').dt.start_time
+        
+        # Preparar dados para agregação
+        df_chart['horas_num'] = self._column_hours(df_chart, hour_col)
+        
+        # Filtrar apenas dias de trabalho (não fins de semana/férias)
+        df_work_days = df_chart.copy()
+        
+        # Aplicar filtros para dias úteis
+        if 'Tipo' in df_work_days.columns:
+            # Remover tipos especiais
+            for special_type in SPECIAL_DAY_TYPES:
+                df_work_days = df_work_days[~df_work_days['Tipo'].str.contains(special_type, case=False, na=False)]
+        
+        # Remover fins de semana e feriados (calendário do setor)
+        df_work_days = df_work_days[self._work_day_mask(df_work_days)]
+        
+        # Agrupar por semana
+        weekly_data = df_work_days.groupby('Semana').agg({
+            'horas_num': ['sum', 'mean', 'count']
+        }).reset_index()
+        
+        weekly_data.columns = ['Semana', 'Total_Horas', 'Media_Horas', 'Dias_Trabalhados']
+        return weekly_data
+    
+    def generate_alerts_summary(self, df: pd.DataFrame, limit: int = 10) -> List[Dict]:
         """
         Gera resumo de alertas prioritários.
         
+        Os alertas são escolhidos por severidade (atraso grave > picagens inválidas >
+        problema de pontualidade) e, dentro de cada nível, pelas datas mais recentes.
+        Só são construídos os `limit` alertas devolvidos.
+        
         Args:
             df: DataFrame com dados processados
+            limit: Número máximo de alertas
             
         Returns:
             Lista de dicionários com alertas
@@ -640,65 +783,59 @@ class KPICalculator:
         if df.empty:
             return alerts
         
-        # Filtrar apenas dias úteis para alertas
-        df_work = df.copy()
+        # Apenas dias úteis: sem fins de semana, feriados nem tipos especiais
+        work_day = self._work_day_mask(df)
+        if 'Tipo' in df.columns:
+            work_day &= ~df['Tipo'].str.contains('|'.join(SPECIAL_DAY_TYPES), case=False, na=False).to_numpy()
         
-        # Remover fins de semana
-        if 'Data' in df_work.columns:
-            df_work = df_work[df_work['Data'].dt.weekday < 5]
+        # Chave de ordenação: datas mais recentes primeiro (NaT é o mínimo de int64, logo fica no fim)
+        if 'Data' in df.columns:
+            order_key = ~df['Data'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        else:
+            order_key = np.zeros(len(df), dtype=np.int64)
         
-        # Remover tipos especiais
-        if 'Tipo' in df_work.columns:
-            special_types = ['folga', 'férias', 'feriado', 'ausência', 'baixa médica']
-            for special_type in special_types:
-                df_work = df_work[~df_work['Tipo'].str.contains(special_type, case=False, na=False)]
+        def row_date(position: int):
+            return df['Data'].iloc[position] if 'Data' in df.columns else 'N/A'
         
-        # Alertas de atrasos graves (>30min) apenas em dias úteis
-        if 'atraso_minutos' in df_work.columns:
-            grave_delays = df_work[df_work['atraso_minutos'].fillna(0) > 30]
-            for _, row in grave_delays.iterrows():
+        # Atrasos graves (>30min)
+        if 'atraso_minutos' in df.columns:
+            atraso = df['atraso_minutos'].fillna(0)
+            for position in self._latest_positions(order_key, work_day & (atraso > 30).to_numpy(), limit):
                 alerts.append({
                     'type': 'danger',
                     'icon': '🚨',
                     'title': 'Atraso Grave',
-                    'message': f"Atraso de {row['atraso_minutos']:.0f} minutos",
-                    'date': row.get('Data', 'N/A'),
+                    'message': f"Atraso de {atraso.iloc[position]:.0f} minutos",
+                    'date': row_date(position),
                     'priority': 'high'
                 })
         
-        # Alertas de picagens inválidas apenas em dias úteis
-        invalid_punches = df_work[df_work.get('picagens_validas', True) == False]
-        for _, row in invalid_punches.iterrows():
-            # Verificar se é realmente um problema (não falta justificada)
-            if row.get('Tipo', '').lower() not in ['falta', 'ausência']:
-                alerts.append({
-                    'type': 'warning',
-                    'icon': '⚠️',
-                    'title': 'Picagens Inválidas',
-                    'message': row.get('aviso_picagens', 'Problema nas picagens'),
-                    'date': row.get('Data', 'N/A'),
-                    'priority': 'medium'
-                })
+        # Picagens inválidas que não sejam faltas justificadas
+        invalid = work_day & self._invalid_punches_mask(df)
+        if 'Tipo' in df.columns:
+            invalid &= ~df['Tipo'].astype(str).str.lower().isin(['falta', 'ausência']).to_numpy()
+        for position in self._latest_positions(order_key, invalid, limit - len(alerts)):
+            alerts.append({
+                'type': 'warning',
+                'icon': '⚠️',
+                'title': 'Picagens Inválidas',
+                'message': df['aviso_picagens'].iloc[position] if 'aviso_picagens' in df.columns else 'Problema nas picagens',
+                'date': row_date(position),
+                'priority': 'medium'
+            })
         
-        # Alertas de problemas de pontualidade apenas em dias úteis
-        if 'tipo_problema' in df_work.columns:
-            punctuality_issues = df_work[
-                df_work['tipo_problema'].notna() & 
-                (df_work['tipo_problema'] != '') &
-                (~df_work['tipo_problema'].str.contains('fim de semana|folga|férias', case=False, na=False))
-            ]
-            for _, row in punctuality_issues.iterrows():
+        # Problemas de pontualidade
+        if 'tipo_problema' in df.columns:
+            issues = work_day & self._text_mask(df, 'tipo_problema') & ~df['tipo_problema'].astype(str).str.contains(
+                'fim de semana|folga|férias', case=False, na=False).to_numpy()
+            for position in self._latest_positions(order_key, issues, limit - len(alerts)):
                 alerts.append({
                     'type': 'info',
                     'icon': '🔍',
                     'title': 'Problema de Pontualidade',
-                    'message': row['tipo_problema'],
-                    'date': row.get('Data', 'N/A'),
+                    'message': df['tipo_problema'].iloc[position],
+                    'date': row_date(position),
                     'priority': 'low'
                 })
         
-        # Ordenar por prioridade e data
-        priority_order = {'high': 3, 'medium': 2, 'low': 1}
-        alerts.sort(key=lambda x: (priority_order.get(x['priority'], 0), x['date']), reverse=True)
-        
-        return alerts[:10]  # Máximo 10 alertas 
\ No newline at end of file
+        return alerts 
\ No newline at end of file
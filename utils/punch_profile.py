@@ -0,0 +1,193 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional
+from .time_utils import punch_matrix, compact_punches, minutes_to_hhmm
+
+
+class PunchProfileIndex:
+    """
+    Perfil histórico de picagens por funcionário.
+
+    Para cada (funcionário, dia da semana, coluna E/S) guarda o histograma
+    dos minutos picados e, a partir dele, a mediana, a dispersão (intervalo
+    interquartil) e o número de amostras. O histograma é aditivo, por isso o
+    perfil é construído de forma incremental: cada `update` só acrescenta os
+    dias (Numero, Data) ainda não vistos.
+
+    As sugestões de correção passam a ser consultas O(1) ao perfil, com uma
+    confiança que cresce com o número de amostras e diminui com a dispersão.
+    """
+
+    # Dia da semana agregado (todos os dias) usado quando o dia não tem amostras suficientes
+    ALL_WEEKDAYS = 7
+
+    # Mínimo de amostras para um perfil ser usado numa sugestão
+    MIN_SAMPLES = 3
+
+    # Dispersão (minutos) a partir da qual a confiança do perfil é nula
+    MAX_SPREAD = 120
+
+    def __init__(self):
+        """Inicializa um índice vazio."""
+        self._histogram = pd.Series(
+            dtype='int64',
+            index=pd.MultiIndex.from_arrays([[], [], [], []], names=['Numero', 'dia_semana', 'coluna', 'minutos'])
+        )
+        self._seen_days = set()
+        self._profiles = None
+        self._lookup = None
+        # Aumenta sempre que o histórico muda (invalida resultados calculados com os perfis)
+        self.version = 0
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Acrescenta ao histórico os dias completos ainda não vistos.
+
+        Só contam dias com número par de picagens válidas que começam numa
+        entrada (dias com picagens esquecidas enviesariam as posições). Os
+        restantes não ficam marcados como vistos, para serem acrescentados
+        quando as picagens forem corrigidas.
+
+        Returns:
+            Número de dias acrescentados
+        """
+        if df.empty or 'Data' not in df.columns:
+            return 0
+
+        dates = pd.to_datetime(df['Data'], errors='coerce')
+        numeros = self._employee_keys(df)
+        day_keys = numeros + '|' + dates.dt.strftime('%Y-%m-%d').fillna('')
+        new_day = dates.notna().to_numpy() & ~day_keys.isin(self._seen_days).to_numpy()
+
+        columns, present, minutes, _ = punch_matrix(df)
+        if not columns:
+            return 0
+        order, count = compact_punches(present)
+        first_is_entry = np.array([col.startswith('E') for col in columns])[order[:, 0]]
+        valid = present & ~np.isnan(minutes)
+        complete = (count >= 2) & (count % 2 == 0) & first_is_entry & (valid == present).all(axis=1)
+        rows = np.flatnonzero(new_day & complete)
+        if len(rows) == 0:
+            return 0
+
+        row_idx, col_idx = np.nonzero(valid[rows])
+        samples = pd.DataFrame({
+            'Numero': numeros.to_numpy()[rows][row_idx],
+            'dia_semana': dates.dt.weekday.to_numpy()[rows][row_idx].astype(int),
+            'coluna': np.asarray(columns, dtype=object)[col_idx],
+            'minutos': minutes[rows][row_idx, col_idx].astype(int),
+        })
+        counts = samples.groupby(['Numero', 'dia_semana', 'coluna', 'minutos']).size()
+        self._seen_days.update(day_keys.iloc[rows])
+        self._histogram = self._histogram.add(counts, fill_value=0).astype('int64')
+        self._profiles = None
+        self._lookup = None
+        self.version += 1
+        return len(rows)
+
+    @property
+    def profiles(self) -> pd.DataFrame:
+        """Tabela (Numero, dia_semana, coluna) -> mediana, dispersao, amostras, confianca."""
+        if self._profiles is None:
+            self._profiles = self._build_profiles()
+        return self._profiles
+
+    def lookup(self, numero, weekday: int, column: str) -> Optional[Dict]:
+        """
+        Perfil de uma coluna de picagem para um funcionário e dia da semana.
+
+        Usa o perfil do próprio dia da semana e, se tiver poucas amostras, o
+        perfil de todos os dias. Devolve None sem histórico suficiente.
+        """
+        if self._lookup is None:
+            self._lookup = {key: values for key, values in zip(self.profiles.index, self.profiles.to_dict('records'))}
+        numero = str(numero).strip()
+        for day in (weekday, self.ALL_WEEKDAYS):
+            profile = self._lookup.get((numero, day, column))
+            if profile is not None and profile['amostras'] >= self.MIN_SAMPLES:
+                return profile
+        return None
+
+    def row_profile(self, row) -> Dict[str, Dict]:
+        """Perfis disponíveis (coluna -> perfil) para o funcionário e dia de uma linha."""
+        if 'Data' not in row or pd.isna(row['Data']):
+            return {}
+        weekday = pd.to_datetime(row['Data']).weekday()
+        numero = row.get('Numero', '')
+        profiles = {}
+        for column in self.profiles.index.get_level_values('coluna').unique():
+            profile = self.lookup(numero, weekday, column)
+            if profile is not None:
+                profiles[column] = profile
+        return profiles
+
+    def lookup_matrix(self, df: pd.DataFrame, columns) -> Dict[str, np.ndarray]:
+        """
+        Consulta vectorizada do perfil para todas as linhas e colunas.
+
+        Returns:
+            Dicionário com matrizes (linhas x colunas): 'minutos' (NaN sem
+            perfil), 'hora' (texto HH:MM ou '') e 'confianca'.
+        """
+        n_rows, n_cols = len(df), len(columns)
+        result = {
+            'minutos': np.full((n_rows, n_cols), np.nan),
+            'hora': np.full((n_rows, n_cols), '', dtype=object),
+            'confianca': np.zeros((n_rows, n_cols)),
+        }
+        if n_rows == 0 or n_cols == 0 or self.profiles.empty or 'Data' not in df.columns:
+            return result
+
+        numeros = self._employee_keys(df).to_numpy()
+        weekday = pd.to_datetime(df['Data'], errors='coerce').dt.weekday.fillna(-1).astype(int).to_numpy()
+        usable = self.profiles[self.profiles['amostras'] >= self.MIN_SAMPLES]
+        for j, column in enumerate(columns):
+            for day in (weekday, np.full(n_rows, self.ALL_WEEKDAYS)):
+                missing = np.isnan(result['minutos'][:, j])
+                if not missing.any():
+                    break
+                keys = pd.MultiIndex.from_arrays([numeros[missing], day[missing], np.full(missing.sum(), column)])
+                found = usable.reindex(keys)
+                result['minutos'][missing, j] = found['mediana'].to_numpy(dtype=float)
+                result['confianca'][missing, j] = found['confianca'].fillna(0.0).to_numpy(dtype=float)
+
+        has_profile = ~np.isnan(result['minutos'])
+        result['hora'][has_profile] = minutes_to_hhmm(result['minutos'][has_profile]).to_numpy()
+        return result
+
+    def _build_profiles(self) -> pd.DataFrame:
+        """Calcula mediana e quartis a partir dos histogramas (por dia e para todos os dias)."""
+        columns = ['mediana', 'dispersao', 'amostras', 'confianca']
+        if self._histogram.empty:
+            empty_index = pd.MultiIndex.from_arrays([[], [], []], names=['Numero', 'dia_semana', 'coluna'])
+            return pd.DataFrame(columns=columns, index=empty_index)
+
+        per_day = self._histogram.rename('n').reset_index()
+        all_days = per_day.groupby(['Numero', 'coluna', 'minutos'], as_index=False)['n'].sum()
+        all_days['dia_semana'] = self.ALL_WEEKDAYS
+        histogram = pd.concat([per_day, all_days], ignore_index=True)
+
+        keys = ['Numero', 'dia_semana', 'coluna']
+        histogram = histogram.sort_values(keys + ['minutos'], ignore_index=True)
+        cumulative = histogram.groupby(keys)['n'].cumsum()
+        total = histogram.groupby(keys)['n'].transform('sum')
+
+        def quantile(q):
+            return histogram[cumulative >= q * total].groupby(keys)['minutos'].first()
+
+        profiles = pd.DataFrame({
+            'mediana': quantile(0.5),
+            'dispersao': quantile(0.75) - quantile(0.25),
+            'amostras': histogram.groupby(keys)['n'].sum(),
+        })
+        sample_weight = profiles['amostras'] / (profiles['amostras'] + self.MIN_SAMPLES)
+        spread_weight = (1 - profiles['dispersao'] / self.MAX_SPREAD).clip(lower=0)
+        profiles['confianca'] = (sample_weight * spread_weight).round(2)
+        return profiles[columns]
+
+    @staticmethod
+    def _employee_keys(df: pd.DataFrame) -> pd.Series:
+        """Chave do funcionário de cada linha (texto, '' se não houver coluna Numero)."""
+        if 'Numero' not in df.columns:
+            return pd.Series('', index=df.index, dtype=object)
+        return df['Numero'].astype(object).where(df['Numero'].notna(), '').astype(str).str.strip()
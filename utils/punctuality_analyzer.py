@@ -1,7 +1,12 @@
 import pandas as pd
+import re
 from datetime import datetime, time, timedelta
 import numpy as np
 from typing import List, Dict, Tuple, Optional
+from .config_manager import employee_key
+from .rule_dsl import RuleResults, rule_bits_mask
+from .time_utils import punch_matrix, compact_punches, hhmm_to_minutes, minutes_to_hhmm
+from .work_calendar import WEEKDAY_NAMES
 
 class PunctualityAnalyzer:
     """
@@ -12,8 +17,102 @@ class PunctualityAnalyzer:
     - Interface para edição manual
     """
     
-    def __init__(self, rules=None):
-        """Inicializa o analisador com regras específicas."""
+    # Tipos de dia (em minúsculas) onde não são esperadas picagens
+    NO_PUNCH_DAY_TYPES = ['folga', 'férias', 'feriado', 'ausência', 'baixa médica', 'compensação']
+    
+    # Nomes dos dias da semana usados em `dias_trabalho` (segunda = 0)
+    WEEKDAY_NAMES = WEEKDAY_NAMES
+    
+    # Coluna (uint64) com o bit do resultado da tabela de decisão de cada linha;
+    # o texto de `correcao_sugerida` só é gerado por `render_corrections`
+    RULES_COLUMN = 'regras_pontualidade'
+    
+    # Tabela de decisão da análise vectorizada. A ordem das entradas é a
+    # prioridade das condições em `_classify_punctuality_batch`; os textos
+    # usam campos {nome} preenchidos com os valores de cada linha e
+    # `requer_verificacao_manual` a None é calculado pela confiança. Quando a
+    # picagem sugerida vem do perfil do funcionário, a confiança é a do perfil.
+    PUNCTUALITY_DECISION_TABLE = {
+        'dia_sem_picagem': {
+            'picagens_sugeridas': '', 'tipo_problema': '',
+            'correcao_sugerida': 'Dia de {tipo_dia} - picagens não requeridas',
+            'confianca_sugestao': 1.0, 'requer_verificacao_manual': False
+        },
+        'dia_nao_util': {
+            'picagens_sugeridas': '', 'tipo_problema': 'Picagens em dia não útil',
+            'correcao_sugerida': 'Picagens encontradas em {dia_semana} - verificar se correto',
+            'confianca_sugestao': 0.8, 'requer_verificacao_manual': True
+        },
+        'feriado': {
+            'picagens_sugeridas': '', 'tipo_problema': '',
+            'correcao_sugerida': 'Dia de feriado - picagens não requeridas',
+            'confianca_sugestao': 1.0, 'requer_verificacao_manual': False
+        },
+        'fim_de_semana': {
+            'picagens_sugeridas': '', 'tipo_problema': '',
+            'correcao_sugerida': 'Dia de fim de semana - picagens não requeridas',
+            'confianca_sugestao': 1.0, 'requer_verificacao_manual': False
+        },
+        'sem_dados': {
+            'picagens_sugeridas': 'Nenhuma picagem registada', 'tipo_problema': 'Sem dados',
+            'correcao_sugerida': 'Inserir picagens manualmente',
+            'confianca_sugestao': 0.0, 'requer_verificacao_manual': True
+        },
+        'esqueceu_entrada': {
+            'picagens_sugeridas': 'Adicionar entrada às {entrada_sugerida}', 'tipo_problema': 'Entrada em falta',
+            'correcao_sugerida': 'Primeira picagem é saída ({primeira}), falta entrada',
+            'confianca_sugestao': 0.9, 'requer_verificacao_manual': None
+        },
+        'possivel_esquecimento_entrada': {
+            'picagens_sugeridas': 'Verificar se esqueceu entrada às {hora_sugerida}',
+            'tipo_problema': 'Possível esquecimento de entrada',
+            'correcao_sugerida': 'Atraso de {diferenca}min (>{tolerancia}min) sugere esquecimento',
+            'confianca_sugestao': 0.8, 'requer_verificacao_manual': None
+        },
+        'atraso_normal': {
+            'picagens_sugeridas': '', 'tipo_problema': 'Atraso na entrada',
+            'correcao_sugerida': 'Atraso de {diferenca}min (tolerável)',
+            'confianca_sugestao': 1.0, 'requer_verificacao_manual': None
+        },
+        'apenas_entrada': {
+            'picagens_sugeridas': 'Adicionar saída às {saida_sugerida}', 'tipo_problema': 'Saída em falta',
+            'correcao_sugerida': 'Apenas entrada registada',
+            'confianca_sugestao': 0.9, 'requer_verificacao_manual': None
+        },
+        'entrada_antes_intervalo': {
+            'picagens_sugeridas': 'Verificar entrada antes de {primeira}', 'tipo_problema': 'Entrada em falta',
+            'correcao_sugerida': 'Grande intervalo ({intervalo}min) antes da primeira picagem',
+            'confianca_sugestao': 0.7, 'requer_verificacao_manual': None
+        },
+        'saida_impar': {
+            'picagens_sugeridas': 'Verificar saída após {ultima}', 'tipo_problema': 'Saída em falta',
+            'correcao_sugerida': 'Número ímpar de picagens sugere saída em falta',
+            'confianca_sugestao': 0.6, 'requer_verificacao_manual': None
+        },
+        'padrao_irregular': {
+            'picagens_sugeridas': 'Verificação manual necessária', 'tipo_problema': 'Padrão irregular',
+            'correcao_sugerida': '{contagem} picagens - padrão não reconhecido',
+            'confianca_sugestao': 0.3, 'requer_verificacao_manual': None
+        },
+        'esqueceu_saida': {
+            'picagens_sugeridas': 'Adicionar saída às {saida_sugerida}', 'tipo_problema': 'Saída em falta',
+            'correcao_sugerida': 'Última picagem é entrada ({ultima}), falta saída',
+            'confianca_sugestao': 0.8, 'requer_verificacao_manual': None
+        },
+        'normal': {
+            'picagens_sugeridas': '', 'tipo_problema': '',
+            'correcao_sugerida': 'Padrão de picagens normal',
+            'confianca_sugestao': 1.0, 'requer_verificacao_manual': None
+        },
+    }
+    
+    def __init__(self, rules=None, punch_profile=None):
+        """
+        Inicializa o analisador com regras específicas.
+        
+        `punch_profile` (PunchProfileIndex opcional) fornece o histórico de
+        picagens de cada funcionário para sugerir as picagens em falta.
+        """
         self.default_rules = {
             'hora_entrada_padrao': '08:30',
             'hora_saida_padrao': '17:30',
@@ -25,6 +124,8 @@ class PunctualityAnalyzer:
         
         if rules:
             self.default_rules.update(rules)
+        
+        self.punch_profile = punch_profile
     
     def analyze_punctuality_issues(self, df, rules=None):
         """
@@ -42,38 +143,246 @@ class PunctualityAnalyzer:
         
         current_rules = rules or self.default_rules
         
-        # Criar colunas para análise de pontualidade
-        punctuality_columns = {
-            'picagens_sugeridas': '',
-            'tipo_problema': '',
-            'correcao_sugerida': '',
-            'confianca_sugestao': 0.0,
-            'atraso_minutos': 0,
-            'saida_antecipada_minutos': 0,
-            'requer_verificacao_manual': False
-        }
+        # Classificar todas as linhas de uma vez e escrever as colunas numa única atribuição
+        results = self._classify_punctuality_batch(df, current_rules)
+        df[list(results.columns)] = results
         
-        for col, default in punctuality_columns.items():
-            if col not in df.columns:
-                df[col] = default
+        return df
+    
+    def render_corrections(self, df, rules=None) -> pd.Series:
+        """
+        Texto de `correcao_sugerida` das linhas recebidas (só para mostrar ou exportar).
         
-        # Analisar cada linha
-        for index, row in df.iterrows():
-            analysis = self._analyze_row_punctuality(row, current_rules)
+        O resultado de cada linha vem dos bits de RULES_COLUMN (recalculado
+        se a coluna não existir); os valores do texto são recalculados só
+        para estas linhas.
+        """
+        if df.empty:
+            return pd.Series('', index=df.index, dtype=object)
+        outcome = None
+        if self.RULES_COLUMN in df.columns:
+            bits = df[self.RULES_COLUMN].fillna(0).to_numpy(dtype=np.uint64)
+            outcome = np.full(len(df), '', dtype=object)
+            for code in self.PUNCTUALITY_DECISION_TABLE:
+                outcome[rule_bits_mask(bits, self.RULES_COLUMN, [code])] = code
+        analysis = self._classify_punctuality_batch(df, rules or self.default_rules,
+                                                    text_columns=('correcao_sugerida',), stored_outcome=outcome)
+        return analysis['correcao_sugerida'].astype(object)
+    
+    def _classify_punctuality_batch(self, df, rules, text_columns=('picagens_sugeridas',),
+                                    stored_outcome: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Versão vectorizada de `_analyze_row_punctuality` para o DataFrame inteiro.
+        
+        Calcula máscaras (tipo de dia sem picagens, dia não útil, número e
+        posição das picagens, atraso face ao horário do setor) e resolve o
+        resultado de cada linha através de `PUNCTUALITY_DECISION_TABLE`.
+        Produz os mesmos valores que a análise linha a linha; o resultado
+        fica em bits em RULES_COLUMN e só os textos de `text_columns` são
+        gerados. `stored_outcome` (resultados já guardados, '' se em falta)
+        substitui o resultado calculado ao gerar os textos.
+        """
+        from .config_manager import ConfigManager
+        
+        config_manager = ConfigManager()
+        n_rows = len(df)
+        index = df.index
+        rows = np.arange(n_rows)
+        
+        # Configuração efectiva de cada linha (global, setor, equipa e funcionário;
+        # Produção por omissão), resolvida uma vez por funcionário e setor
+        row_config = config_manager.join_employee_configs(df)
+        
+        def config_value(key):
+            if key not in row_config.columns:
+                return pd.Series(None, index=index, dtype=object)
+            return row_config[key].astype(object)
+        
+        # 1. Tipos de dia que não requerem picagens
+        if 'Tipo' in df.columns:
+            tipo_lower = df['Tipo'].astype(object).where(df['Tipo'].notna(), '').astype(str).str.lower()
+            no_punch_pattern = '|'.join(re.escape(tipo) for tipo in self.NO_PUNCH_DAY_TYPES)
+            no_punch_day = tipo_lower.str.contains(no_punch_pattern, regex=True).to_numpy(dtype=bool)
+        else:
+            tipo_lower = pd.Series('', index=index)
+            no_punch_day = np.zeros(n_rows, dtype=bool)
+        
+        # 2. Picagens presentes e respectivas posições
+        columns, present, minutes, text = punch_matrix(df)
+        order, count = compact_punches(present)
+        has_punches = count > 0
+        odd = count % 2 != 0
+        
+        if columns:
+            first_col = order[:, 0]
+            second_col = order[:, min(1, len(columns) - 1)]
+            last_col = order[rows, np.maximum(count - 1, 0)]
+            is_exit = np.array([col.startswith('S') for col in columns])
+            first_is_exit = is_exit[first_col] & has_punches
+            last_is_entry = ~is_exit[last_col] & has_punches
+            first_minutes = minutes[rows, first_col]
+            second_minutes = minutes[rows, second_col]
+            first_text = text[rows, first_col]
+            last_text = text[rows, last_col]
+            last_minutes = minutes[rows, last_col]
+        else:
+            first_col = last_col = np.zeros(n_rows, dtype=int)
+            first_is_exit = last_is_entry = np.zeros(n_rows, dtype=bool)
+            first_minutes = second_minutes = last_minutes = np.full(n_rows, np.nan)
+            first_text = last_text = np.full(n_rows, '', dtype=object)
+        
+        # 3. Dias não úteis segundo o calendário do setor (dias de trabalho e feriados)
+        if 'Data' in df.columns:
+            dates = pd.to_datetime(df['Data'])
+            sectors = df['Departamento'] if 'Departamento' in df.columns else None
+            work_day, holiday = config_manager.work_day_masks(dates, sectors)
+            non_work_day = dates.notna().to_numpy() & ~work_day
+            day_name = pd.Series('', index=index, dtype=object)
+            worked_on_day_off = non_work_day & has_punches
+            day_name[worked_on_day_off] = dates[worked_on_day_off].dt.strftime('%A')
+        else:
+            non_work_day = holiday = np.zeros(n_rows, dtype=bool)
+            day_name = pd.Series('', index=index)
+        
+        # 4. Atraso na entrada face ao horário configurado
+        entrada_padrao = config_value('entrada_padrao').astype(str)
+        saida_padrao = config_value('saida_padrao').astype(str)
+        tolerancia_esquecimento = config_value('tolerancia_esquecimento')
+        standard_minutes = hhmm_to_minutes(entrada_padrao).to_numpy()
+        diff_entrada = np.nan_to_num(first_minutes - standard_minutes, nan=0.0).astype(int)
+        gap_first = np.nan_to_num(second_minutes - first_minutes, nan=0.0).astype(int)
+        
+        # 5. Resolver o resultado de cada linha (a ordem é a prioridade da análise)
+        conditions = [
+            no_punch_day,
+            non_work_day & has_punches,
+            non_work_day & holiday,
+            non_work_day,
+            ~has_punches,
+            first_is_exit,
+            diff_entrada > tolerancia_esquecimento.astype(float).to_numpy(),
+            diff_entrada > config_value('tolerancia_entrada').astype(float).to_numpy(),
+            odd & (count == 1),
+            odd & (count == 3) & (gap_first > 120),
+            odd & (count == 3),
+            odd,
+            (count >= 2) & last_is_entry,
+        ]
+        outcomes = list(self.PUNCTUALITY_DECISION_TABLE)
+        outcome = np.select(conditions, outcomes[:-1], default=outcomes[-1])
+        if stored_outcome is not None:
+            outcome = np.where(stored_outcome != '', stored_outcome, outcome).astype(outcome.dtype)
+        
+        results = RuleResults(index, outcomes, {})
+        for code in pd.unique(outcome):
+            results.set(code, outcome == code)
+        
+        table = pd.DataFrame.from_dict(self.PUNCTUALITY_DECISION_TABLE, orient='index')
+        resolved = table.loc[outcome].set_axis(index)
+        
+        # Valores usados nos textos de cada resultado (arrays de objectos str)
+        valid_entry = ~np.isnan(first_minutes + standard_minutes)
+        suggested_entry = np.where(
+            valid_entry,
+            minutes_to_hhmm(np.where(valid_entry, (first_minutes + standard_minutes) // 2, 0)).to_numpy(),
+            entrada_padrao.to_numpy(dtype=object)
+        )
+        
+        # Picagens em falta sugeridas pelo perfil histórico do funcionário
+        entrada_sugerida = entrada_padrao.to_numpy(dtype=object)
+        saida_sugerida = saida_padrao.to_numpy(dtype=object)
+        confianca = resolved['confianca_sugestao'].astype(float)
+        if self.punch_profile is not None and columns:
+            profile = self.punch_profile.lookup_matrix(df, columns)
+            pair_col = np.array([
+                columns.index(pair) if pair in columns else -1
+                for pair in [('E' if col.startswith('S') else 'S') + col[1:] for col in columns]
+            ])
+            
+            def profile_at(key, col_idx):
+                return profile[key][rows, np.maximum(col_idx, 0)]
             
-            # Aplicar resultados
-            for key, value in analysis.items():
-                if key in df.columns:
-                    df.loc[index, key] = value
+            entry_col, exit_col = pair_col[first_col], pair_col[last_col]
+            entry_minutes = np.where(entry_col >= 0, profile_at('minutos', entry_col), np.nan)
+            exit_minutes = np.where(exit_col >= 0, profile_at('minutos', exit_col), np.nan)
+            use_entry = first_is_exit & (entry_minutes < first_minutes)
+            use_exit = last_is_entry & (exit_minutes > last_minutes)
+            use_usual = (outcome == 'possivel_esquecimento_entrada') & (profile['minutos'][rows, first_col] < first_minutes)
+            
+            entrada_sugerida = np.where(use_entry, profile_at('hora', entry_col), entrada_sugerida)
+            saida_sugerida = np.where(use_exit, profile_at('hora', exit_col), saida_sugerida)
+            suggested_entry = np.where(use_usual, profile['hora'][rows, first_col], suggested_entry)
+            
+            from_entry = use_entry & (outcome == 'esqueceu_entrada')
+            from_exit = use_exit & np.isin(outcome, ['apenas_entrada', 'esqueceu_saida'])
+            confianca = confianca.mask(from_entry, profile_at('confianca', entry_col))
+            confianca = confianca.mask(from_exit, profile_at('confianca', exit_col))
+            confianca = confianca.mask(use_usual, profile['confianca'][rows, first_col])
+        
+        def as_text(values):
+            return np.asarray(values).astype(str).astype(object)
+        
+        values = {
+            'tipo_dia': tipo_lower.to_numpy(dtype=object),
+            'dia_semana': day_name.to_numpy(dtype=object),
+            'entrada_sugerida': entrada_sugerida,
+            'saida_sugerida': saida_sugerida,
+            'primeira': first_text,
+            'ultima': last_text,
+            'diferenca': as_text(diff_entrada),
+            'tolerancia': as_text(tolerancia_esquecimento),
+            'hora_sugerida': suggested_entry,
+            'intervalo': as_text(gap_first),
+            'contagem': as_text(count),
+        }
         
-        return df
+        # Atraso (face às regras recebidas) apenas em atrasos e esquecimentos
+        atraso = np.zeros(n_rows, dtype='int64')
+        if 'hora_entrada_padrao' in rules:
+            rules_standard = hhmm_to_minutes([str(rules['hora_entrada_padrao'])]).iloc[0]
+            delay = np.nan_to_num(first_minutes - rules_standard, nan=0.0).astype('int64')
+            with_delay = np.isin(outcome, ['possivel_esquecimento_entrada', 'atraso_normal'])
+            atraso = np.where(with_delay, np.maximum(delay, 0), 0).astype('int64')
+        
+        tipo_problema = resolved['tipo_problema'].astype(str)
+        fixed_check = resolved['requer_verificacao_manual']
+        computed_check = (confianca < 0.9) & (tipo_problema != '')
+        
+        texts = {column: self._render_decision_text(column, outcome, values, index) for column in text_columns}
+        return pd.DataFrame({
+            **texts,
+            'tipo_problema': tipo_problema,
+            self.RULES_COLUMN: results.to_column(self.RULES_COLUMN),
+            'confianca_sugestao': confianca,
+            'atraso_minutos': atraso,
+            'saida_antecipada_minutos': np.zeros(n_rows, dtype='int64'),
+            'requer_verificacao_manual': fixed_check.where(fixed_check.notna(), computed_check).astype(bool)
+        }, index=index)
+    
+    def _render_decision_text(self, column: str, outcome: np.ndarray,
+                              values: Dict[str, np.ndarray], index: pd.Index) -> pd.Series:
+        """Preenche os modelos de texto da tabela de decisão, um resultado de cada vez."""
+        rendered = np.full(len(outcome), '', dtype=object)
+        for code in pd.unique(outcome):
+            mask = outcome == code
+            pieces = re.split(r'\{(\w+)\}', self.PUNCTUALITY_DECISION_TABLE[code][column])
+            text = np.full(mask.sum(), pieces[0], dtype=object)
+            for i, piece in enumerate(pieces[1:]):
+                text = text + (values[piece][mask] if i % 2 == 0 else piece)
+            rendered[mask] = text
+        return pd.Series(rendered, index=index).astype(str)
     
     def _analyze_row_punctuality(self, row, rules) -> Dict:
-        """Analisa pontualidade e problemas para uma linha específica."""
+        """
+        Analisa pontualidade e problemas para uma linha específica.
+        
+        Referência linha a linha de `_classify_punctuality_batch` (usada para
+        analisar uma única linha e para validar a versão vectorizada).
+        """
         # Verificar se é um tipo de dia que não requer picagens
         if 'Tipo' in row:
             tipo_dia = str(row['Tipo']).lower() if pd.notna(row['Tipo']) else ''
-            if any(tipo in tipo_dia for tipo in ['folga', 'férias', 'feriado', 'ausência', 'baixa médica', 'compensação']):
+            if any(tipo in tipo_dia for tipo in self.NO_PUNCH_DAY_TYPES):
                 return self._create_expected_no_data_result(tipo_dia)
         
         # Verificar se é dia de trabalho baseado nas configurações
@@ -100,6 +409,8 @@ class PunctualityAnalyzer:
                              'saida_antecipada_minutos': 0,
                              'requer_verificacao_manual': True
                          }
+                     elif config_manager.is_holiday(date, sector):
+                         return self._create_expected_no_data_result('feriado')
                      else:
                          return self._create_expected_no_data_result('fim de semana')
         except:
@@ -118,17 +429,20 @@ class PunctualityAnalyzer:
         if not timestamps:
             return self._create_no_data_result()
         
+        # Histórico de picagens do funcionário (perfil por dia da semana)
+        profile = self.punch_profile.row_profile(row) if self.punch_profile is not None else None
+        
         # Usar ConfigManager para análise inteligente se disponível
         try:
             from .config_manager import ConfigManager
             config_manager = ConfigManager()
             
-            # Obter configuração apropriada (usar Departamento se disponível)
+            # Obter configuração apropriada (perfil do funcionário sobre o Departamento)
             sector = row.get('Departamento', 'Produção')
-            config = config_manager.get_sector_config(sector)
+            config = config_manager.get_employee_config(row.get('Numero', ''), sector)
             
-            # Análise inteligente usando configurações
-            smart_analysis = config_manager.analyze_punch_pattern(timestamps, config)
+            # Análise inteligente usando configurações e o histórico do funcionário
+            smart_analysis = config_manager.analyze_punch_pattern(timestamps, config, profile)
             
             # Converter resultado para formato esperado
             return self._convert_smart_analysis_result(smart_analysis, timestamps, rules)
@@ -142,9 +456,9 @@ class PunctualityAnalyzer:
         
         # Gerar sugestão de correção baseada no problema
         if problem_type == 'missing_entry':
-            return self._suggest_missing_entry_fix(timestamps, rules)
+            return self._suggest_missing_entry_fix(timestamps, rules, profile)
         elif problem_type == 'missing_exit':
-            return self._suggest_missing_exit_fix(timestamps, rules)
+            return self._suggest_missing_exit_fix(timestamps, rules, profile)
         elif problem_type == 'odd_timestamps':
             return self._suggest_odd_timestamps_fix(timestamps, rules)
         elif problem_type == 'sequence_error':
@@ -231,13 +545,15 @@ class PunctualityAnalyzer:
         
         return 'normal'
     
-    def _suggest_missing_entry_fix(self, timestamps: List[Tuple[str, str]], rules) -> Dict:
+    def _suggest_missing_entry_fix(self, timestamps: List[Tuple[str, str]], rules,
+                                   profile: Optional[Dict[str, Dict]] = None) -> Dict:
         """Sugere correção para entrada em falta."""
         # Assumir que a primeira picagem deveria ser uma saída
         first_time = timestamps[0][1]
         
         # Sugerir entrada baseada no horário padrão ou calculada
         suggested_entry = rules['hora_entrada_padrao']
+        confianca = 0.8
         
         # Se a primeira picagem for muito tarde, sugerir horário mais próximo
         first_time_obj = datetime.strptime(first_time, '%H:%M').time()
@@ -246,20 +562,37 @@ class PunctualityAnalyzer:
             suggested_minutes = (first_time_obj.hour - 2) * 60 + first_time_obj.minute
             suggested_entry = f"{suggested_minutes // 60:02d}:{suggested_minutes % 60:02d}"
         
+        # Entrada habitual do funcionário (histórico), se anterior à primeira picagem
+        usual = (profile or {}).get('E1')
+        first_minutes = first_time_obj.hour * 60 + first_time_obj.minute
+        if usual and usual['mediana'] < first_minutes:
+            suggested_entry = f"{int(usual['mediana']) // 60:02d}:{int(usual['mediana']) % 60:02d}"
+            confianca = usual['confianca']
+        
         return {
             'picagens_sugeridas': f'Adicionar E1: {suggested_entry}',
             'tipo_problema': 'Entrada em falta',
             'correcao_sugerida': f'Inserir picagem de entrada às {suggested_entry}',
-            'confianca_sugestao': 0.8,
+            'confianca_sugestao': confianca,
             'atraso_minutos': 0,
             'saida_antecipada_minutos': 0,
             'requer_verificacao_manual': True
         }
     
-    def _suggest_missing_exit_fix(self, timestamps: List[Tuple[str, str]], rules) -> Dict:
+    def _suggest_missing_exit_fix(self, timestamps: List[Tuple[str, str]], rules,
+                                  profile: Optional[Dict[str, Dict]] = None) -> Dict:
         """Sugere correção para saída em falta."""
         # Última picagem deveria ser uma entrada, falta a saída
         last_time = timestamps[-1][1]
+        last_time_obj = datetime.strptime(last_time, '%H:%M').time()
+        last_minutes = last_time_obj.hour * 60 + last_time_obj.minute
+        
+        def usual_exit(column):
+            # Saída habitual do funcionário (histórico), se posterior à última picagem
+            usual = (profile or {}).get(column)
+            if usual and usual['mediana'] > last_minutes:
+                return f"{int(usual['mediana']) // 60:02d}:{int(usual['mediana']) % 60:02d}", usual['confianca']
+            return None, None
         
         # Caso especial: 3 picagens E1-S1-E2 (falta S2)
         if (len(timestamps) == 3 and 
@@ -267,14 +600,16 @@ class PunctualityAnalyzer:
             timestamps[1][0] == 'S1' and 
             timestamps[2][0] == 'E2'):
             
-            # Sugerir S2 baseado na hora padrão de saída
-            suggested_exit = rules['hora_saida_padrao']
+            # Sugerir S2 baseado no histórico ou na hora padrão de saída
+            suggested_exit, confianca = usual_exit('S2')
+            if suggested_exit is None:
+                suggested_exit, confianca = rules['hora_saida_padrao'], 0.8
             
             return {
                 'picagens_sugeridas': f'Adicionar S2: {suggested_exit}',
                 'tipo_problema': 'Saída final em falta',
                 'correcao_sugerida': f'Padrão incompleto E1-S1-E2. Adicionar saída final (S2) às {suggested_exit}',
-                'confianca_sugestao': 0.8,
+                'confianca_sugestao': confianca,
                 'atraso_minutos': 0,
                 'saida_antecipada_minutos': 0,
                 'requer_verificacao_manual': True
@@ -284,7 +619,7 @@ class PunctualityAnalyzer:
         suggested_exit = rules['hora_saida_padrao']
         
         # Se a última entrada for muito tarde, ajustar a saída
-        last_time_obj = datetime.strptime(last_time, '%H:%M').time()
+        confianca = 0.7
         if last_time_obj.hour >= 14:  # Entrada tarde da tarde
             # Sugerir saída 3-4h depois
             suggested_minutes = (last_time_obj.hour + 4) * 60 + last_time_obj.minute
@@ -292,11 +627,15 @@ class PunctualityAnalyzer:
                 suggested_minutes = 17 * 60 + 30  # Default 17:30
             suggested_exit = f"{suggested_minutes // 60:02d}:{suggested_minutes % 60:02d}"
         
+        usual_time, usual_confidence = usual_exit(f'S{len(timestamps)//2 + 1}')
+        if usual_time is not None:
+            suggested_exit, confianca = usual_time, usual_confidence
+        
         return {
             'picagens_sugeridas': f'Adicionar S{len(timestamps)//2 + 1}: {suggested_exit}',
             'tipo_problema': 'Saída em falta',
             'correcao_sugerida': f'Inserir picagem de saída às {suggested_exit}',
-            'confianca_sugestao': 0.7,
+            'confianca_sugestao': confianca,
             'atraso_minutos': 0,
             'saida_antecipada_minutos': 0,
             'requer_verificacao_manual': True
@@ -519,7 +858,93 @@ class PunctualityAnalyzer:
             return 'Melhorando'
         else:
                          return 'Estável'
-    
+
+    def generate_population_patterns(self, df, window: int = 10) -> pd.DataFrame:
+        """
+        Gera a tabela de padrões de pontualidade de vários funcionários.
+
+        Versão agrupada de `generate_punctuality_patterns`: uma linha por
+        funcionário com atraso médio (do próprio e do departamento), atraso
+        médio por dia da semana, tendências móvel e exponencial, e sequências
+        de dias com atraso. Todas as métricas usam operações agrupadas sobre
+        os dados ordenados por (Numero, Data).
+
+        Args:
+            df: DataFrame com Numero, Data e atraso_minutos (Departamento opcional)
+            window: Número de dias das janelas móvel e exponencial
+
+        Returns:
+            DataFrame indexado por Numero
+        """
+        if df.empty or 'atraso_minutos' not in df.columns:
+            return pd.DataFrame()
+
+        columns = [col for col in ['Numero', 'Departamento', 'Data', 'atraso_minutos'] if col in df.columns]
+        data = df.loc[df['atraso_minutos'].notna(), columns].copy()
+        if data.empty:
+            return pd.DataFrame()
+        if 'Numero' not in data.columns:
+            data['Numero'] = ''
+        if 'Departamento' not in data.columns:
+            data['Departamento'] = ''
+        # Mesma chave de funcionário que as configurações ('138.0' e '138' são o mesmo)
+        codes, uniques = pd.factorize(data['Numero'])
+        data['Numero'] = np.array([employee_key(value) for value in uniques] + [''], dtype=object)[codes]
+        data['Departamento'] = data['Departamento'].astype(object).where(data['Departamento'].notna(), '').astype(str)
+        data['atraso_minutos'] = data['atraso_minutos'].astype(float)
+        if 'Data' in data.columns:
+            data['Data'] = pd.to_datetime(data['Data'], errors='coerce')
+            data = data.sort_values(['Numero', 'Data'], kind='stable', ignore_index=True)
+        else:
+            data = data.sort_values('Numero', kind='stable', ignore_index=True)
+
+        delays = data['atraso_minutos']
+        by_employee = delays.groupby(data['Numero'], sort=False)
+        late = delays > 0
+
+        summary = pd.DataFrame({
+            'Departamento': data.groupby('Numero', sort=False)['Departamento'].first(),
+            'dias': by_employee.size(),
+            'atraso_medio': by_employee.mean(),
+            'dias_com_atraso': late.groupby(data['Numero'], sort=False).sum(),
+            'maior_atraso': by_employee.max(),
+        })
+        summary['atraso_medio_departamento'] = summary['Departamento'].map(
+            delays.groupby(data['Departamento']).mean()
+        )
+
+        # Atraso médio por dia da semana (colunas atraso_segunda ... atraso_domingo)
+        if 'Data' in data.columns:
+            weekday = data['Data'].dt.weekday
+            by_weekday = delays.groupby([data['Numero'], weekday]).mean().unstack()
+            by_weekday = by_weekday.reindex(columns=range(7))
+            by_weekday.columns = [f'atraso_{name}' for name in self.WEEKDAY_NAMES]
+            summary = summary.join(by_weekday)
+
+        # Tendências: média móvel da última janela face à anterior e média
+        # exponencial no último dia face à média do funcionário
+        rolling = by_employee.rolling(window, min_periods=1).mean().reset_index(level=0, drop=True)
+        position_from_end = by_employee.cumcount(ascending=False)
+        last_window = rolling[position_from_end == 0].groupby(data['Numero']).first()
+        previous_window = rolling[position_from_end == window].groupby(data['Numero']).first()
+        summary['tendencia_movel'] = last_window - previous_window
+        ewm = by_employee.ewm(span=window).mean().reset_index(level=0, drop=True)
+        summary['tendencia_ewm'] = ewm[position_from_end == 0].groupby(data['Numero']).first() - summary['atraso_medio']
+        summary['tendencia_atraso'] = np.select(
+            [summary['dias'] < 5, summary['tendencia_ewm'] > 2, summary['tendencia_ewm'] < -2],
+            ['Dados insuficientes', 'Piorando', 'Melhorando'],
+            default='Estável'
+        )
+
+        # Sequências de dias consecutivos (registados) com atraso
+        new_run = late.ne(late.shift()) | data['Numero'].ne(data['Numero'].shift())
+        streak = late.groupby(new_run.cumsum()).cumsum().where(late, 0).astype(int)
+        summary['maior_sequencia_atrasos'] = streak.groupby(data['Numero'], sort=False).max()
+        summary['sequencia_atrasos_atual'] = streak[position_from_end == 0].groupby(data['Numero']).first()
+
+        summary.index.name = 'Numero'
+        return summary
+
     def _convert_smart_analysis_result(self, smart_analysis: Dict, timestamps: List[Tuple[str, str]], rules: Dict) -> Dict:
         """Converte resultado da análise inteligente para formato esperado."""
         tipo_analise = smart_analysis.get('tipo_analise', '')
@@ -6,6 +6,7 @@ import xlsxwriter
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils.dataframe import dataframe_to_rows
+from .rules_engine import RulesEngine
 
 class ReportGenerator:
     def __init__(self):
@@ -15,6 +16,9 @@ class ReportGenerator:
         """Gera relatório completo em Excel"""
         buffer = io.BytesIO()
         
+        # Texto dos alertas e correções (guardados em bits) só na exportação
+        df = RulesEngine.shared().render_rule_texts(df, sector)
+        
         with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
             # Aba 1: Dados processados
             df.to_excel(writer, sheet_name='Dados', index=False)
@@ -117,9 +121,9 @@ class ReportGenerator:
             for col_num, value in enumerate(worksheet.table.columns):
                 worksheet.write(0, col_num, value, header_format)
     
-    def generate_csv_report(self, df):
+    def generate_csv_report(self, df, sector="default"):
         """Gera relatório em CSV"""
-        return df.to_csv(index=False)
+        return RulesEngine.shared().render_rule_texts(df, sector).to_csv(index=False)
     
     def generate_summary_report(self, df, sector, rules_analysis=None):
         """Gera relatório resumido"""
@@ -0,0 +1,480 @@
+import re
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Linguagem de regras declarativas guardadas em rules/*.json, ex.:
+#   {"id": "almoco_longo", "condicao": "almoco_minutos > alerta_almoco_longo",
+#    "mensagem": "Almoço muito longo ({almoco_minutos:.0f}min)"}
+#
+# Uma condição combina comparações (> >= < <= == !=) entre números,
+# variáveis e aritmética (+ - * /) com 'e', 'ou' e 'nao' (ou and/or/not)
+# e parênteses. Cada condição é analisada uma única vez e compilada numa
+# função sobre colunas (arrays numpy) em vez de ser avaliada linha a linha.
+
+_TOKEN_PATTERN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([A-Za-z_][A-Za-z0-9_]*)|(>=|<=|==|!=|>|<|[-+*/()]))")
+
+_LOGICAL_WORDS = {'e': 'and', 'and': 'and', 'ou': 'or', 'or': 'or', 'nao': 'not', 'não': 'not', 'not': 'not'}
+
+_COMPARISONS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less,
+    '<=': np.less_equal, '==': np.equal, '!=': np.not_equal,
+}
+
+_ARITHMETIC = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+
+# Número de regras de uma família guardadas numa coluna de bits (uint64)
+RULE_BITS_MAX = 64
+
+# Bit de cada id de regra nas colunas de bits de cada família (ex.:
+# 'regras_intervalos'). Os bits só são acrescentados, por isso os valores já
+# guardados num DataFrame mantêm o significado quando as regras mudam.
+_RULE_BITS: Dict[str, Dict[str, int]] = {}
+
+
+class RuleSyntaxError(ValueError):
+    """Erro de sintaxe numa condição de regra."""
+
+
+class RuleContext:
+    """
+    Variáveis disponíveis para as condições, calculadas só quando usadas.
+
+    Cada variável é fornecida por uma função que devolve um array com uma
+    posição por linha; o resultado é guardado. `subset` cria um contexto
+    restrito a algumas linhas, usado para não avaliar o resto de uma
+    conjunção nas linhas que já falharam.
+    """
+
+    def __init__(self, providers: Dict[str, Callable[[], np.ndarray]], n_rows: int):
+        self._providers = providers
+        self._values = {}
+        self.n_rows = n_rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._values or name in self._providers
+
+    def get(self, name: str) -> np.ndarray:
+        """Valores de uma variável (float) nas linhas do contexto."""
+        if name not in self._values:
+            if name not in self._providers:
+                raise KeyError(name)
+            values = np.asarray(self._providers[name](), dtype=float)
+            self._values[name] = np.broadcast_to(values, (self.n_rows,)) if values.ndim == 0 else values
+        return self._values[name]
+
+    def subset(self, rows: np.ndarray) -> 'RuleContext':
+        """Contexto com apenas as linhas indicadas (posições)."""
+        parent = self
+        providers = {name: (lambda name=name: parent.get(name)[rows]) for name in self._providers}
+        context = RuleContext(providers, len(rows))
+        for name, values in self._values.items():
+            context._values[name] = values[rows]
+        return context
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """Divide uma condição em tokens (tipo, valor)."""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise RuleSyntaxError(f"Carácter inesperado na posição {position}: {text[position:]!r}")
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(('numero', number))
+        elif name is not None:
+            word = _LOGICAL_WORDS.get(name.lower())
+            tokens.append(('logico', word) if word else ('nome', name))
+        else:
+            tokens.append(('simbolo', symbol))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Analisador descendente recursivo que produz uma árvore de tuplos."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise RuleSyntaxError("Condição vazia")
+        node = self._or()
+        if self.position < len(self.tokens):
+            raise RuleSyntaxError(f"Token inesperado: {self.tokens[self.position][1]!r}")
+        return node
+
+    def _peek(self, kind: str, value: Optional[str] = None) -> bool:
+        if self.position >= len(self.tokens):
+            return False
+        token_kind, token_value = self.tokens[self.position]
+        return token_kind == kind and (value is None or token_value == value)
+
+    def _next(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise RuleSyntaxError("Condição incompleta")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _or(self):
+        operands = [self._and()]
+        while self._peek('logico', 'or'):
+            self._next()
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else ('or', operands)
+
+    def _and(self):
+        operands = [self._not()]
+        while self._peek('logico', 'and'):
+            self._next()
+            operands.append(self._not())
+        return operands[0] if len(operands) == 1 else ('and', operands)
+
+    def _not(self):
+        if self._peek('logico', 'not'):
+            self._next()
+            return ('not', self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        left = self._sum()
+        if self.position < len(self.tokens) and self.tokens[self.position][1] in _COMPARISONS:
+            operator = self._next()[1]
+            return ('cmp', operator, left, self._sum())
+        return left
+
+    def _sum(self):
+        node = self._product()
+        while self._peek('simbolo', '+') or self._peek('simbolo', '-'):
+            node = ('arit', self._next()[1], node, self._product())
+        return node
+
+    def _product(self):
+        node = self._factor()
+        while self._peek('simbolo', '*') or self._peek('simbolo', '/'):
+            node = ('arit', self._next()[1], node, self._factor())
+        return node
+
+    def _factor(self):
+        kind, value = self._next()
+        if kind == 'numero':
+            return ('num', float(value))
+        if kind == 'nome':
+            return ('var', value)
+        if kind == 'simbolo' and value == '-':
+            return ('arit', '-', ('num', 0.0), self._factor())
+        if kind == 'simbolo' and value == '(':
+            node = self._or()
+            if not self._peek('simbolo', ')'):
+                raise RuleSyntaxError("Parêntese não fechado")
+            self._next()
+            return node
+        raise RuleSyntaxError(f"Token inesperado: {value!r}")
+
+
+def _cost(node) -> int:
+    """Custo estimado de avaliar um nó (variáveis pesam mais do que constantes)."""
+    kind = node[0]
+    if kind == 'num':
+        return 0
+    if kind == 'var':
+        return 2
+    if kind in ('and', 'or'):
+        return sum(_cost(operand) for operand in node[1]) + 1
+    if kind == 'not':
+        return _cost(node[1]) + 1
+    return _cost(node[2]) + _cost(node[3]) + 1
+
+
+def _variables(node) -> List[str]:
+    """Variáveis usadas por um nó."""
+    kind = node[0]
+    if kind == 'var':
+        return [node[1]]
+    if kind == 'num':
+        return []
+    if kind in ('and', 'or'):
+        return [name for operand in node[1] for name in _variables(operand)]
+    if kind == 'not':
+        return _variables(node[1])
+    return _variables(node[2]) + _variables(node[3])
+
+
+def _compile(node) -> Callable[[RuleContext], np.ndarray]:
+    """Compila um nó numa função contexto -> array (booleano nas condições)."""
+    kind = node[0]
+    if kind == 'num':
+        value = node[1]
+        return lambda context: np.full(context.n_rows, value)
+    if kind == 'var':
+        name = node[1]
+        return lambda context: context.get(name)
+    if kind == 'arit':
+        operator, left, right = _ARITHMETIC[node[1]], _compile(node[2]), _compile(node[3])
+
+        def arithmetic(context):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return operator(left(context), right(context))
+        return arithmetic
+    if kind == 'cmp':
+        operator, left, right = _COMPARISONS[node[1]], _compile(node[2]), _compile(node[3])
+
+        def comparison(context):
+            with np.errstate(invalid='ignore'):
+                # Comparações com valores em falta (NaN) são falsas
+                return operator(left(context), right(context))
+        return comparison
+    if kind == 'not':
+        operand = _compile(node[1])
+        return lambda context: ~_as_bool(operand(context))
+
+    # 'e'/'ou': operandos mais baratos primeiro; os seguintes só são
+    # avaliados nas linhas ainda por decidir (curto-circuito vectorizado)
+    operands = [_compile(operand) for operand in sorted(node[1], key=_cost)]
+    is_and = kind == 'and'
+
+    def logical(context):
+        result = _as_bool(operands[0](context)).copy()
+        for operand in operands[1:]:
+            pending = np.flatnonzero(result if is_and else ~result)
+            if len(pending) == 0:
+                break
+            partial = _as_bool(operand(context if len(pending) == context.n_rows else context.subset(pending)))
+            result[pending] = partial
+        return result
+    return logical
+
+
+def _as_bool(values: np.ndarray) -> np.ndarray:
+    """Converte o resultado de um nó em booleano (NaN é falso)."""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    with np.errstate(invalid='ignore'):
+        return np.nan_to_num(values, nan=0.0) != 0
+
+
+class CompiledRule:
+    """Regra compilada: identificador, condição vectorizada, custo e mensagem."""
+
+    def __init__(self, rule_id: str, condition: str, message: str = '', description: str = ''):
+        tree = _Parser(condition).parse()
+        self.id = rule_id
+        self.condition = condition
+        self.message = message or description or rule_id
+        self.description = description or rule_id
+        self.cost = _cost(tree)
+        self.variables = sorted(set(_variables(tree)))
+        self._evaluate = _compile(tree)
+
+    def evaluate(self, context: RuleContext) -> np.ndarray:
+        """Máscara booleana das linhas onde a regra dispara."""
+        if context.n_rows == 0:
+            return np.zeros(0, dtype=bool)
+        return _as_bool(self._evaluate(context))
+
+
+@lru_cache(maxsize=512)
+def _compile_cached(rule_id: str, condition: str, message: str, description: str) -> CompiledRule:
+    return CompiledRule(rule_id, condition, message, description)
+
+
+def compile_rule(definition: Dict) -> CompiledRule:
+    """Compila a definição de uma regra (cada condição é analisada uma só vez)."""
+    return _compile_cached(
+        str(definition['id']), str(definition['condicao']),
+        str(definition.get('mensagem', '')), str(definition.get('descricao', ''))
+    )
+
+
+def validate_rule_definitions(definitions) -> List[str]:
+    """Valida uma lista de definições de regras; devolve os erros encontrados."""
+    if not isinstance(definitions, list):
+        return ['regras: esperada uma lista de regras']
+    errors = []
+    for position, definition in enumerate(definitions):
+        if not isinstance(definition, dict) or not isinstance(definition.get('id'), str) \
+                or not isinstance(definition.get('condicao'), str):
+            errors.append(f"regras[{position}]: esperados 'id' e 'condicao' em texto")
+            continue
+        try:
+            compile_rule(definition)
+        except RuleSyntaxError as e:
+            errors.append(f"regras[{position}] ({definition['id']}): {e}")
+    return errors
+
+
+def merge_rule_definitions(*lists) -> List[Dict]:
+    """Junta listas de regras por 'id' (as listas seguintes substituem as anteriores)."""
+    merged = {}
+    for definitions in lists:
+        for definition in definitions or []:
+            merged[definition['id']] = definition
+    return list(merged.values())
+
+
+class RuleResults:
+    """
+    Resultado compacto da avaliação de regras.
+
+    Cada linha guarda um conjunto de bits com as regras que dispararam
+    (bit i = i-ésima regra, em palavras de 64 bits) e, só para as linhas
+    com algum alerta, os valores das variáveis usadas nas mensagens. O
+    texto é produzido por `render` apenas para as linhas mostradas ou
+    exportadas; filtrar por regra é uma operação de máscara de bits.
+    """
+
+    def __init__(self, index, rule_ids: List[str], messages: Dict[str, str]):
+        self.index = index
+        self.rule_ids = list(rule_ids)
+        self.messages = dict(messages)
+        self._bit = {rule_id: position for position, rule_id in enumerate(self.rule_ids)}
+        self.bits = np.zeros((len(index), max(1, (len(self.rule_ids) + 63) // 64)), dtype=np.uint64)
+        self.param_names = sorted({name for message in self.messages.values() for name in _template_fields(message)})
+        self._param_rows = np.zeros(0, dtype=np.int64)
+        self._params = np.zeros((0, len(self.param_names)), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def set(self, rule_id: str, mask: np.ndarray):
+        """Marca as linhas (máscara booleana) em que uma regra disparou."""
+        word, bit = divmod(self._bit[rule_id], 64)
+        self.bits[:, word] |= np.asarray(mask, dtype=np.uint64) << np.uint64(bit)
+
+    def capture_params(self, context: RuleContext):
+        """Guarda as variáveis das mensagens para as linhas com algum alerta."""
+        rows = np.flatnonzero(self.bits.any(axis=1))
+        self._param_rows = rows
+        self._params = np.zeros((len(rows), len(self.param_names)), dtype=np.float32)
+        for column, name in enumerate(self.param_names):
+            if name in context and len(rows):
+                self._params[:, column] = context.get(name)[rows]
+            else:
+                self._params[:, column] = np.nan
+
+    def mask(self, rule_id: str) -> np.ndarray:
+        """Linhas em que a regra disparou."""
+        if rule_id not in self._bit:
+            return np.zeros(len(self), dtype=bool)
+        word, bit = divmod(self._bit[rule_id], 64)
+        return (self.bits[:, word] >> np.uint64(bit)) & np.uint64(1) == 1
+
+    def any_of(self, rule_ids) -> np.ndarray:
+        """Linhas em que pelo menos uma das regras disparou."""
+        selected = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for rule_id in rule_ids:
+            if rule_id in self._bit:
+                word, bit = divmod(self._bit[rule_id], 64)
+                selected[word] |= np.uint64(1) << np.uint64(bit)
+        return (self.bits & selected).any(axis=1)
+
+    def counts(self) -> Dict[str, int]:
+        """Número de linhas em que cada regra disparou."""
+        return {rule_id: int(self.mask(rule_id).sum()) for rule_id in self.rule_ids}
+
+    def to_column(self, family: str) -> np.ndarray:
+        """
+        Bits das regras disparadas numa palavra de 64 bits por linha.
+
+        Usa os bits fixos de `rule_bit`, para a coluna poder ser guardada no
+        DataFrame e lida mais tarde com `from_column`.
+        """
+        column = np.zeros(len(self), dtype=np.uint64)
+        for rule_id in self.rule_ids:
+            bit = rule_bit(family, rule_id)
+            if bit is not None:
+                column |= self.mask(rule_id).astype(np.uint64) << np.uint64(bit)
+        return column
+
+    @classmethod
+    def from_column(cls, column: pd.Series, family: str, rule_ids: List[str],
+                    messages: Dict[str, str]) -> 'RuleResults':
+        """Reconstrói os resultados de `to_column` (ex.: para mostrar o texto de algumas linhas)."""
+        results = cls(column.index, rule_ids, messages)
+        values = column.fillna(0).to_numpy(dtype=np.uint64)
+        for rule_id in rule_ids:
+            results.set(rule_id, rule_bits_mask(values, family, [rule_id]))
+        return results
+
+    def to_frame(self):
+        """DataFrame booleano com uma coluna por regra."""
+        return pd.DataFrame({rule_id: self.mask(rule_id) for rule_id in self.rule_ids}, index=self.index)
+
+    def render(self, rows=None, separator: str = '; ', messages: Optional[Dict[str, str]] = None,
+               order: Optional[List[str]] = None):
+        """
+        Texto dos alertas de algumas linhas.
+
+        Args:
+            rows: Rótulos do índice a mostrar (todas as linhas se None)
+            separator: Separador entre mensagens da mesma linha
+            messages: Modelos alternativos por id de regra (ex.: outra língua)
+            order: Ordem das mensagens (ids de regras; por omissão a das regras)
+
+        Returns:
+            Série de texto ('' sem alertas) indexada pelos rótulos pedidos
+        """
+        templates = {**self.messages, **(messages or {})}
+        labels = self.index if rows is None else pd.Index(rows)
+        positions = self.index.get_indexer(labels)
+        texts = []
+        for position in positions:
+            if position < 0 or not self.bits[position].any():
+                texts.append('')
+                continue
+            slot = np.searchsorted(self._param_rows, position)
+            values = dict(zip(self.param_names, self._params[slot].tolist())) if len(self._param_rows) else {}
+            parts = []
+            for rule_id in order or self.rule_ids:
+                word, bit = divmod(self._bit[rule_id], 64)
+                if (int(self.bits[position, word]) >> bit) & 1:
+                    parts.append(_format_message(templates.get(rule_id, rule_id), values))
+            texts.append(separator.join(parts))
+        return pd.Series(texts, index=labels, dtype=object)
+
+
+def rule_bit(family: str, rule_id: str) -> Optional[int]:
+    """Bit fixo de uma regra na coluna da família (None se a coluna estiver cheia)."""
+    bits = _RULE_BITS.setdefault(family, {})
+    if rule_id not in bits:
+        if len(bits) >= RULE_BITS_MAX:
+            print(f"Aviso: Regra '{rule_id}' não guardada em {family}: limite de {RULE_BITS_MAX} regras")
+            return None
+        bits[rule_id] = len(bits)
+    return bits[rule_id]
+
+
+def rule_bits_mask(column, family: str, rule_ids) -> np.ndarray:
+    """Linhas de uma coluna de bits em que pelo menos uma das regras disparou."""
+    selected = 0
+    for rule_id in rule_ids:
+        bit = _RULE_BITS.get(family, {}).get(rule_id)
+        if bit is not None:
+            selected |= 1 << bit
+    values = np.asarray(column, dtype=np.uint64)
+    return (values & np.uint64(selected)) != 0
+
+
+def _template_fields(message: str) -> List[str]:
+    """Variáveis referidas num modelo de mensagem ('{almoco_minutos:.0f}')."""
+    try:
+        return [field for _, field, _, _ in Formatter().parse(message) if field]
+    except ValueError:
+        return []
+
+
+def _format_message(template: str, values: Dict[str, float]) -> str:
+    """Formata uma mensagem; modelos inválidos ou variáveis em falta ficam por formatar."""
+    try:
+        return template.format(**values)
+    except (KeyError, ValueError, IndexError):
+        return template
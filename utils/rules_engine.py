@@ -1,8 +1,122 @@
+import copy
+import glob
 import json
+import os
+import threading
+import time
+import unicodedata
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Tuple
+from .config_manager import employee_keys
+from .interval_analyzer import IntervalAnalyzer
+from .rule_dsl import RuleContext, RuleResults, compile_rule, merge_rule_definitions, validate_rule_definitions
+from .time_utils import hhmm_to_minutes
+
+RULES_DIR = 'rules'
+
+# Esquema das regras: chave -> tipo esperado ('numero', 'hora' HH:MM, 'bool' ou 'texto')
+RULES_SCHEMA = {
+    'horas_diarias_objetivo': 'numero',
+    'tolerancia_atraso_minutos': 'numero',
+    'hora_entrada_padrao': 'hora',
+    'hora_saida_padrao': 'hora',
+    'intervalo_almoco_minimo': 'numero',
+    'max_horas_extras_dia': 'numero',
+    'min_intervalo_turnos': 'numero',
+    'dias_trabalho_semana': 'numero',
+    'max_dias_consecutivos': 'numero',
+    'max_horas_semana': 'numero',
+    'alerta_almoco_curto': 'numero',
+    'alerta_almoco_longo': 'numero',
+    'alerta_pausa_longa': 'numero',
+    'turnos_rotativos': 'bool',
+    'horario_flexivel': 'bool',
+    'trabalho_fins_semana': 'bool',
+    'turnos_especiais': 'bool',
+    'setor': 'texto',
+    'observacoes': 'texto',
+    'regras': 'regras',
+}
+
+# Regras obrigatórias num ficheiro importado
+REQUIRED_RULES = ['horas_diarias_objetivo', 'tolerancia_atraso_minutos']
+
+
+def validate_rules(rules, required=None) -> List[str]:
+    """
+    Valida um dicionário de regras contra RULES_SCHEMA.
+    
+    Chaves desconhecidas são aceites (extensões); devolve a lista de erros
+    encontrados, vazia se as regras forem válidas.
+    """
+    if not isinstance(rules, dict):
+        return ['As regras devem ser um objeto JSON']
+    
+    errors = [f"Regra obrigatória em falta: {key}" for key in (required or []) if key not in rules]
+    for key, value in rules.items():
+        expected = RULES_SCHEMA.get(key)
+        if expected == 'numero':
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                errors.append(f"{key}: esperado número não negativo, obtido {value!r}")
+        elif expected == 'hora':
+            if not isinstance(value, str) or pd.isna(hhmm_to_minutes(pd.Series([value])).iloc[0]):
+                errors.append(f"{key}: esperada hora HH:MM, obtido {value!r}")
+        elif expected == 'bool':
+            if not isinstance(value, bool):
+                errors.append(f"{key}: esperado verdadeiro/falso, obtido {value!r}")
+        elif expected == 'texto':
+            if not isinstance(value, str):
+                errors.append(f"{key}: esperado texto, obtido {value!r}")
+        elif expected == 'regras':
+            errors.extend(validate_rule_definitions(value))
+    return errors
+
+
+def _normalize_name(name) -> str:
+    """Nome sem acentos e em minúsculas (ex.: 'Produção' -> 'producao')."""
+    text = unicodedata.normalize('NFKD', str(name))
+    return ''.join(char for char in text if not unicodedata.combining(char)).strip().lower()
+
 
 class RulesEngine:
+    # Score mínimo de cada status de conformidade (do melhor para o pior)
+    STATUS_CONFORMIDADE = [(90, "Excelente"), (75, "Bom"), (60, "Regular")]
+    STATUS_CONFORMIDADE_MINIMO = "Necessita Melhoria"
+    
+    # Colunas da tabela de conformidade por funcionário e período
+    COMPLIANCE_TABLE_COLUMNS = [
+        'Numero', 'periodo', 'Departamento', 'total_dias_trabalho', 'dias_conformes',
+        'percentual_conformidade', 'media_horas_diarias', 'deficit_total_horas', 'dias_com_deficit',
+        'total_dias_analisados', 'dias_com_atraso', 'percentual_pontualidade', 'atraso_medio_minutos',
+        'maior_atraso_minutos', 'dias_com_horas_extras', 'total_horas_extras', 'dias_excesso_limite',
+        'total_horas_trabalhadas', 'total_horas_esperadas', 'diferenca_horas', 'score_conformidade',
+        'status_geral'
+    ]
+    
+    # Regras que podem variar numa simulação (coluna correspondente em `compliance_thresholds`)
+    SWEEP_PARAMETERS = [
+        'horas_diarias_objetivo', 'tolerancia_atraso_minutos', 'max_horas_extras_dia', 'alerta_almoco_longo'
+    ]
+    
+    # Duração máxima plausível de um turno que atravessa a meia-noite (horas)
+    MAX_DURACAO_TURNO_HORAS = 16
+    
+    # Intervalo mínimo (segundos) entre verificações de alterações em rules/*.json
+    RULES_CHECK_INTERVAL = 2.0
+    
+    # Ficheiros de regras já lidos, partilhados entre instâncias: caminho -> ((mtime, tamanho), regras)
+    _file_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+    
+    # Motor partilhado entre sessões (ver `shared`)
+    _shared = None
+    
+    # Protege o motor partilhado, a cache de ficheiros e a troca das regras entre threads (sessões)
+    _lock = threading.RLock()
+    
     def __init__(self):
         self.default_rules = {
             "horas_diarias_objetivo": 8.0,
@@ -12,7 +126,9 @@ class RulesEngine:
             "intervalo_almoco_minimo": 30,
             "max_horas_extras_dia": 2.0,
             "min_intervalo_turnos": 11,  # horas
-            "dias_trabalho_semana": 5
+            "dias_trabalho_semana": 5,
+            "max_dias_consecutivos": 6,  # limite legal de dias de trabalho seguidos
+            "max_horas_semana": 48  # horas em qualquer período de 7 dias
         }
         
         self.sector_rules = {
@@ -61,146 +177,684 @@ class RulesEngine:
                 "turnos_especiais": True
             }
         }
+        
+        # Regras embutidas, base sobre a qual se aplicam os ficheiros de rules/
+        self._builtin_rules = (copy.deepcopy(self.default_rules), copy.deepcopy(self.sector_rules))
+        self._imported_rules = {}
+        self._files_key = None
+        self._last_check = 0.0
+        self._merged_cache = {}
+        # Incrementa sempre que as regras efetivas mudam (invalida caches dependentes, ex.: KPIs)
+        self.rules_version = 0
+        self.reload_rules(force=True)
+    
+    @classmethod
+    def shared(cls):
+        """Motor único partilhado entre sessões (as regras são recarregadas quando os ficheiros mudam)."""
+        if cls._shared is None:
+            with cls._lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+    
+    def reload_rules(self, force=False) -> bool:
+        """
+        Recarrega rules/*.json se algum ficheiro mudou.
+        
+        Os mtimes só são verificados uma vez por RULES_CHECK_INTERVAL; cada
+        ficheiro só é relido quando o seu (mtime, tamanho) muda. `default.json`
+        atualiza as regras padrão e os restantes ficheiros as do setor
+        (chave 'setor', ou o nome do ficheiro comparado sem acentos).
+        
+        Returns:
+            True se as regras foram reconstruídas
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.RULES_CHECK_INTERVAL:
+                return False
+            self._last_check = now
+            
+            files = self._read_rule_files()
+            files_key = tuple((path, file_key) for path, (file_key, _) in files)
+            if not force and files_key == self._files_key:
+                return False
+            
+            default_rules, sector_rules = copy.deepcopy(self._builtin_rules)
+            sector_names = {_normalize_name(name): name for name in sector_rules}
+            for path, (_, rules) in files:
+                rules = copy.deepcopy(rules)
+                stem = os.path.splitext(os.path.basename(path))[0]
+                if _normalize_name(stem) == 'default':
+                    default_rules.update(rules)
+                    continue
+                name = rules.get('setor') or sector_names.get(_normalize_name(stem), stem)
+                sector_rules.setdefault(name, {}).update(rules)
+            sector_rules.update(copy.deepcopy(self._imported_rules))
+            
+            self.default_rules = default_rules
+            self.sector_rules = sector_rules
+            self._files_key = files_key
+            self._merged_cache = {}
+            self.rules_version += 1
+            return True
+    
+    def _read_rule_files(self) -> List[Tuple[str, Tuple[Tuple[int, int], Dict]]]:
+        """Lê (com cache por mtime/tamanho) e valida os ficheiros JSON de rules/; ignora os inválidos."""
+        files = []
+        for path in sorted(glob.glob(os.path.join(RULES_DIR, '*.json'))):
+            try:
+                stat = os.stat(path)
+                file_key = (stat.st_mtime_ns, stat.st_size)
+                cached = RulesEngine._file_cache.get(path)
+                if cached is None or cached[0] != file_key:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        rules = json.load(f)
+                    errors = validate_rules(rules)
+                    if errors:
+                        # Guardar também os inválidos para não repetir o aviso até o ficheiro mudar
+                        print(f"Aviso: Regras inválidas em {path} ignoradas: {'; '.join(errors)}")
+                        rules = None
+                    cached = (file_key, rules)
+                    RulesEngine._file_cache[path] = cached
+                if cached[1] is not None:
+                    files.append((path, cached))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Aviso: Erro ao ler regras de {path}: {e}")
+        return files
     
     def get_rules(self, sector="default"):
-        """Obtém as regras para um setor específico"""
-        if sector in self.sector_rules:
-            # Combinar regras padrão com específicas do setor
-            rules = self.default_rules.copy()
-            rules.update(self.sector_rules[sector])
-            return rules
-        return self.default_rules
-    
-    def analyze_compliance(self, df, sector="default"):
-        """Analisa conformidade com as regras"""
-        rules = self.get_rules(sector)
+        """Obtém as regras para um setor específico (cópia: alterá-la não afeta o motor)"""
+        with self._lock:
+            self.reload_rules()
+            rules = self._merged_cache.get(sector)
+            if rules is None:
+                # Combinar regras padrão com específicas do setor
+                rules = self.default_rules.copy()
+                if sector in self.sector_rules:
+                    rules.update(self.sector_rules[sector])
+                    # Regras declarativas do setor acrescentam (ou substituem por id) as padrão
+                    if 'regras' in self.default_rules or 'regras' in self.sector_rules[sector]:
+                        rules['regras'] = merge_rule_definitions(
+                            self.default_rules.get('regras'), self.sector_rules[sector].get('regras')
+                        )
+                self._merged_cache[sector] = rules
+        
+        # As regras em cache nunca são alteradas; copiar também a lista de regras declarativas
+        rules = rules.copy()
+        if 'regras' in rules:
+            rules['regras'] = copy.deepcopy(rules['regras'])
+        return rules
+    
+    def analyze_compliance(self, df, sector="default", sector_column=None):
+        """
+        Analisa conformidade com as regras.
+        
+        Todas as análises são calculadas numa única passagem sobre colunas
+        por linha (horas, minutos de entrada e limites). Com `sector_column`
+        (ex.: 'Departamento') cada linha usa os limites do seu próprio setor.
+        """
         analysis = {}
         
         if df.empty:
             return analysis
         
         # Filtrar apenas dias de trabalho
-        work_days = df[df['dia_trabalho'] == True].copy()
+        work_days = df[df['dia_trabalho'] == True]
         
         if work_days.empty:
             return analysis
         
+        if sector_column and sector_column in work_days.columns:
+            sectors = work_days[sector_column]
+        else:
+            sectors = pd.Series(sector, index=work_days.index)
+        thresholds = self.compliance_thresholds(sectors)
+        metrics = self._compliance_metrics(work_days, thresholds)
+        
         # 1. Análise de horas diárias
-        analysis['horas_diarias'] = self._analyze_daily_hours(work_days, rules)
+        analysis['horas_diarias'] = self._analyze_daily_hours(metrics)
         
         # 2. Análise de pontualidade
-        analysis['pontualidade'] = self._analyze_punctuality(work_days, rules)
+        analysis['pontualidade'] = self._analyze_punctuality(metrics, thresholds)
         
         # 3. Análise de intervalos
-        analysis['intervalos'] = self._analyze_breaks(work_days, rules)
+        analysis['intervalos'] = self._analyze_breaks(thresholds)
         
         # 4. Análise de horas extras
-        analysis['horas_extras'] = self._analyze_overtime(work_days, rules)
+        analysis['horas_extras'] = self._analyze_overtime(metrics, thresholds)
+        
+        # 5. Descanso entre turnos, horas semanais e dias consecutivos
+        analysis['descanso'] = self._analyze_rest(self.analyze_working_time(work_days, thresholds=thresholds), thresholds)
+        
+        # 6. Regras declarativas (rules/*.json)
+        analysis['alertas_regras'] = self._analyze_rule_alerts(self.evaluate_rules(work_days, thresholds=thresholds), thresholds)
         
-        # 5. Resumo geral
-        analysis['resumo'] = self._generate_summary(work_days, rules, analysis)
+        # 7. Resumo geral
+        analysis['resumo'] = self._generate_summary(metrics, analysis)
         
         return analysis
     
-    def _analyze_daily_hours(self, df, rules):
-        """Analisa cumprimento de horas diárias"""
-        target_hours = rules['horas_diarias_objetivo']
+    def analyze_compliance_by_employee(self, df, sector_column="Departamento", period="M",
+                                       sector="default", n_jobs=1):
+        """
+        Conformidade de todos os funcionários numa única passagem agrupada.
+        
+        Args:
+            df: DataFrame com Numero, Data e as colunas de `analyze_compliance`
+            sector_column: Coluna com o setor de cada linha (usa `sector` se não existir)
+            period: Frequência do período ('M' mensal, 'W' semanal...) ou None para o total
+            sector: Setor usado quando não há `sector_column`
+            n_jobs: Número de processos; acima de 1 divide os funcionários em partições
+            
+        Returns:
+            DataFrame com uma linha por (Numero, periodo) e as métricas do resumo
+        """
+        if df.empty or 'Numero' not in df.columns:
+            return pd.DataFrame(columns=self.COMPLIANCE_TABLE_COLUMNS)
+        
+        if n_jobs and n_jobs > 1:
+            shard = pd.Series(pd.factorize(employee_keys(df['Numero']))[0] % n_jobs, index=df.index)
+            shards = [df[shard == i] for i in range(n_jobs) if (shard == i).any()]
+            try:
+                with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                    tables = list(executor.map(
+                        self._compliance_table, shards,
+                        [sector_column] * len(shards), [period] * len(shards), [sector] * len(shards)
+                    ))
+                return pd.concat(tables).sort_values(['Numero', 'periodo'], ignore_index=True)
+            except Exception as e:
+                print(f"Aviso: Análise paralela indisponível, a usar processo único: {e}")
+        
+        return self._compliance_table(df, sector_column, period, sector)
+    
+    def _compliance_table(self, df, sector_column, period, sector):
+        """Agrega as métricas por linha de `_compliance_metrics` por funcionário e período."""
+        work_days = df[df['dia_trabalho'] == True]
+        if work_days.empty:
+            return pd.DataFrame(columns=self.COMPLIANCE_TABLE_COLUMNS)
         
-        # Calcular estatísticas
-        total_days = len(df)
-        compliant_days = len(df[df['horas_efetivas_num'] >= target_hours])
-        avg_hours = df['horas_efetivas_num'].mean()
+        if sector_column and sector_column in work_days.columns:
+            sectors = work_days[sector_column].astype(object)
+        else:
+            sectors = pd.Series(sector, index=work_days.index, dtype=object)
+        metrics = self._compliance_metrics(work_days, self.compliance_thresholds(sectors))
+        metrics['Numero'] = employee_keys(work_days['Numero'])
+        metrics['Departamento'] = sectors
+        if period and 'Data' in work_days.columns:
+            metrics['periodo'] = pd.to_datetime(work_days['Data'], errors='coerce').dt.to_period(period).astype(str)
+        else:
+            metrics['periodo'] = 'Total'
+        
+        table = metrics.groupby(['Numero', 'periodo'], sort=True).agg(
+            Departamento=('Departamento', 'first'),
+            total_dias_trabalho=('horas', 'size'),
+            dias_conformes=('conforme', 'sum'),
+            media_horas_diarias=('horas', 'mean'),
+            deficit_total_horas=('defice', 'sum'),
+            dias_com_deficit=('defice', 'count'),
+            total_dias_analisados=('atraso', 'count'),
+            dias_com_atraso=('atrasado', 'sum'),
+            atraso_medio_minutos=('atraso', 'mean'),
+            maior_atraso_minutos=('atraso', 'max'),
+            dias_com_horas_extras=('horas_extras', 'count'),
+            total_horas_extras=('horas_extras', 'sum'),
+            dias_excesso_limite=('excesso_extras', 'sum'),
+            total_horas_trabalhadas=('horas', 'sum'),
+            total_horas_esperadas=('objetivo', 'sum'),
+        ).reset_index()
+        
+        table['percentual_conformidade'] = table['dias_conformes'] / table['total_dias_trabalho'] * 100
+        analyzed = table['total_dias_analisados']
+        table['percentual_pontualidade'] = np.where(
+            analyzed > 0, (analyzed - table['dias_com_atraso']) / analyzed.where(analyzed > 0, 1) * 100, 100.0
+        )
+        table[['atraso_medio_minutos', 'maior_atraso_minutos']] = table[['atraso_medio_minutos', 'maior_atraso_minutos']].fillna(0)
+        table['diferenca_horas'] = table['total_horas_trabalhadas'] - table['total_horas_esperadas']
+        table['score_conformidade'] = (table['percentual_pontualidade'] + table['percentual_conformidade']) / 2
+        table['status_geral'] = np.select(
+            [table['score_conformidade'] >= minimum for minimum, _ in self.STATUS_CONFORMIDADE],
+            [label for _, label in self.STATUS_CONFORMIDADE],
+            default=self.STATUS_CONFORMIDADE_MINIMO
+        )
+        return table[self.COMPLIANCE_TABLE_COLUMNS]
+    
+    def sweep_compliance(self, df, grid, sector="default", sector_column=None):
+        """
+        Simulação "e se": conformidade para cada combinação de valores de regras.
+        
+        As métricas por linha (horas, atraso e duração do almoço) são calculadas
+        uma vez; cada regra da grelha passa a ser um vector de cenários e as
+        comparações são feitas por broadcasting numa matriz linhas x cenários.
+        Regras fora da grelha mantêm o valor configurado para o setor da linha.
+        
+        Args:
+            df: DataFrame com as colunas de `analyze_compliance`
+            grid: Dicionário regra -> lista de valores (ver SWEEP_PARAMETERS),
+                  ex.: {'tolerancia_atraso_minutos': [5, 10, 15]}
+            sector: Setor usado quando não há `sector_column`
+            sector_column: Coluna com o setor de cada linha (opcional)
+            
+        Returns:
+            DataFrame com uma linha por cenário (produto cartesiano da grelha)
+        """
+        grid = {key: list(values) for key, values in (grid or {}).items()}
+        for key in [key for key in grid if key not in self.SWEEP_PARAMETERS]:
+            print(f"Aviso: Regra '{key}' não suportada na simulação, ignorada")
+            grid.pop(key)
+        scenarios = pd.DataFrame(list(product(*grid.values())), columns=list(grid.keys()))
+        
+        work_days = df[df['dia_trabalho'] == True] if not df.empty else df
+        if work_days.empty:
+            return scenarios
         
-        # Identificar dias com déficit
-        deficit_days = df[df['horas_efetivas_num'] < target_hours]
-        total_deficit = (target_hours * len(deficit_days) - deficit_days['horas_efetivas_num'].sum())
+        if sector_column and sector_column in work_days.columns:
+            sectors = work_days[sector_column]
+        else:
+            sectors = pd.Series(sector, index=work_days.index)
+        thresholds = self.compliance_thresholds(sectors)
+        metrics = self._compliance_metrics(work_days, thresholds)
+        
+        def rule_matrix(key):
+            # (1, cenários) se a regra varia na grelha, (linhas, 1) com o valor do setor caso contrário
+            if key in grid:
+                return scenarios[key].to_numpy(dtype=float)[np.newaxis, :]
+            return thresholds[key].to_numpy(dtype=float)[:, np.newaxis]
+        
+        hours = metrics['horas'].to_numpy(dtype=float)[:, np.newaxis]
+        delay = metrics['atraso'].to_numpy(dtype=float)[:, np.newaxis]
+        # Almoço como na regra 'almoco_longo' (a pausa tratada como almoço, com pelo menos o mínimo curto)
+        lunch = IntervalAnalyzer().interval_providers(work_days)['almoco_minutos']()[:, np.newaxis]
+        lunch_short = thresholds['alerta_almoco_curto'].to_numpy(dtype=float)[:, np.newaxis]
+        
+        shape = (len(work_days), max(len(scenarios), 1))
+        
+        def count(mask):
+            return np.broadcast_to(mask, shape).sum(axis=0)
+        
+        n_rows = len(work_days)
+        target = np.broadcast_to(rule_matrix('horas_diarias_objetivo'), shape)
+        overtime = hours - target
+        analyzed = int(np.count_nonzero(~np.isnan(delay)))
+        
+        result = scenarios.copy() if len(scenarios) else pd.DataFrame(index=[0])
+        result['total_dias_trabalho'] = n_rows
+        result['dias_conformes'] = count(hours >= target)
+        result['percentual_conformidade'] = result['dias_conformes'] / n_rows * 100
+        result['deficit_total_horas'] = np.where(hours < target, target - hours, 0).sum(axis=0)
+        result['total_dias_analisados'] = analyzed
+        result['dias_com_atraso'] = count(delay > rule_matrix('tolerancia_atraso_minutos'))
+        result['percentual_pontualidade'] = (
+            (analyzed - result['dias_com_atraso']) / analyzed * 100 if analyzed else 100.0
+        )
+        result['dias_excesso_limite'] = count((overtime > 0) & (overtime > rule_matrix('max_horas_extras_dia')))
+        result['dias_almoco_longo'] = count((lunch >= lunch_short) & (lunch > rule_matrix('alerta_almoco_longo')))
+        result['total_horas_trabalhadas'] = float(hours.sum())
+        result['total_horas_esperadas'] = target.sum(axis=0)
+        result['diferenca_horas'] = result['total_horas_trabalhadas'] - result['total_horas_esperadas']
+        result['score_conformidade'] = (result['percentual_pontualidade'] + result['percentual_conformidade']) / 2
+        result['status_geral'] = np.select(
+            [result['score_conformidade'] >= minimum for minimum, _ in self.STATUS_CONFORMIDADE],
+            [label for _, label in self.STATUS_CONFORMIDADE],
+            default=self.STATUS_CONFORMIDADE_MINIMO
+        )
+        return result
+    
+    def analyze_working_time(self, df, sector="default", sector_column=None, thresholds=None):
+        """
+        Descanso entre turnos, horas em 7 dias e dias de trabalho consecutivos.
+        
+        Os dias de trabalho são ordenados uma única vez por (Numero, Data) e
+        todas as verificações são operações deslocadas/acumuladas sobre esses
+        arrays, sem ciclos por funcionário:
+        - descanso: da última saída do dia de trabalho anterior até à primeira
+          entrada do dia (uma saída anterior à entrada conta como dia seguinte,
+          até MAX_DURACAO_TURNO_HORAS de turno);
+        - horas_7_dias: soma das horas nos 7 dias de calendário que terminam no dia;
+        - dias_consecutivos: dias de calendário seguidos trabalhados até ao dia
+          (comparados com max_dias_consecutivos, não com o horário semanal).
+        
+        Linhas sem data válida ficam fora da ordenação e com resultado vazio,
+        tal como dias de folga no calendário do setor (fins de semana e
+        feriados) em que não houve horas trabalhadas.
+        
+        Returns:
+            DataFrame (mesmo índice dos dias de trabalho) com descanso_horas,
+            descanso_insuficiente, horas_7_dias, excesso_horas_semana,
+            dias_consecutivos e excesso_dias_consecutivos
+        """
+        columns = ['descanso_horas', 'descanso_insuficiente', 'horas_7_dias', 'excesso_horas_semana',
+                   'dias_consecutivos', 'excesso_dias_consecutivos']
+        work_days = df[df['dia_trabalho'] == True] if not df.empty else df
+        if work_days.empty or 'Data' not in work_days.columns:
+            return pd.DataFrame(columns=columns, index=work_days.index)
+        
+        if thresholds is None:
+            if sector_column and sector_column in work_days.columns:
+                sectors = work_days[sector_column]
+            else:
+                sectors = pd.Series(sector, index=work_days.index)
+            thresholds = self.compliance_thresholds(sectors)
+        
+        # Sem data não há dia nem vizinhos: excluir antes de ordenar (NaT quebraria as chaves).
+        # Folgas e feriados do calendário sem horas também não são dias trabalhados.
+        from .config_manager import ConfigManager
+        all_days = work_days.index
+        dates = pd.to_datetime(work_days['Data'], errors='coerce')
+        calendar_work_day, _ = ConfigManager().work_day_masks(dates, thresholds['sector'])
+        worked = calendar_work_day | (work_days['horas_efetivas_num'].astype(float).fillna(0) > 0).to_numpy()
+        keep = dates.notna().to_numpy() & worked
+        if not keep.all():
+            work_days, dates, thresholds = work_days[keep], dates[keep], thresholds[keep]
+            if work_days.empty:
+                return pd.DataFrame(columns=columns, index=all_days)
+        
+        if 'Numero' in work_days.columns:
+            employee = pd.factorize(employee_keys(work_days['Numero']))[0]
+        else:
+            employee = np.zeros(len(work_days), dtype=int)
+        day = dates.to_numpy().astype('datetime64[D]').astype('int64')
+        order = np.lexsort((day, employee))
+        
+        emp = employee[order]
+        day = day[order]
+        hours = work_days['horas_efetivas_num'].astype(float).fillna(0).to_numpy()[order]
+        entry, exit_ = [
+            hhmm_to_minutes(work_days[column]).to_numpy(dtype=float)[order]
+            if column in work_days.columns else np.full(len(order), np.nan)
+            for column in ('primeiro_e1', 'ultimo_s')
+        ]
+        limits = thresholds.iloc[order]
+        
+        same_employee = np.r_[False, emp[1:] == emp[:-1]]
+        
+        # Descanso: instante absoluto (minutos) da saída do dia anterior vs entrada do dia.
+        # Uma saída anterior à entrada só é turno noturno se a duração for plausível;
+        # caso contrário a picagem é inconsistente e o descanso fica por determinar.
+        crosses_midnight = exit_ < entry
+        overnight_span = exit_ + 1440 - entry
+        exit_ = np.where(crosses_midnight & (overnight_span > self.MAX_DURACAO_TURNO_HORAS * 60), np.nan, exit_)
+        exit_abs = day * 1440 + exit_ + np.where(crosses_midnight, 1440, 0)
+        entry_abs = day * 1440 + entry
+        rest = np.full(len(order), np.nan)
+        rest[1:] = (entry_abs[1:] - exit_abs[:-1]) / 60
+        rest[~same_employee] = np.nan
+        
+        # Horas em 7 dias: somas acumuladas e pesquisa binária da janela por funcionário
+        key = emp.astype('int64') * 10_000_000 + day
+        cumulative = np.r_[0, np.cumsum(hours)]
+        window_start = np.searchsorted(key, key - 6, side='left')
+        hours_7_days = cumulative[np.arange(1, len(order) + 1)] - cumulative[window_start]
+        
+        # Dias consecutivos: nova sequência quando muda o funcionário ou há um dia de intervalo
+        new_streak = ~same_employee | (np.r_[0, np.diff(day)] != 1)
+        streak_id = np.cumsum(new_streak)
+        streak_start = np.flatnonzero(new_streak)
+        consecutive = np.arange(len(order)) - streak_start[streak_id - 1] + 1
+        
+        result = pd.DataFrame({
+            'descanso_horas': rest,
+            'descanso_insuficiente': rest < limits['min_intervalo_turnos'].to_numpy(dtype=float),
+            'horas_7_dias': hours_7_days,
+            'excesso_horas_semana': hours_7_days > limits['max_horas_semana'].to_numpy(dtype=float),
+            'dias_consecutivos': consecutive,
+            'excesso_dias_consecutivos': consecutive > limits['max_dias_consecutivos'].to_numpy(dtype=float),
+        }, index=work_days.index[order])
+        return result.reindex(all_days)[columns]
+    
+    def _analyze_rest(self, working_time, thresholds):
+        """Resume descanso entre turnos, horas em 7 dias e dias consecutivos."""
+        rest = working_time['descanso_horas'].dropna()
+        return {
+            'dias_descanso_insuficiente': int((working_time['descanso_insuficiente'] == True).sum()),
+            'menor_descanso_horas': rest.min() if not rest.empty else 0,
+            'maior_horas_7_dias': working_time['horas_7_dias'].max() if not working_time.empty else 0,
+            'dias_excesso_horas_semana': int((working_time['excesso_horas_semana'] == True).sum()),
+            'maior_sequencia_dias': working_time['dias_consecutivos'].max() if not working_time.empty else 0,
+            'dias_excesso_consecutivos': int((working_time['excesso_dias_consecutivos'] == True).sum()),
+            'descanso_minimo_configurado': self._configured_value(thresholds, 'min_intervalo_turnos'),
+            'max_horas_semana_configurado': self._configured_value(thresholds, 'max_horas_semana'),
+            'max_dias_consecutivos_configurado': self._configured_value(thresholds, 'max_dias_consecutivos')
+        }
+    
+    def evaluate_rules(self, df, sector="default", sector_column=None, thresholds=None):
+        """
+        Avalia as regras declarativas ('regras' em rules/*.json) sobre todas as linhas.
+        
+        Cada condição foi compilada uma vez num predicado sobre colunas; as
+        regras são avaliadas por ordem de custo e cada linha só é testada
+        contra as regras do seu setor. Variáveis desconhecidas desativam a
+        regra com um aviso.
+        
+        Returns:
+            RuleResults com os bits das regras disparadas por linha; o texto
+            dos alertas só é gerado com `render` para as linhas mostradas
+        """
+        if thresholds is None:
+            if sector_column and sector_column in df.columns:
+                sectors = df[sector_column]
+            else:
+                sectors = pd.Series(sector, index=df.index)
+            thresholds = self.compliance_thresholds(sectors)
+        
+        codes, unique_sectors = pd.factorize(thresholds['sector'], use_na_sentinel=False)
+        # Regra compilada -> setores (posições) onde se aplica; o mesmo id pode
+        # ter condições diferentes em setores diferentes
+        sectors_by_rule = {}
+        for position, value in enumerate(unique_sectors):
+            for definition in self.get_rules(value).get('regras', []):
+                sectors_by_rule.setdefault(compile_rule(definition), []).append(position)
+        messages = {}
+        for rule in sectors_by_rule:
+            messages.setdefault(rule.id, rule.message)
+        
+        results = RuleResults(df.index, list(messages), messages)
+        if not messages or df.empty:
+            return results
+        
+        context = self.rule_context(df, thresholds)
+        for rule in sorted(sectors_by_rule, key=lambda rule: rule.cost):
+            missing = [name for name in rule.variables if name not in context]
+            if missing:
+                print(f"Aviso: Regra '{rule.id}' ignorada, variáveis desconhecidas: {', '.join(missing)}")
+                continue
+            applies = np.isin(codes, sectors_by_rule[rule])
+            if applies.all():
+                results.set(rule.id, rule.evaluate(context))
+            else:
+                rows = np.flatnonzero(applies)
+                mask = np.zeros(len(df), dtype=bool)
+                mask[rows] = rule.evaluate(context.subset(rows))
+                results.set(rule.id, mask)
+        results.capture_params(context)
+        return results
+    
+    def rule_context(self, df, thresholds):
+        """
+        Variáveis disponíveis nas condições das regras (calculadas só se usadas).
+        
+        - horas, horas_extras, atraso_minutos, entrada_minutos, saida_minutos
+        - dia_semana (0 = segunda)
+        - as variáveis de intervalos de `IntervalAnalyzer.interval_providers`
+          (num_picagens, almoco_minutos, pausa_*_minutos e os limites de
+          intervalos do ConfigManager), as mesmas da análise de intervalos
+        - todos os limites de `compliance_thresholds` (ex.: alerta_almoco_longo)
+        - qualquer outra coluna numérica de df, pelo nome
+        """
+        def column(name):
+            return lambda: pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+        
+        def clock(name):
+            if name not in df.columns:
+                return lambda: np.full(len(df), np.nan)
+            return lambda: hhmm_to_minutes(df[name]).to_numpy(dtype=float)
+        
+        providers = {name: column(name) for name in df.columns if isinstance(name, str)}
+        providers.update({
+            name: (lambda name=name: thresholds[name].to_numpy(dtype=float))
+            for name in thresholds.columns if name != 'sector'
+        })
+        providers.update({
+            'horas': lambda: df['horas_efetivas_num'].to_numpy(dtype=float) if 'horas_efetivas_num' in df.columns else np.full(len(df), np.nan),
+            'entrada_minutos': clock('primeiro_e1' if 'primeiro_e1' in df.columns else 'E1'),
+            'saida_minutos': clock('ultimo_s'),
+            'dia_semana': lambda: pd.to_datetime(df['Data'], errors='coerce').dt.weekday.to_numpy(dtype=float) if 'Data' in df.columns else np.full(len(df), np.nan),
+        })
+        providers.update(IntervalAnalyzer().interval_providers(df))
+        context = RuleContext(providers, len(df))
+        providers['atraso_minutos'] = lambda: np.clip(context.get('entrada_minutos') - context.get('entrada_padrao_minutos'), 0, None)
+        providers['horas_extras'] = lambda: context.get('horas') - context.get('horas_diarias_objetivo')
+        return context
+    
+    def render_rule_texts(self, df, sector="default", columns=None):
+        """
+        Texto dos resultados de regras guardados em bits, só para as linhas recebidas.
+        
+        Devolve uma cópia de `df` com 'alerta_intervalos' e 'correcao_sugerida'
+        no lugar das colunas de bits; usado apenas ao mostrar ou exportar. Com
+        `columns`, a cópia tem só essas colunas (as que existirem) e só são
+        gerados os textos pedidos.
+        """
+        from .punctuality_analyzer import PunctualityAnalyzer
+        
+        rules = self.get_rules(sector)
+        wanted = lambda name: columns is None or name in columns
+        result = df.copy() if columns is None else df[[col for col in columns if col in df.columns]].copy()
+        if IntervalAnalyzer.RULES_COLUMN in df.columns and wanted('alerta_intervalos'):
+            result['alerta_intervalos'] = IntervalAnalyzer(rules).render_alerts(df, rules)
+        if PunctualityAnalyzer.RULES_COLUMN in df.columns and wanted('correcao_sugerida'):
+            result['correcao_sugerida'] = PunctualityAnalyzer(rules).render_corrections(df, rules)
+        if columns is not None:
+            return result[[col for col in columns if col in result.columns]]
+        return result.drop(columns=[IntervalAnalyzer.RULES_COLUMN, PunctualityAnalyzer.RULES_COLUMN], errors='ignore')
+    
+    def _analyze_rule_alerts(self, results, thresholds):
+        """Número de dias em que cada regra declarativa disparou."""
+        counts = results.counts()
+        alerts = {}
+        for value in pd.unique(thresholds['sector']):
+            for definition in self.get_rules(value).get('regras', []):
+                rule = compile_rule(definition)
+                alerts.setdefault(rule.id, {'descricao': rule.description, 'dias': counts[rule.id]})
+        return alerts
+    
+    def compliance_thresholds(self, sectors):
+        """
+        Limites de conformidade de cada linha, a partir do setor da linha.
+        
+        As regras são obtidas uma vez por setor distinto e propagadas por
+        indexação; a hora de entrada padrão é convertida para minutos.
+        """
+        sectors = pd.Series(sectors)
+        codes, unique_sectors = pd.factorize(sectors, use_na_sentinel=False)
+        per_sector = pd.DataFrame([self.get_rules(value) for value in unique_sectors])
+        per_sector['sector'] = list(unique_sectors)
+        per_sector['entrada_padrao_minutos'] = hhmm_to_minutes(per_sector['hora_entrada_padrao'].astype(str))
+        # Setores sem alertas de intervalos próprios usam os limites do IntervalAnalyzer
+        interval_defaults = IntervalAnalyzer().default_rules
+        for key in ('alerta_almoco_curto', 'alerta_almoco_longo', 'alerta_pausa_longa'):
+            per_sector[key] = per_sector.get(key, pd.Series(np.nan, index=per_sector.index)).fillna(interval_defaults[key])
+        columns = ['sector', 'horas_diarias_objetivo', 'tolerancia_atraso_minutos', 'entrada_padrao_minutos',
+                   'max_horas_extras_dia', 'intervalo_almoco_minimo', 'alerta_almoco_curto', 'alerta_almoco_longo',
+                   'alerta_pausa_longa', 'min_intervalo_turnos', 'dias_trabalho_semana', 'max_dias_consecutivos',
+                   'max_horas_semana']
+        return per_sector[columns].iloc[codes].set_axis(sectors.index)
+    
+    def _compliance_metrics(self, df, thresholds):
+        """Colunas por linha usadas por todas as análises (horas, atrasos e extras)."""
+        hours = df['horas_efetivas_num'].astype(float)
+        target = thresholds['horas_diarias_objetivo'].astype(float)
+        
+        # Atraso: só linhas com primeira entrada válida (HH:MM) e horário padrão válido
+        if 'primeiro_e1' in df.columns:
+            entry_minutes = hhmm_to_minutes(df['primeiro_e1'])
+        else:
+            entry_minutes = pd.Series(np.nan, index=df.index)
+        delay = (entry_minutes - thresholds['entrada_padrao_minutos']).clip(lower=0)
+        
+        overtime = (hours - target).where(hours > target)
+        return pd.DataFrame({
+            'horas': hours,
+            'objetivo': target,
+            'conforme': hours >= target,
+            'defice': (target - hours).where(hours < target),
+            'atraso': delay,
+            'atrasado': delay > thresholds['tolerancia_atraso_minutos'],
+            'horas_extras': overtime,
+            'excesso_extras': overtime > thresholds['max_horas_extras_dia'],
+        }, index=df.index)
+    
+    def _configured_value(self, thresholds, column):
+        """Valor configurado de um limite: único, ou por setor num DataFrame misto."""
+        per_sector = thresholds.drop_duplicates('sector').set_index('sector')[column]
+        if per_sector.nunique(dropna=False) == 1:
+            return per_sector.tolist()[0]
+        return per_sector.to_dict()
+    
+    def _analyze_daily_hours(self, metrics):
+        """Analisa cumprimento de horas diárias"""
+        total_days = len(metrics)
+        compliant_days = int(metrics['conforme'].sum())
         
         return {
             'total_dias': total_days,
             'dias_conformes': compliant_days,
             'percentual_conformidade': (compliant_days / total_days * 100) if total_days > 0 else 0,
-            'media_horas_diarias': avg_hours,
-            'deficit_total_horas': total_deficit,
-            'dias_com_deficit': len(deficit_days)
+            'media_horas_diarias': metrics['horas'].mean(),
+            'deficit_total_horas': metrics['defice'].sum(),
+            'dias_com_deficit': int(metrics['defice'].notna().sum())
         }
     
-    def _analyze_punctuality(self, df, rules):
+    def _analyze_punctuality(self, metrics, thresholds):
         """Analisa pontualidade"""
-        tolerance_minutes = rules['tolerancia_atraso_minutos']
-        standard_entry = rules['hora_entrada_padrao']
-        
-        # Calcular atrasos
-        delays = []
-        for _, row in df.iterrows():
-            if row['primeiro_e1']:
-                try:
-                    entry_time = datetime.strptime(row['primeiro_e1'], '%H:%M').time()
-                    standard_time = datetime.strptime(standard_entry, '%H:%M').time()
-                    
-                    # Converter para minutos desde meia-noite para comparação
-                    entry_minutes = entry_time.hour * 60 + entry_time.minute
-                    standard_minutes = standard_time.hour * 60 + standard_time.minute
-                    
-                    delay = entry_minutes - standard_minutes
-                    delays.append(max(0, delay))  # Só contar atrasos positivos
-                except:
-                    continue
+        delays = metrics['atraso'].dropna()
+        analyzed_days = len(delays)
         
-        if delays:
-            late_days = len([d for d in delays if d > tolerance_minutes])
-            avg_delay = sum(delays) / len(delays)
-            max_delay = max(delays)
+        if analyzed_days:
+            late_days = int(metrics['atrasado'].sum())
+            avg_delay = delays.mean()
+            max_delay = delays.max()
         else:
             late_days = 0
             avg_delay = 0
             max_delay = 0
         
         return {
-            'total_dias_analisados': len(delays),
+            'total_dias_analisados': analyzed_days,
             'dias_com_atraso': late_days,
-            'percentual_pontualidade': ((len(delays) - late_days) / len(delays) * 100) if delays else 100,
+            'percentual_pontualidade': ((analyzed_days - late_days) / analyzed_days * 100) if analyzed_days else 100,
             'atraso_medio_minutos': avg_delay,
             'maior_atraso_minutos': max_delay,
-            'tolerancia_configurada': tolerance_minutes
+            'tolerancia_configurada': self._configured_value(thresholds, 'tolerancia_atraso_minutos')
         }
     
-    def _analyze_breaks(self, df, rules):
+    def _analyze_breaks(self, thresholds):
         """Analisa intervalos e pausas"""
-        min_lunch_break = rules['intervalo_almoco_minimo']
-        
         # Esta análise seria mais complexa com os dados de E1,S1,E2,S2, etc.
         # Por agora, retornar estrutura básica
         return {
-            'intervalo_minimo_configurado': min_lunch_break,
+            'intervalo_minimo_configurado': self._configured_value(thresholds, 'intervalo_almoco_minimo'),
             'analise_disponivel': False,  # Implementar com mais dados
             'observacoes': 'Análise detalhada de intervalos requer processamento adicional dos horários'
         }
     
-    def _analyze_overtime(self, df, rules):
+    def _analyze_overtime(self, metrics, thresholds):
         """Analisa horas extras"""
-        target_hours = rules['horas_diarias_objetivo']
-        max_overtime = rules['max_horas_extras_dia']
-        
-        # Calcular horas extras
-        df_overtime = df[df['horas_efetivas_num'] > target_hours].copy()
-        df_overtime['horas_extras'] = df_overtime['horas_efetivas_num'] - target_hours
-        
-        # Dias com excesso de horas extras
-        excessive_overtime = df_overtime[df_overtime['horas_extras'] > max_overtime]
+        overtime = metrics['horas_extras'].dropna()
         
         return {
-            'dias_com_horas_extras': len(df_overtime),
-            'total_horas_extras': df_overtime['horas_extras'].sum() if not df_overtime.empty else 0,
-            'media_horas_extras': df_overtime['horas_extras'].mean() if not df_overtime.empty else 0,
-            'dias_excesso_limite': len(excessive_overtime),
-            'limite_configurado': max_overtime
+            'dias_com_horas_extras': len(overtime),
+            'total_horas_extras': overtime.sum() if not overtime.empty else 0,
+            'media_horas_extras': overtime.mean() if not overtime.empty else 0,
+            'dias_excesso_limite': int(metrics['excesso_extras'].sum()),
+            'limite_configurado': self._configured_value(thresholds, 'max_horas_extras_dia')
         }
     
-    def _generate_summary(self, df, rules, analysis):
+    def _generate_summary(self, metrics, analysis):
         """Gera resumo geral da análise"""
-        total_work_days = len(df)
-        total_hours = df['horas_efetivas_num'].sum()
-        expected_hours = total_work_days * rules['horas_diarias_objetivo']
+        total_work_days = len(metrics)
+        total_hours = metrics['horas'].sum()
+        expected_hours = metrics['objetivo'].sum()
         
         # Calcular score de conformidade
         punctuality_score = analysis['pontualidade']['percentual_pontualidade']
@@ -209,14 +863,11 @@ class RulesEngine:
         overall_score = (punctuality_score + hours_score) / 2
         
         # Determinar status
-        if overall_score >= 90:
-            status = "Excelente"
-        elif overall_score >= 75:
-            status = "Bom"
-        elif overall_score >= 60:
-            status = "Regular"
-        else:
-            status = "Necessita Melhoria"
+        status = self.STATUS_CONFORMIDADE_MINIMO
+        for minimum, label in self.STATUS_CONFORMIDADE:
+            if overall_score >= minimum:
+                status = label
+                break
         
         return {
             'total_dias_trabalho': total_work_days,
@@ -225,10 +876,10 @@ class RulesEngine:
             'diferenca_horas': total_hours - expected_hours,
             'score_conformidade': overall_score,
             'status_geral': status,
-            'recomendacoes': self._generate_recommendations(analysis, rules)
+            'recomendacoes': self._generate_recommendations(analysis)
         }
     
-    def _generate_recommendations(self, analysis, rules):
+    def _generate_recommendations(self, analysis):
         """Gera recomendações baseadas na análise"""
         recommendations = []
         
@@ -244,6 +895,14 @@ class RulesEngine:
         if analysis['horas_extras']['dias_excesso_limite'] > 0:
             recommendations.append("Controlar horas extras excessivas")
         
+        # Recomendações sobre descanso (requisitos legais)
+        if analysis['descanso']['dias_descanso_insuficiente'] > 0:
+            recommendations.append("Garantir o descanso mínimo entre turnos")
+        if analysis['descanso']['dias_excesso_horas_semana'] > 0:
+            recommendations.append("Reduzir as horas trabalhadas em 7 dias consecutivos")
+        if analysis['descanso']['dias_excesso_consecutivos'] > 0:
+            recommendations.append("Garantir dias de descanso semanal")
+        
         if not recommendations:
             recommendations.append("Manter o bom desempenho atual")
         
@@ -267,12 +926,18 @@ class RulesEngine:
             with open(filename, 'r', encoding='utf-8') as f:
                 rules = json.load(f)
             
-            # Validar regras básicas
-            required_keys = ['horas_diarias_objetivo', 'tolerancia_atraso_minutos']
-            if all(key in rules for key in required_keys):
-                self.sector_rules[sector] = rules
-                return True
-            else:
+            # Validar regras contra o esquema
+            errors = validate_rules(rules, required=REQUIRED_RULES)
+            if errors:
+                print(f"Aviso: Regras inválidas em {filename} não importadas: {'; '.join(errors)}")
                 return False
-        except:
-            return False 
\ No newline at end of file
+            
+            with self._lock:
+                self._imported_rules[sector] = rules
+                self.sector_rules[sector] = rules
+                self._merged_cache = {}
+                self.rules_version += 1
+            return True
+        except (json.JSONDecodeError, ValueError, OSError) as e:
+            print(f"Aviso: Erro ao importar regras de {filename}: {e}")
+            return False
\ No newline at end of file
@@ -0,0 +1,70 @@
+import pandas as pd
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from .config_manager import config_file_key
+from .kpi_calculator import frame_fingerprint
+from .rules_engine import RulesEngine
+
+# Número de resultados de regras do setor memorizados por sessão (os mais antigos são descartados)
+SECTOR_RULES_MEMO_SIZE = 4
+
+
+class SectorRulesMemo:
+    """
+    Memória dos resultados da aplicação das regras do setor.
+
+    A chave é (impressão digital dos dados, setor, versão das regras, ficheiro de
+    configurações, versão dos perfis de picagem). Guardam-se apenas as chaves dos
+    resultados: se `df` já é o resultado das regras para a mesma chave, devolve-se
+    sem reprocessar (a aplicação das regras é idempotente). Edições no lugar mudam
+    a impressão digital; quem reprocessa só as linhas editadas regista o resultado
+    com `record`, para o rerun seguinte não voltar a processar o DataFrame inteiro.
+
+    As métricas que dependem do setor mas não das regras (ex.: objetivo diário)
+    são recalculadas no mesmo passo pela função `recompute`, por isso mudar de
+    setor também as atualiza.
+    """
+
+    def __init__(self, max_size: int = SECTOR_RULES_MEMO_SIZE,
+                 recompute: Optional[Callable[[pd.DataFrame, str], pd.DataFrame]] = None):
+        """
+        Inicializa uma memória vazia.
+
+        Args:
+            max_size: Número máximo de resultados guardados
+            recompute: Função (DataFrame, setor) -> DataFrame aplicada depois das regras do setor
+        """
+        self.max_size = max_size
+        self.recompute = recompute
+        self._keys: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key(self, df: pd.DataFrame, sector: str, punch_profile=None) -> Tuple:
+        """Chave de `df` como resultado das regras de `sector`."""
+        return (frame_fingerprint(df), sector, RulesEngine.shared().rules_version, config_file_key(),
+                getattr(punch_profile, 'version', None))
+
+    def apply(self, processor, df: pd.DataFrame, sector: str) -> pd.DataFrame:
+        """Aplica as regras do setor só se `df` ainda não for o resultado memorizado."""
+        RulesEngine.shared().reload_rules()
+        key = self.key(df, sector, processor.punch_profile)
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return df
+
+        df = processor.apply_sector_rules(df, sector)
+        if self.recompute is not None:
+            df = self.recompute(df, sector)
+        # A análise de pontualidade alimenta os perfis de picagem: guardar com as versões finais
+        self.record(df, sector, processor.punch_profile)
+        return df
+
+    def record(self, df: pd.DataFrame, sector: str, punch_profile=None):
+        """Regista `df` como resultado das regras de `sector` (ex.: depois de reprocessar só as linhas editadas)."""
+        key = self.key(df, sector, punch_profile)
+        self._keys[key] = True
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
@@ -0,0 +1,141 @@
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+# Colunas de picagens pela ordem cronológica esperada
+PUNCH_COLUMNS = ['E1', 'S1', 'E2', 'S2', 'E3', 'S3', 'E4', 'S4']
+
+# Valores que representam "sem picagem" nas colunas E/S
+EMPTY_PUNCH_VALUES = ('', '00:00', 'nan')
+
+
+def _parse_hhmm(value: str) -> float:
+    """Converte um único 'HH:MM' em minutos (mesmas regras que strptime('%H:%M'))."""
+    parts = value.split(':')
+    if len(parts) != 2:
+        return np.nan
+    hours, minutes = parts
+    if not (hours.isdigit() and minutes.isdigit() and 1 <= len(hours) <= 2 and 1 <= len(minutes) <= 2):
+        return np.nan
+    hours, minutes = int(hours), int(minutes)
+    if hours > 23 or minutes > 59:
+        return np.nan
+    return float(hours * 60 + minutes)
+
+
+def _factorize_strings(values: pd.Series) -> Tuple[np.ndarray, List[str]]:
+    """
+    Factoriza uma série em códigos e valores únicos já convertidos para texto.
+
+    Os valores ausentes ficam com o código -1, que indexa o último elemento
+    dos arrays por valor único construídos pelos chamadores (sentinela).
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes, [str(value).strip() for value in uniques]
+
+
+def hhmm_to_minutes(values) -> pd.Series:
+    """
+    Converte uma série de strings HH:MM em minutos desde a meia-noite.
+
+    Os valores distintos de uma coluna de picagens são poucos (no máximo 1440),
+    por isso cada valor único é convertido uma vez e o resultado é propagado
+    por indexação. Valores ausentes ou inválidos resultam em NaN.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = _factorize_strings(series)
+    parsed = np.array([_parse_hhmm(value) for value in uniques] + [np.nan], dtype=float)
+    return pd.Series(parsed[codes], index=series.index, dtype=float)
+
+
+def minutes_to_hhmm(minutes) -> pd.Series:
+    """Formata uma série de minutos inteiros como strings HH:MM."""
+    series = minutes if isinstance(minutes, pd.Series) else pd.Series(minutes)
+    values = series.to_numpy().astype('int64')
+    text = np.char.add(np.char.add(np.char.zfill((values // 60).astype(str), 2), ':'),
+                       np.char.zfill((values % 60).astype(str), 2))
+    return pd.Series(text.astype(object), index=series.index, dtype=object)
+
+
+def _parse_duration(value: str) -> float:
+    """Converte uma duração 'H:MM' (horas sem limite, ex.: '41:30') em minutos."""
+    parts = value.split(':')
+    if len(parts) != 2:
+        return np.nan
+    try:
+        return float(int(parts[0]) * 60 + int(parts[1]))
+    except ValueError:
+        return np.nan
+
+
+def duration_to_minutes(values) -> pd.Series:
+    """
+    Converte uma série de durações em minutos.
+
+    Aceita colunas timedelta ou texto 'H:MM' (como Efect/Extra); o texto é
+    convertido uma vez por valor distinto. Valores ausentes ou inválidos
+    resultam em NaN.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_timedelta64_dtype(series.dtype):
+        return series.dt.total_seconds() / 60
+    codes, uniques = _factorize_strings(series)
+    parsed = np.array([_parse_duration(value) for value in uniques] + [np.nan], dtype=float)
+    return pd.Series(parsed[codes], index=series.index, dtype=float)
+
+
+def duration_hours(values, text_durations: bool = True) -> pd.Series:
+    """
+    Horas de uma coluna de durações, pronta para somas e médias.
+
+    Colunas timedelta e (com `text_durations`) texto 'H:MM' são convertidas
+    com `duration_to_minutes`; colunas numéricas já estão em horas. Valores
+    ausentes ou inválidos contam como 0.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_timedelta64_dtype(series.dtype) or (text_durations and not pd.api.types.is_numeric_dtype(series.dtype)):
+        return (duration_to_minutes(series) / 60).fillna(0.0)
+    return pd.to_numeric(series, errors='coerce').fillna(0.0)
+
+
+def punch_matrix(df: pd.DataFrame,
+                 columns: Optional[Sequence[str]] = None,
+                 empty_values: Tuple[str, ...] = EMPTY_PUNCH_VALUES) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extrai as picagens de um DataFrame como matrizes (linhas x colunas E/S).
+
+    Returns:
+        Tuplo (colunas, presentes, minutos, texto) onde `presentes` indica as
+        células com picagem, `minutos` tem os minutos desde a meia-noite (NaN
+        se inválido) e `texto` guarda o valor original sem espaços.
+    """
+    columns = [col for col in (columns or PUNCH_COLUMNS) if col in df.columns]
+    n_rows = len(df)
+    present = np.zeros((n_rows, len(columns)), dtype=bool)
+    minutes = np.full((n_rows, len(columns)), np.nan)
+    text = np.full((n_rows, len(columns)), '', dtype=object)
+
+    for j, col in enumerate(columns):
+        codes, uniques = _factorize_strings(df[col])
+        unique_present = np.array([value not in empty_values for value in uniques] + [False], dtype=bool)
+        unique_minutes = np.array([_parse_hhmm(value) for value in uniques] + [np.nan], dtype=float)
+        unique_text = np.empty(len(uniques) + 1, dtype=object)
+        unique_text[:] = uniques + ['']
+        present[:, j] = unique_present[codes]
+        minutes[:, j] = unique_minutes[codes]
+        text[:, j] = unique_text[codes]
+
+    return columns, present, minutes, text
+
+
+def compact_punches(present: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordena as posições das picagens presentes para o início de cada linha.
+
+    Returns:
+        Tuplo (ordem, contagem): `ordem[i, k]` é o índice da coluna da k-ésima
+        picagem presente da linha i, e `contagem[i]` o número de picagens.
+    """
+    order = np.argsort(~present, axis=1, kind='stable')
+    count = present.sum(axis=1)
+    return order, count
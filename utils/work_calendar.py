@@ -0,0 +1,92 @@
+import numpy as np
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Set, Tuple
+
+# Nomes dos dias da semana usados em `dias_trabalho` (segunda = 0)
+WEEKDAY_NAMES = ['segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo']
+
+# Feriados nacionais de data fixa (mês, dia)
+FERIADOS_NACIONAIS_FIXOS = [
+    (1, 1),    # Ano Novo
+    (4, 25),   # Dia da Liberdade
+    (5, 1),    # Dia do Trabalhador
+    (6, 10),   # Dia de Portugal
+    (8, 15),   # Assunção de Nossa Senhora
+    (10, 5),   # Implantação da República
+    (11, 1),   # Todos os Santos
+    (12, 1),   # Restauração da Independência
+    (12, 8),   # Imaculada Conceição
+    (12, 25),  # Natal
+]
+
+
+def easter_sunday(year: int) -> date:
+    """Domingo de Páscoa (calendário gregoriano, algoritmo de Meeus/Jones/Butcher)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def national_holidays(year: int) -> List[date]:
+    """Feriados nacionais obrigatórios de Portugal num ano (fixos e móveis)."""
+    easter = easter_sunday(year)
+    movable = [
+        easter - timedelta(days=2),   # Sexta-feira Santa
+        easter,                       # Páscoa
+        easter + timedelta(days=60),  # Corpo de Deus
+    ]
+    return sorted([date(year, month, day) for month, day in FERIADOS_NACIONAIS_FIXOS] + movable)
+
+
+def _local_holidays(year: int, local_holidays: Iterable[str]) -> Set[date]:
+    """
+    Converte feriados locais configurados em datas de um ano.
+
+    Aceita 'MM-DD' (repete todos os anos, ex.: feriado municipal) ou
+    'YYYY-MM-DD' (apenas nesse ano). Valores inválidos são ignorados.
+    """
+    holidays = set()
+    for value in local_holidays:
+        parts = str(value).strip().split('-')
+        try:
+            if len(parts) == 2:
+                holidays.add(date(year, int(parts[0]), int(parts[1])))
+            elif len(parts) == 3 and int(parts[0]) == year:
+                holidays.add(date(year, int(parts[1]), int(parts[2])))
+        except ValueError:
+            continue
+    return holidays
+
+
+@lru_cache(maxsize=256)
+def year_calendar(year: int, work_days: Tuple[str, ...], local_holidays: Tuple[str, ...] = ()) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calendário de um ano para um conjunto de dias de trabalho.
+
+    Returns:
+        Tuplo (dias_uteis, feriados) de arrays booleanos indexados pelo dia
+        do ano (0 = 1 de janeiro). Os arrays são partilhados pela cache e
+        por isso só de leitura.
+    """
+    start = date(year, 1, 1)
+    n_days = (date(year + 1, 1, 1) - start).days
+    weekday = (np.arange(n_days) + start.weekday()) % 7
+    work_week = np.array([name in work_days for name in WEEKDAY_NAMES], dtype=bool)
+
+    holidays = np.zeros(n_days, dtype=bool)
+    for holiday in set(national_holidays(year)) | _local_holidays(year, local_holidays):
+        holidays[(holiday - start).days] = True
+
+    work = work_week[weekday] & ~holidays
+    work.flags.writeable = False
+    holidays.flags.writeable = False
+    return work, holidays